@@ -1,8 +1,12 @@
+from collections import OrderedDict
 from typing import Tuple, Optional
+import threading
+import time
 
 import jwt
 from django.conf import settings
 from django.contrib.auth.hashers import check_password, make_password
+from django.core.cache import cache
 from rest_framework.authentication import BaseAuthentication
 from rest_framework import exceptions
 from rest_framework.permissions import BasePermission
@@ -23,6 +27,7 @@ def generate_jwt(user: User) -> str:
         'username': user.username,
         'property_id': user.property_id,
         'role': user.role,
+        'ver': user.token_version,
         'iat': int(now.timestamp()),
         'exp': int((now + timedelta(hours=TOKEN_TTL_HOURS)).timestamp()),
         'iss': 'pgadmin-api',
@@ -34,8 +39,115 @@ def verify_password(raw_password: str, password_hash: str) -> bool:
     return check_password(raw_password, password_hash)
 
 
+class TokenUser:
+    """Principal built from token claims alone (AUTH_STATELESS), without a User query."""
+
+    is_authenticated = True
+    is_anonymous = False
+    is_active = True
+
+    def __init__(self, payload: dict):
+        self.id = self.pk = payload['sub']
+        self.username = payload.get('username')
+        self.property_id = payload.get('property_id')
+        self.role = payload.get('role')
+        self.token_version = payload.get('ver', 0)
+
+    def __str__(self):
+        return self.username or str(self.id)
+
+
+class _UserCache:
+    """Per-process LRU of resolved users, each entry valid for AUTH_USER_CACHE_TTL seconds."""
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            user, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return user
+
+    def set(self, user):
+        ttl = settings.AUTH_USER_CACHE_TTL
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[user.id] = (user, time.monotonic() + ttl)
+            self._entries.move_to_end(user.id)
+            while len(self._entries) > max(settings.AUTH_USER_CACHE_SIZE, 1):
+                self._entries.popitem(last=False)
+
+    def discard(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_cache = _UserCache()
+
+
+def _version_key(user_id) -> str:
+    return f'auth:token_version:{user_id}'
+
+
+# Published for deleted users: no token carries it, so every token is rejected
+DELETED_TOKEN_VERSION = -1
+
+
+def forget_user(user_id, token_version: int = DELETED_TOKEN_VERSION):
+    """
+    Drop a cached user after it changed or was deleted.
+
+    With AUTH_SHARED_TOKEN_VERSIONS the user's current token version is also
+    published to the shared cache, so the other workers drop their copy (and
+    reject older tokens) on the next request instead of after the TTL. A
+    deleted user gets DELETED_TOKEN_VERSION, kept until its last token expires.
+    """
+    user_cache.discard(user_id)
+    if settings.AUTH_SHARED_TOKEN_VERSIONS:
+        timeout = TOKEN_TTL_HOURS * 3600 if token_version == DELETED_TOKEN_VERSION else None
+        cache.set(_version_key(user_id), token_version, timeout)
+
+
+def _shared_version(user_id):
+    if not settings.AUTH_SHARED_TOKEN_VERSIONS:
+        return None
+    return cache.get(_version_key(user_id))
+
+
+def resolve_user(user_id) -> Optional[User]:
+    """User for a token subject, from the per-process cache when fresh."""
+    user = user_cache.get(user_id)
+    if user is not None:
+        shared = _shared_version(user_id)
+        if shared is None or shared == user.token_version:
+            return user
+        user_cache.discard(user_id)
+    user = User.objects.filter(id=user_id).first()
+    if user is not None:
+        user_cache.set(user)
+    return user
+
+
 class JWTAuthentication(BaseAuthentication):
-    """Simple JWT auth reading Authorization: Bearer <token> and attaching app User."""
+    """
+    Simple JWT auth reading Authorization: Bearer <token> and attaching app User.
+
+    The token's 'ver' claim must match User.token_version (tokens without it
+    count as version 0), so bumping the version revokes every older token.
+    """
 
     def authenticate(self, request) -> Optional[Tuple[User, dict]]:
         auth_header = request.headers.get('Authorization') or ''
@@ -52,10 +164,21 @@ class JWTAuthentication(BaseAuthentication):
         user_id = payload.get('sub')
         if not user_id:
             raise exceptions.AuthenticationFailed('Invalid token payload')
-        try:
-            user = User.objects.get(id=user_id)
-        except User.DoesNotExist:
+        token_version = payload.get('ver', 0)
+
+        if settings.AUTH_STATELESS:
+            shared = _shared_version(user_id)
+            if shared is not None and shared != token_version:
+                raise exceptions.AuthenticationFailed('Token revoked')
+            return (TokenUser(payload), payload)
+
+        user = resolve_user(user_id)
+        if user is None:
             raise exceptions.AuthenticationFailed('User not found')
+        if user.token_version != token_version:
+            raise exceptions.AuthenticationFailed('Token revoked')
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed('User inactive')
         return (user, payload)
 
 
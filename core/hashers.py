@@ -0,0 +1,73 @@
+"""
+Password hashing for app_user
+
+TunablePBKDF2PasswordHasher reads its iteration count from
+settings.PASSWORD_HASH_ITERATIONS, so the cost of a login can be tuned per
+deployment. Stored hashes keep the iteration count they were made with;
+check_user_password rehashes them to the configured count on the next
+successful login.
+
+PBKDF2 runs inside OpenSSL with the GIL released, so hashing in the bounded
+pool below (PASSWORD_HASH_THREADS) lets the other request threads keep running
+while a login burst is hashed, and caps the cores a burst can take.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, check_password, make_password
+
+
+class TunablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """pbkdf2_sha256 with settings.PASSWORD_HASH_ITERATIONS iterations."""
+
+    @property
+    def iterations(self):
+        return settings.PASSWORD_HASH_ITERATIONS
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _hash_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=max(settings.PASSWORD_HASH_THREADS, 1),
+                    thread_name_prefix='password-hash',
+                )
+    return _executor
+
+
+def run_hash(func, *args):
+    """Run a hashing call in the password hashing pool and wait for its result."""
+    if settings.PASSWORD_HASH_THREADS <= 0:
+        return func(*args)
+    return _hash_executor().submit(func, *args).result()
+
+
+def hash_password(raw_password: str) -> str:
+    """make_password with the configured hasher, in the hashing pool."""
+    return run_hash(make_password, raw_password)
+
+
+def check_user_password(user, raw_password: str) -> bool:
+    """
+    Check an app_user password in the hashing pool, rehashing it when the stored
+    hash uses another algorithm or iteration count than the configured one.
+
+    The check runs in the pool; the new hash is stored from the calling thread
+    (and its database connection) with a plain UPDATE: the password itself did
+    not change, so this must not bump token_version (see properties.signals).
+    """
+    outdated = []
+    if not run_hash(check_password, raw_password, user.password_hash, outdated.append):
+        return False
+    if outdated:
+        user.password_hash = hash_password(raw_password)
+        type(user).objects.filter(pk=user.pk).update(password_hash=user.password_hash)
+    return True
@@ -0,0 +1,60 @@
+from concurrent.futures import ThreadPoolExecutor
+import statistics
+import time
+import uuid
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from rest_framework.test import APIClient
+
+from core.hashers import hash_password
+from properties.models import User
+
+
+class Command(BaseCommand):
+    help = "Measure POST /api/auth/login/ throughput with a temporary user"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50, help='Number of logins (default 50)')
+        parser.add_argument('--concurrency', type=int, default=4, help='Concurrent clients (default 4)')
+
+    def handle(self, *args, **options):
+        total = options['requests']
+        concurrency = options['concurrency']
+        if total < 1 or concurrency < 1:
+            raise CommandError('--requests and --concurrency must be at least 1')
+
+        username = f'benchmark-{uuid.uuid4().hex[:12]}'
+        password = uuid.uuid4().hex
+        user = User.objects.create(username=username, password_hash=hash_password(password), role='staff')
+        try:
+            def login(_):
+                started = time.perf_counter()
+                try:
+                    response = APIClient().post(
+                        '/api/auth/login/', {'username': username, 'password': password},
+                        format='json', HTTP_HOST='localhost',
+                    )
+                finally:
+                    connection.close()
+                if response.status_code != 200:
+                    raise CommandError(f'Login failed with HTTP {response.status_code}')
+                return time.perf_counter() - started
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                latencies = sorted(pool.map(login, range(total)))
+            elapsed = time.perf_counter() - started
+        finally:
+            user.delete()
+
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        self.stdout.write(
+            f"{total} logins, concurrency {concurrency}, "
+            f"{settings.PASSWORD_HASH_ITERATIONS} iterations, {settings.PASSWORD_HASH_THREADS} hash threads"
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"{total / elapsed:.1f} logins/s, "
+            f"p50 {statistics.median(latencies) * 1000:.1f} ms, p95 {p95 * 1000:.1f} ms"
+        ))
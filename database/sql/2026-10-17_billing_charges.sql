@@ -0,0 +1,30 @@
+-- Billing charges: one rent charge per resident per billing cycle
+-- Date: 2026-10-17
+-- Safe to run in pgAdmin against the production database (idempotent).
+-- Run after 2026-10-17_resident_ledger.sql. The table is filled by
+-- `python manage.py generate_billing_charges`; schedule it daily (e.g. cron at 00:15 UTC).
+-- The job is resumable (--after <resident id>) and never duplicates a cycle.
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS pg_billing_charge (
+    id BIGSERIAL PRIMARY KEY,
+    property_id BIGINT NOT NULL REFERENCES pg_property(id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED,
+    resident_id BIGINT NOT NULL REFERENCES pg_resident(id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED,
+    cycle_number INTEGER NOT NULL CHECK (cycle_number >= 0),
+    cycle_start DATE NOT NULL,
+    cycle_end DATE NOT NULL,
+    due_date DATE NOT NULL,
+    amount NUMERIC(10, 2) NOT NULL,
+    amount_paid NUMERIC(10, 2) NOT NULL DEFAULT 0,
+    is_paid BOOLEAN NOT NULL DEFAULT FALSE,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    CONSTRAINT pg_billing_charge_cycle_key UNIQUE (resident_id, cycle_number)
+);
+
+CREATE INDEX IF NOT EXISTS pg_billing_charge_property_id_idx ON pg_billing_charge (property_id);
+-- Overdue lookups only touch unpaid rows
+CREATE INDEX IF NOT EXISTS pg_charge_unpaid_due_idx ON pg_billing_charge (due_date) WHERE NOT is_paid;
+CREATE INDEX IF NOT EXISTS pg_charge_prop_unpaid_idx ON pg_billing_charge (property_id, due_date) WHERE NOT is_paid;
+
+COMMIT;
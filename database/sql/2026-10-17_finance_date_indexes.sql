@@ -0,0 +1,6 @@
+-- Date-range indexes for the financial summary (property + date)
+-- Date: 2026-10-17
+-- Safe to run in pgAdmin against the production database (does not lock writes)
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS pg_payment_prop_date_idx ON pg_payment (property_id, payment_date);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS pg_expense_prop_date_idx ON pg_expense (property_id, expense_date);
@@ -0,0 +1,44 @@
+-- Monthly payment/expense rollup per property (read by the finance endpoints)
+-- Date: 2026-10-17
+-- Safe to run in pgAdmin against the production database.
+-- Months are UTC calendar months (settings.TIME_ZONE). Deploy the application code
+-- first so new writes are rolled up, then run this; re-running it rebuilds the table.
+-- Equivalent to: python manage.py rebuild_finance_rollup
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS pg_finance_monthly_rollup (
+    id BIGSERIAL PRIMARY KEY,
+    property_id BIGINT NOT NULL REFERENCES pg_property(id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED,
+    year SMALLINT NOT NULL,
+    month SMALLINT NOT NULL,
+    source VARCHAR(20) NOT NULL,
+    category VARCHAR(100) NOT NULL DEFAULT '',
+    total NUMERIC(14, 2) NOT NULL DEFAULT 0,
+    count INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    CONSTRAINT pg_finance_rollup_key UNIQUE (property_id, year, month, source, category)
+);
+
+-- Serialize against concurrent payment/expense writes while backfilling
+LOCK TABLE pg_payment, pg_expense IN SHARE MODE;
+
+DELETE FROM pg_finance_monthly_rollup;
+
+INSERT INTO pg_finance_monthly_rollup (property_id, year, month, source, category, total, count, updated_at)
+SELECT property_id,
+       EXTRACT(YEAR FROM payment_date AT TIME ZONE 'UTC')::SMALLINT,
+       EXTRACT(MONTH FROM payment_date AT TIME ZONE 'UTC')::SMALLINT,
+       'payment', '', SUM(amount), COUNT(*), NOW()
+FROM pg_payment
+GROUP BY 1, 2, 3;
+
+INSERT INTO pg_finance_monthly_rollup (property_id, year, month, source, category, total, count, updated_at)
+SELECT property_id,
+       EXTRACT(YEAR FROM expense_date AT TIME ZONE 'UTC')::SMALLINT,
+       EXTRACT(MONTH FROM expense_date AT TIME ZONE 'UTC')::SMALLINT,
+       'expense', COALESCE(category, ''), SUM(amount), COUNT(*), NOW()
+FROM pg_expense
+GROUP BY 1, 2, 3, 5;
+
+COMMIT;
@@ -0,0 +1,56 @@
+-- Resident ledger: charges/credits per resident with running balance and running payment total
+-- Date: 2026-10-17
+-- Safe to run in pgAdmin against the production database.
+-- Due/overdue/checkout read payment totals from this table, so run it right before
+-- deploying the application code, then run `python manage.py rebuild_resident_ledger`
+-- once the new code is live: that picks up payments taken in between and posts the
+-- rent entries of closed months. Re-running this script rebuilds arrears/payment rows.
+-- Dates are UTC calendar dates (settings.TIME_ZONE).
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS pg_resident_ledger (
+    id BIGSERIAL PRIMARY KEY,
+    property_id BIGINT NOT NULL REFERENCES pg_property(id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED,
+    resident_id BIGINT NOT NULL REFERENCES pg_resident(id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED,
+    payment_id BIGINT NULL UNIQUE REFERENCES pg_payment(id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED,
+    entry_type VARCHAR(20) NOT NULL,
+    entry_date DATE NOT NULL,
+    period_start DATE NULL,
+    period_end DATE NULL,
+    amount NUMERIC(12, 2) NOT NULL,
+    balance NUMERIC(14, 2) NOT NULL DEFAULT 0,
+    total_paid NUMERIC(14, 2) NOT NULL DEFAULT 0,
+    description VARCHAR(255) NOT NULL DEFAULT '',
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS pg_ledger_resident_date_idx ON pg_resident_ledger (resident_id, entry_date, id);
+CREATE INDEX IF NOT EXISTS pg_resident_ledger_property_id_idx ON pg_resident_ledger (property_id);
+
+-- Serialize against concurrent payment/resident writes while backfilling
+LOCK TABLE pg_payment, pg_resident IN SHARE MODE;
+
+DELETE FROM pg_resident_ledger WHERE entry_type IN ('arrears', 'payment');
+
+INSERT INTO pg_resident_ledger (property_id, resident_id, entry_type, entry_date, amount, description)
+SELECT property_id, id, 'arrears', COALESCE(joining_date, CURRENT_DATE), arrears, 'Arrears'
+FROM pg_resident
+WHERE arrears <> 0;
+
+INSERT INTO pg_resident_ledger (property_id, resident_id, payment_id, entry_type, entry_date, amount, description)
+SELECT property_id, resident_id, id, 'payment', (payment_date AT TIME ZONE 'UTC')::DATE, -amount, COALESCE(payment_method, '')
+FROM pg_payment;
+
+UPDATE pg_resident_ledger AS l
+SET balance = s.balance, total_paid = s.total_paid
+FROM (
+    SELECT id,
+           SUM(amount) OVER w AS balance,
+           SUM(CASE WHEN entry_type = 'payment' THEN -amount ELSE 0 END) OVER w AS total_paid
+    FROM pg_resident_ledger
+    WINDOW w AS (PARTITION BY resident_id ORDER BY entry_date, id)
+) AS s
+WHERE l.id = s.id;
+
+COMMIT;
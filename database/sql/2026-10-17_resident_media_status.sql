@@ -0,0 +1,12 @@
+-- pg_resident.photo_status / aadhar_status: state of the background photo/aadhar upload
+-- Date: 2026-10-17
+-- Safe to run in pgAdmin against the production database (idempotent).
+-- Values: 'pending' (spooled, upload queued), 'uploaded', 'failed'; NULL when no file
+-- was submitted through the upload pipeline (all residents created before this change).
+
+BEGIN;
+
+ALTER TABLE pg_resident ADD COLUMN IF NOT EXISTS photo_status VARCHAR(10) NULL;
+ALTER TABLE pg_resident ADD COLUMN IF NOT EXISTS aadhar_status VARCHAR(10) NULL;
+
+COMMIT;
@@ -0,0 +1,18 @@
+-- app_user.token_version: carried as the 'ver' claim of JWTs; bumped to revoke older tokens
+-- Date: 2026-10-17
+-- Safe to run in pgAdmin against the production database (idempotent).
+-- Tokens issued before this change carry no 'ver' claim and count as version 0,
+-- so they stay valid until the user's first password/role/property/status change.
+
+BEGIN;
+
+ALTER TABLE app_user ADD COLUMN IF NOT EXISTS token_version INTEGER NOT NULL DEFAULT 0;
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'app_user_token_version_check') THEN
+        ALTER TABLE app_user ADD CONSTRAINT app_user_token_version_check CHECK (token_version >= 0);
+    END IF;
+END $$;
+
+COMMIT;
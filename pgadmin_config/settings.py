@@ -1,6 +1,7 @@
 import os
 from pathlib import Path
 from decouple import config, Csv
+from django.core.exceptions import ImproperlyConfigured
 import dj_database_url
 import json
 import tempfile
@@ -134,6 +135,21 @@ AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator'},
 ]
 
+# ============================================================================
+# PASSWORD HASHING
+# ============================================================================
+# app_user hashes use PBKDF2 with PASSWORD_HASH_ITERATIONS iterations (core.hashers).
+# Hashes made with another iteration count or with the SHA1 variant below are
+# still accepted and are rehashed with the current settings on the next login.
+# Hashing runs in a pool of PASSWORD_HASH_THREADS threads per process (0 hashes
+# on the request thread).
+PASSWORD_HASH_ITERATIONS = config('PASSWORD_HASH_ITERATIONS', default=600000, cast=int)
+PASSWORD_HASH_THREADS = config('PASSWORD_HASH_THREADS', default=2, cast=int)
+PASSWORD_HASHERS = [
+    'core.hashers.TunablePBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+]
+
 # ============================================================================
 # INTERNATIONALIZATION
 # ============================================================================
@@ -233,6 +249,70 @@ else:
         }
     }
 
+# ============================================================================
+# CACHE
+# ============================================================================
+# Defaults to per-process memory. With several gunicorn workers, point this at a
+# shared backend, e.g. CACHE_BACKEND=django.core.cache.backends.db.DatabaseCache
+# with CACHE_LOCATION=pg_cache (then run `python manage.py createcachetable`).
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='pgadmin-default'),
+        'TIMEOUT': config('CACHE_TIMEOUT', default=300, cast=int),
+        'KEY_PREFIX': config('CACHE_KEY_PREFIX', default='pgadmin'),
+    }
+}
+
+# Closed-month finance aggregates never change unless a backdated write bumps them.
+# The bump only reaches other processes (workers, management commands such as
+# rebuild_finance_rollup) through a shared cache; with the per-process locmem
+# default another worker could serve a stale month until the entry expires, so
+# the timeout is cut to CACHE_TIMEOUT there.
+FINANCE_CLOSED_PERIOD_CACHE_TIMEOUT = config(
+    'FINANCE_CLOSED_PERIOD_CACHE_TIMEOUT',
+    default=CACHES['default']['TIMEOUT'] if 'locmem' in CACHES['default']['BACKEND'] else 30 * 24 * 3600,
+    cast=int,
+)
+
+# Home screen summary: fresh for HOME_SUMMARY_CACHE_TIMEOUT seconds unless a write
+# invalidates it, then servable (while refreshing in the background) for another
+# HOME_SUMMARY_STALE_TIMEOUT seconds when stale-while-revalidate is on
+HOME_SUMMARY_CACHE_TIMEOUT = config('HOME_SUMMARY_CACHE_TIMEOUT', default=900, cast=int)
+HOME_SUMMARY_STALE_TIMEOUT = config('HOME_SUMMARY_STALE_TIMEOUT', default=3600, cast=int)
+HOME_SUMMARY_STALE_WHILE_REVALIDATE = config('HOME_SUMMARY_STALE_WHILE_REVALIDATE', default=True, cast=bool)
+HOME_SUMMARY_REFRESH_LOCK_TIMEOUT = config('HOME_SUMMARY_REFRESH_LOCK_TIMEOUT', default=120, cast=int)
+
+# Single-flight coalescing of expensive per-property endpoints. Sharing results
+# across workers needs a cache every worker can see, so it defaults to off with
+# the per-process LocMemCache
+SINGLE_FLIGHT_ACROSS_WORKERS = config(
+    'SINGLE_FLIGHT_ACROSS_WORKERS',
+    default='locmem' not in CACHES['default']['BACKEND'],
+    cast=bool,
+)
+SINGLE_FLIGHT_WAIT_TIMEOUT = config('SINGLE_FLIGHT_WAIT_TIMEOUT', default=30, cast=int)
+SINGLE_FLIGHT_RESULT_TIMEOUT = config('SINGLE_FLIGHT_RESULT_TIMEOUT', default=10, cast=int)
+
+# JWT authentication (core.auth). Users resolved from tokens are cached per process
+# for AUTH_USER_CACHE_TTL seconds (0 disables the cache). Token revocation (a bump
+# of User.token_version) evicts the entry in the worker that made the change at
+# once; other workers see it through the shared cache when AUTH_SHARED_TOKEN_VERSIONS
+# is on (default with a shared cache backend), else within AUTH_USER_CACHE_TTL.
+# AUTH_STATELESS=True skips the user lookup entirely and builds the principal
+# from the token claims; revocations and deletions are then only seen through
+# the shared token versions, so it requires AUTH_SHARED_TOKEN_VERSIONS.
+AUTH_USER_CACHE_TTL = config('AUTH_USER_CACHE_TTL', default=60, cast=int)
+AUTH_USER_CACHE_SIZE = config('AUTH_USER_CACHE_SIZE', default=1024, cast=int)
+AUTH_SHARED_TOKEN_VERSIONS = config(
+    'AUTH_SHARED_TOKEN_VERSIONS',
+    default='locmem' not in CACHES['default']['BACKEND'],
+    cast=bool,
+)
+AUTH_STATELESS = config('AUTH_STATELESS', default=False, cast=bool)
+if AUTH_STATELESS and not AUTH_SHARED_TOKEN_VERSIONS:
+    raise ImproperlyConfigured('AUTH_STATELESS requires AUTH_SHARED_TOKEN_VERSIONS (and a shared cache backend)')
+
 # ============================================================================
 # STATIC FILES
 # ============================================================================
@@ -290,6 +370,42 @@ GCS_BUCKET = os.environ.get('GCS_BUCKET') or config('GCS_BUCKET', default=None)
 GCS_UPLOAD_PREFIX = os.environ.get('GCS_UPLOAD_PREFIX') or config('GCS_UPLOAD_PREFIX', default='properties')
 GOOGLE_CLOUD_PROJECT = os.environ.get('GOOGLE_CLOUD_PROJECT') or config('GOOGLE_CLOUD_PROJECT', default=None)
 
+# Resident media and expense receipt storage (properties.storage): 'gcs' uses
+# GCS_BUCKET through one shared client per process whose HTTP pool keeps up to
+# MEDIA_STORAGE_POOL_SIZE connections; 'local' keeps objects under
+# MEDIA_STORAGE_ROOT laid out like the bucket (tests, offline load tests).
+# The media proxy streams objects in MEDIA_CHUNK_SIZE chunks and can keep recently
+# viewed ones in an on-disk LRU cache of MEDIA_CACHE_MAX_BYTES (0, the default,
+# disables it); cached objects are revalidated against the storage after
+# MEDIA_CACHE_TTL seconds. Size the cache against the instance's memory where the
+# filesystem is RAM-backed: on Cloud Run MEDIA_CACHE_DIR (under /tmp) counts
+# against the memory limit, so keep it to a small fraction of it (e.g. 32 MiB of
+# 512Mi) or point MEDIA_CACHE_DIR at a real disk.
+MEDIA_STORAGE = config('MEDIA_STORAGE', default='gcs')
+MEDIA_STORAGE_POOL_SIZE = config('MEDIA_STORAGE_POOL_SIZE', default=10, cast=int)
+MEDIA_STORAGE_ROOT = config('MEDIA_STORAGE_ROOT', default=str(BASE_DIR / 'media_store'))
+MEDIA_CHUNK_SIZE = config('MEDIA_CHUNK_SIZE', default=256 * 1024, cast=int)
+MEDIA_CACHE_DIR = config('MEDIA_CACHE_DIR', default=os.path.join(tempfile.gettempdir(), 'pgadmin-media-cache'))
+MEDIA_CACHE_MAX_BYTES = config('MEDIA_CACHE_MAX_BYTES', default=0, cast=int)
+MEDIA_CACHE_MAX_OBJECT_BYTES = config('MEDIA_CACHE_MAX_OBJECT_BYTES', default=4 * 1024 * 1024, cast=int)
+MEDIA_CACHE_TTL = config('MEDIA_CACHE_TTL', default=300, cast=int)
+
+# Resident photo/aadhar uploads (properties.upload_utils) are spooled to
+# MEDIA_SPOOL_DIR and uploaded after the response by MEDIA_UPLOAD_THREADS
+# background threads per process (0 uploads inside the request). Failed uploads
+# are retried MEDIA_UPLOAD_RETRIES times, backing off from MEDIA_UPLOAD_RETRY_DELAY
+# seconds; uploads still pending after MEDIA_UPLOAD_TIMEOUT seconds with no
+# spooled file are marked failed at startup (resume_media_uploads).
+# Background threads need CPU after the response: on Cloud Run (K_SERVICE set)
+# they default to 0 unless the service is deployed with --no-cpu-throttling and
+# MEDIA_UPLOAD_THREADS is set explicitly. Cloud Run's /tmp is in-memory, so the
+# spool also counts against the instance's memory limit.
+MEDIA_SPOOL_DIR = config('MEDIA_SPOOL_DIR', default=os.path.join(tempfile.gettempdir(), 'pgadmin-media-spool'))
+MEDIA_UPLOAD_THREADS = config('MEDIA_UPLOAD_THREADS', default=0 if os.environ.get('K_SERVICE') else 2, cast=int)
+MEDIA_UPLOAD_TIMEOUT = config('MEDIA_UPLOAD_TIMEOUT', default=3600, cast=int)
+MEDIA_UPLOAD_RETRIES = config('MEDIA_UPLOAD_RETRIES', default=3, cast=int)
+MEDIA_UPLOAD_RETRY_DELAY = config('MEDIA_UPLOAD_RETRY_DELAY', default=2.0, cast=float)
+
 # Note: MIDDLEWARE is already defined above with the full stack including
 # SecurityMiddleware, WhiteNoiseMiddleware, SessionMiddleware, CorsMiddleware,
 # CommonMiddleware, CsrfViewMiddleware, AuthenticationMiddleware, MessageMiddleware,
@@ -4,7 +4,7 @@ URL configuration for pgadmin_config project.
 from django.contrib import admin
 from django.urls import path, include
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
-from properties.views_health import health_check, ready_check
+from properties.views_health import health_check, ready_check, storage_metrics_check
 
 urlpatterns = [
     # Health checks for Cloud Run / Railway
@@ -12,6 +12,7 @@ urlpatterns = [
     path('ready/', ready_check, name='ready'),
     path('api/health/', health_check, name='api_health'),
     path('api/ready/', ready_check, name='api_ready'),
+    path('api/health/storage/', storage_metrics_check, name='api_health_storage'),
     
     # Admin
     path('admin/', admin.site.urls),
@@ -0,0 +1,225 @@
+"""
+Billing Cycle Utilities
+
+Materializes rent as BillingCharge rows, one per resident per billing cycle, so
+"who is overdue" is an indexed query (due_date < today AND NOT is_paid) instead
+of replaying each resident's rent rules in Python.
+
+Cycles start on joining_date and repeat every day / 7 days / 14 days, or every
+month on the joining day (clamped to the month's length, as in the checkout
+breakdown). Each cycle charges the full rent. Its due_date is the last day it
+can be paid before the rent policy counts it as overdue (see
+RentPolicy.charge_due_date): the end of the cycle for weekly / bi-weekly rent,
+the third day for daily rent, and the end of the calendar month the cycle
+starts in for monthly rent. Cycles are generated once they have started and
+stop at move_out_date.
+
+Payments are allocated oldest cycle first, after arrears: a charge is paid once
+the resident's payments to date (from the resident ledger) cover the arrears and
+every charge up to and including it. The allocation is refreshed for a resident
+whenever a payment or the arrears change (see properties.signals) and after
+charges are generated. A change of rent terms regenerates the resident's
+charges (regenerate_charges).
+"""
+
+from datetime import date, timedelta
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from .models import Resident, BillingCharge, ResidentLedger
+from .ledger_utils import post_rent_accruals_batch
+from .payment_utils import _add_months_keep_day, rent_policy
+
+
+DEFAULT_BATCH_SIZE = 500
+
+# Cycle length in days for the fixed-length rent types
+CYCLE_DAYS = {
+    'daily': 1,
+    'weekly': 7,
+    'bi-weekly': 14,
+}
+
+
+def cycle_bounds(resident: Resident, cycle_number: int) -> tuple:
+    """
+    First and last day of a billing cycle.
+
+    Args:
+        resident: Resident instance with a joining_date
+        cycle_number: 0 for the cycle starting on joining_date
+
+    Returns:
+        tuple: (cycle_start, cycle_end)
+    """
+    joining_date = resident.joining_date
+    if resident.rent_type == 'monthly':
+        start = _add_months_keep_day(joining_date, cycle_number)
+        end = _add_months_keep_day(joining_date, cycle_number + 1) - timedelta(days=1)
+        return start, end
+    length = CYCLE_DAYS.get(resident.rent_type, 1)
+    start = joining_date + timedelta(days=length * cycle_number)
+    return start, start + timedelta(days=length - 1)
+
+
+def pending_charges(resident: Resident, last_cycle_number: int = None, as_of_date: date = None) -> list:
+    """
+    Unsaved charges for the cycles after last_cycle_number that have started by as_of_date.
+
+    Args:
+        resident: Resident instance
+        last_cycle_number: Highest cycle already generated (None if none)
+        as_of_date: Generate cycles starting on or before this date (defaults to today)
+
+    Returns:
+        list: BillingCharge instances
+    """
+    as_of_date = as_of_date or timezone.now().date()
+    if not resident.joining_date:
+        return []
+    through = as_of_date
+    if resident.move_out_date:
+        through = min(through, resident.move_out_date)
+
+    policy = rent_policy(resident.rent_type)
+    charges = []
+    cycle_number = 0 if last_cycle_number is None else last_cycle_number + 1
+    while True:
+        start, end = cycle_bounds(resident, cycle_number)
+        if start > through:
+            break
+        charges.append(BillingCharge(
+            property_id=resident.property_id,
+            resident_id=resident.id,
+            cycle_number=cycle_number,
+            cycle_start=start,
+            cycle_end=end,
+            due_date=policy.charge_due_date(start, end),
+            amount=resident.rent,
+        ))
+        cycle_number += 1
+    return charges
+
+
+def allocate_payments(resident_ids) -> int:
+    """
+    Recompute amount_paid/is_paid of the charges of the given residents in one statement.
+
+    Returns:
+        int: Number of charges whose allocation changed
+    """
+    resident_ids = list(resident_ids)
+    if not resident_ids:
+        return 0
+    charges = connection.ops.quote_name(BillingCharge._meta.db_table)
+    ledger = connection.ops.quote_name(ResidentLedger._meta.db_table)
+    residents = connection.ops.quote_name(Resident._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'WITH credit AS ('
+            f'  SELECT r.id AS resident_id, GREATEST(COALESCE(('
+            f'    SELECT l.total_paid FROM {ledger} l WHERE l.resident_id = r.id'
+            f'    ORDER BY l.entry_date DESC, l.id DESC LIMIT 1'
+            f'  ), 0) - GREATEST(r.arrears, 0), 0) AS available'
+            f'  FROM {residents} r WHERE r.id = ANY(%s)'
+            f'), running AS ('
+            f'  SELECT c.id, c.amount, credit.available,'
+            f'    SUM(c.amount) OVER (PARTITION BY c.resident_id ORDER BY c.cycle_start, c.id) AS cumulative'
+            f'  FROM {charges} c JOIN credit ON credit.resident_id = c.resident_id'
+            f'), allocation AS ('
+            f'  SELECT id, LEAST(amount, GREATEST(available - (cumulative - amount), 0)) AS paid,'
+            f'    available >= cumulative AS settled'
+            f'  FROM running'
+            f') '
+            f'UPDATE {charges} AS c SET amount_paid = a.paid, is_paid = a.settled '
+            f'FROM allocation a '
+            f'WHERE c.id = a.id AND (c.amount_paid, c.is_paid) IS DISTINCT FROM (a.paid, a.settled)',
+            [resident_ids],
+        )
+        return cursor.rowcount
+
+
+def regenerate_charges(resident: Resident, as_of_date: date = None) -> int:
+    """
+    Replace a resident's charges after its rent terms changed.
+
+    Charges hold the rent and cycle layout they were generated with, so every
+    charge of the resident is dropped and the started cycles are generated again
+    from the current terms (up to move_out_date), then payments are re-allocated.
+    Residents the billing job does not cover (inactive and not moved out) are
+    left without charges.
+
+    Returns:
+        int: Number of charges created
+    """
+    with transaction.atomic():
+        BillingCharge.objects.filter(resident_id=resident.id).delete()
+        charges = []
+        if resident.is_active or resident.move_out_date:
+            charges = pending_charges(resident, None, as_of_date)
+            BillingCharge.objects.bulk_create(charges, batch_size=1000)
+        allocate_payments([resident.id])
+    return len(charges)
+
+
+def generate_charges(as_of_date: date = None, resident_ids=None, after_resident_id: int = None,
+                     batch_size: int = DEFAULT_BATCH_SIZE, on_batch=None) -> dict:
+    """
+    Generate the charges of every started cycle that is not in pg_billing_charge yet,
+    and post the residents' closed-month rent to the ledger (post_rent_accruals_batch).
+
+    Active residents are processed in id order, one transaction per batch. Each
+    resident continues after its highest generated cycle and the insert ignores
+    existing (resident, cycle_number) rows, so re-running (also after an
+    interruption, or concurrently) never duplicates a charge.
+
+    Args:
+        as_of_date: Generate cycles starting on or before this date (defaults to today)
+        resident_ids: Limit to these residents (all active residents when None)
+        after_resident_id: Skip residents with an id up to this one (resume point)
+        batch_size: Residents per transaction
+        on_batch: Optional callable(last_resident_id, charges_created) run after each batch
+
+    Returns:
+        dict: {'residents': n, 'charges': n}
+    """
+    as_of_date = as_of_date or timezone.now().date()
+    residents = Resident.objects.filter(is_active=True, joining_date__lte=as_of_date).order_by('id')
+    if resident_ids is not None:
+        residents = residents.filter(id__in=resident_ids)
+    if after_resident_id is not None:
+        residents = residents.filter(id__gt=after_resident_id)
+    ids = list(residents.values_list('id', flat=True))
+
+    created = 0
+    for start in range(0, len(ids), batch_size):
+        batch_ids = ids[start:start + batch_size]
+        with transaction.atomic():
+            last_cycles = dict(
+                BillingCharge.objects
+                .filter(resident_id__in=batch_ids)
+                .values('resident_id')
+                .annotate(last=Max('cycle_number'))
+                .values_list('resident_id', 'last')
+                .order_by()
+            )
+            residents = list(Resident.objects.filter(id__in=batch_ids).order_by('id'))
+            charges = []
+            for resident in residents:
+                charges.extend(pending_charges(resident, last_cycles.get(resident.id), as_of_date))
+            batch_created = len(BillingCharge.objects.bulk_create(charges, batch_size=1000, ignore_conflicts=True))
+            post_rent_accruals_batch(residents, as_of_date)
+            allocate_payments(batch_ids)
+        created += batch_created
+        if on_batch is not None:
+            on_batch(batch_ids[-1], batch_created)
+    return {'residents': len(ids), 'charges': created}
+
+
+def overdue_charges(as_of_date: date = None, property_id=None):
+    """Unpaid charges overdue on as_of_date, i.e. due before it (served by the partial due_date indexes)."""
+    as_of_date = as_of_date or timezone.now().date()
+    queryset = BillingCharge.objects.filter(is_paid=False, due_date__lt=as_of_date)
+    if property_id is not None:
+        queryset = queryset.filter(property_id=property_id)
+    return queryset
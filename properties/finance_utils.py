@@ -0,0 +1,181 @@
+"""
+Finance Report Utilities
+
+Finance reports read FinanceMonthlyRollup (see rollup_utils) rather than raw
+payment/expense rows, so their cost depends on the number of months reported, not
+on the number of payments. Months that have ended come from the closed-period
+cache (see period_cache); only the open month is aggregated on every call. Sums
+stay Decimal until the response is assembled.
+"""
+
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+from django.db.models import Sum, Count, Q
+from django.utils import timezone
+from .models import Property, Resident, FinanceMonthlyRollup
+from .rollup_utils import PAYMENT, EXPENSE
+from .period_cache import get_closed_months, is_closed
+
+
+DEFAULT_SUMMARY_YEARS = 5
+MAX_SUMMARY_YEARS = 20
+TOP_CATEGORIES = 5
+
+
+def rollup_totals(source: str, since: date = None, property_id: int = None) -> dict:
+    """
+    Total amount and row count of payments or expenses from the rollup.
+
+    Args:
+        source: PAYMENT or EXPENSE
+        since: Only count months from this date's month onwards
+        property_id: Limit to one property (all properties when None)
+
+    Returns:
+        dict: {'total': Decimal or None, 'count': int or None}
+    """
+    rows = FinanceMonthlyRollup.objects.filter(source=source)
+    if property_id is not None:
+        rows = rows.filter(property_id=property_id)
+    if since is not None:
+        rows = rows.filter(Q(year__gt=since.year) | Q(year=since.year, month__gte=since.month))
+    return rows.aggregate(total=Sum('total'), count=Sum('count'))
+
+
+def expense_totals_by_category(property_id: int = None) -> list:
+    """[{'category', 'total', 'count'}, ...] across all months, largest first."""
+    rows = FinanceMonthlyRollup.objects.filter(source=EXPENSE, count__gt=0)
+    if property_id is not None:
+        rows = rows.filter(property_id=property_id)
+    return list(
+        rows.values('category')
+        .annotate(total=Sum('total'), count=Sum('count'))
+        .order_by('-total', 'category')
+    )
+
+
+def _monthly_aggregates(property_id: int, years) -> dict:
+    """
+    {(year, month): {'income', 'expenses', 'categories': {category: total}}} from the
+    rollup, for months with any activity in the given years.
+    """
+    months = {}
+    rollups = (
+        FinanceMonthlyRollup.objects
+        .filter(property_id=property_id, year__in=list(years), count__gt=0)
+        .values_list('year', 'month', 'source', 'category', 'total')
+        .order_by()
+    )
+    for year, month, source, category, total in rollups:
+        agg = months.setdefault((year, month), {'income': Decimal('0'), 'expenses': Decimal('0'), 'categories': {}})
+        if source == PAYMENT:
+            agg['income'] += total
+        else:
+            agg['expenses'] += total
+            agg['categories'][category] = agg['categories'].get(category, Decimal('0')) + total
+    return months
+
+
+def build_financial_summary(property_obj: Property, years: int = DEFAULT_SUMMARY_YEARS, today: date = None) -> dict:
+    """
+    Financial summary for the last `years` calendar years (current year first).
+
+    Queries (independent of the number of years):
+    1. Rollup rows for the open month(s), plus any closed months not cached yet
+    2. Residents joined / moved out per year
+
+    Args:
+        property_obj: Property instance
+        years: Number of calendar years to report, including the current one
+        today: Reference date (defaults to today)
+
+    Returns:
+        dict: {'property': {...}, 'years': [...]} in the financial_summary response shape
+    """
+    today = today or timezone.localdate()
+    current_year = today.year
+    year_list = [current_year - i for i in range(0, years)]
+    first_year = year_list[-1]
+
+    all_months = [(y, m) for y in year_list for m in range(1, 13)]
+    closed = [ym for ym in all_months if is_closed(*ym, today=today)]
+    open_months = [ym for ym in all_months if not is_closed(*ym, today=today)]
+
+    # Open months are always read live; closed months only when not cached.
+    # Both come from a single rollup query.
+    live = None
+
+    def compute(missing):
+        nonlocal live
+        live = _monthly_aggregates(property_obj.id, {y for y, _ in missing} | {current_year})
+        return {ym: live.get(ym) for ym in missing}
+
+    monthly = get_closed_months(property_obj.id, closed, compute)
+    if live is None:
+        live = _monthly_aggregates(property_obj.id, {current_year})
+    monthly.update({ym: live.get(ym) for ym in open_months})
+
+    empty = {'income': Decimal('0'), 'expenses': Decimal('0'), 'categories': {}}
+    income, expenses = {}, {}
+    categories = defaultdict(lambda: defaultdict(Decimal))
+    for (year, month), agg in monthly.items():
+        agg = agg or empty
+        income[(year, month)] = agg['income']
+        expenses[(year, month)] = agg['expenses']
+        for category, total in agg['categories'].items():
+            categories[year][category] += total
+
+    # Joined / moved-out counts for every year in one aggregate
+    resident_counts = {}
+    for year in year_list:
+        year_range = (date(year, 1, 1), date(year, 12, 31))
+        resident_counts[f'joined_{year}'] = Count('id', filter=Q(joining_date__range=year_range))
+        resident_counts[f'moved_out_{year}'] = Count('id', filter=Q(move_out_date__range=year_range))
+    resident_stats = (
+        Resident.objects
+        .filter(property=property_obj)
+        .filter(
+            Q(joining_date__range=(date(first_year, 1, 1), date(current_year, 12, 31)))
+            | Q(move_out_date__range=(date(first_year, 1, 1), date(current_year, 12, 31)))
+        )
+        .aggregate(**resident_counts)
+    )
+
+    results = []
+    for year in year_list:
+        income_by_month = [income.get((year, m), Decimal('0')) for m in range(1, 13)]
+        expense_by_month = [expenses.get((year, m), Decimal('0')) for m in range(1, 13)]
+        total_income = float(sum(income_by_month))
+        total_expenses = float(sum(expense_by_month))
+
+        results.append({
+            'year': year,
+            'monthly': {
+                'income': [float(v) for v in income_by_month],
+                'expenses': [float(v) for v in expense_by_month],
+            },
+            'totals': {
+                'income': total_income,
+                'expenses': total_expenses,
+                'net': round(total_income - total_expenses, 2),
+            },
+            'top_spendings': {
+                'categories': [
+                    {'category': category, 'total': float(total)}
+                    for category, total in sorted(categories[year].items(), key=lambda c: -c[1])[:TOP_CATEGORIES]
+                ],
+            },
+            'residents': {
+                'joined': resident_stats[f'joined_{year}'],
+                'moved_out': resident_stats[f'moved_out_{year}'],
+            },
+        })
+
+    return {
+        'property': {
+            'id': property_obj.id,
+            'name': property_obj.name,
+        },
+        'years': results,
+    }
@@ -0,0 +1,274 @@
+"""
+Home Screen Summary
+
+build_home_summary() computes the landing-screen payload of a property: bed
+counts plus the residents that are overdue or coming due, each serialized with
+ResidentSerializer. get_home_summary() serves it from the cache.
+
+Each property has a version token in the cache. Writes that change the summary
+(Payment, Resident, Occupancy and structure changes, see properties.signals)
+replace the token after their transaction commits. A cached summary is fresh
+while it was computed for today, under the current token, and within
+HOME_SUMMARY_CACHE_TIMEOUT seconds. A stale summary stays servable for another
+HOME_SUMMARY_STALE_TIMEOUT seconds: with HOME_SUMMARY_STALE_WHILE_REVALIDATE on,
+it is returned immediately while one background thread recomputes it.
+"""
+
+import logging
+import threading
+import time
+import uuid
+from decimal import Decimal
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils import timezone
+from .models import Resident, Occupancy, Bed
+from .single_flight import single_flight, flight_key
+
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = 'home_summary'
+
+# How get_home_summary() answered, reported in the X-Home-Summary-Cache header
+HIT = 'hit'
+STALE = 'stale'
+MISS = 'miss'
+
+
+def build_home_summary(property_obj, today) -> dict:
+    """
+    Compute the home screen summary of a property.
+
+    Args:
+        property_obj: Property instance
+        today: Date the dues are calculated for
+
+    Returns:
+        dict: {'property', 'occupied_beds', 'available_beds', 'overdue', 'due'}
+    """
+    from .serializers import ResidentSerializer
+    from .payment_utils import calculate_dues_for_residents
+
+    # Get all active residents with active occupancy (not moved out)
+    residents = list(ResidentSerializer.setup_eager_loading(Resident.objects.filter(
+        property=property_obj,
+        is_active=True,
+        move_out_date__isnull=True,
+    )))
+    # One ledger query for every resident; the serializer reads the same snapshots
+    due_summaries = calculate_dues_for_residents(residents, today)
+    serializer_context = {'due_summaries': due_summaries}
+
+    overdue_details = []  # Residents with overdue payments
+    due_details = []      # Residents with due or upcoming due payments (not yet overdue)
+    overdue_total_amount = Decimal(0)
+    due_total_amount = Decimal(0)
+
+    for resident in residents:
+        if not resident.is_active or not resident.joining_date:
+            continue
+
+        snapshot = due_summaries[resident.id]
+        due_amount = snapshot.due
+
+        # Skip residents with no due amount at all
+        if due_amount <= 0:
+            continue
+
+        resident_data = ResidentSerializer(resident, context=serializer_context).data
+        resident_data['due_amount'] = str(due_amount.quantize(Decimal('0.01')))
+
+        # Check if overdue
+        if snapshot.is_overdue:
+            # Overdue: has due amount and payment date has passed
+            overdue_details.append(resident_data)
+            overdue_total_amount += due_amount
+        else:
+            # Not yet overdue - check if due soon or upcoming
+            # For DAILY residents: due if 0+ days have passed (same day onwards)
+            # For WEEKLY residents: due if approaching end of week
+            # For MONTHLY residents: due if payment date approaching OR has arrears
+
+            should_add_to_due = False
+            add_due_amount = due_amount if due_amount > 0 else Decimal(0)
+
+            if resident.rent_type == 'daily':
+                # Daily: show as DUE if joined today or earlier (any accumulated rent)
+                if resident.joining_date and resident.joining_date <= today:
+                    should_add_to_due = True
+                    add_due_amount = due_amount
+
+            elif resident.rent_type == 'weekly':
+                # Weekly: show as DUE if approaching a week (5+ days in)
+                if resident.joining_date:
+                    days_since_joining = (today - resident.joining_date).days
+                    week_position = days_since_joining % 7
+                    # Show as due if in last 2 days of week (days 5-6 out of 0-6)
+                    if week_position >= 5:
+                        should_add_to_due = True
+                        add_due_amount = due_amount
+
+            elif resident.rent_type == 'bi-weekly':
+                # Bi-weekly: show as DUE if approaching payment (11+ days in)
+                if resident.joining_date:
+                    days_since_joining = (today - resident.joining_date).days
+                    biweek_position = days_since_joining % 14
+                    # Show as due if in last 3 days of bi-weekly period
+                    if biweek_position >= 11:
+                        should_add_to_due = True
+                        add_due_amount = due_amount
+
+            elif resident.rent_type == 'monthly':
+                # Monthly: show as DUE if:
+                # 1. Next billing date is approaching (within 5 days), OR
+                # 2. Has arrears (even if no rent accrued yet)
+                has_arrears = Decimal(resident.arrears or 0) > 0
+                next_bill = snapshot.next_billing_date
+
+                if next_bill:
+                    delta_days = (next_bill - today).days
+                    # Show if next billing date is within 5 days forward or 1 day past
+                    is_billing_soon = -1 <= delta_days <= 5
+                else:
+                    is_billing_soon = False
+
+                # Show as DUE if billing is approaching OR has arrears
+                if is_billing_soon or has_arrears:
+                    should_add_to_due = True
+                    add_due_amount = due_amount
+
+            if should_add_to_due:
+                due_details.append(resident_data)
+                due_total_amount += add_due_amount
+
+    # Beds summary
+    occupied_beds = Occupancy.objects.filter(property=property_obj, is_occupied=True).count()
+    # 'available' should reflect total beds in the property
+    available_beds = Bed.objects.filter(room__floor__property=property_obj).count()
+
+    return {
+        'property': {
+            'id': property_obj.id,
+            'name': property_obj.name,
+        },
+        'occupied_beds': occupied_beds,
+        'available_beds': available_beds,
+        'overdue': {
+            'count': len(overdue_details),
+            'total_amount': str(overdue_total_amount.quantize(Decimal('0.01'))),
+            'details': overdue_details,
+        },
+        'due': {
+            'count': len(due_details),
+            'total_amount': str(due_total_amount.quantize(Decimal('0.01'))),
+            'details': due_details,
+        },
+    }
+
+
+def _version_key(property_id):
+    return f'{CACHE_PREFIX}:version:{property_id}'
+
+
+def _data_key(property_id):
+    return f'{CACHE_PREFIX}:{property_id}'
+
+
+def _refresh_lock_key(property_id):
+    return f'{CACHE_PREFIX}:refreshing:{property_id}'
+
+
+def _current_version(property_id) -> str:
+    key = _version_key(property_id)
+    version = cache.get(key)
+    if version is None:
+        # Random tokens rather than counters: an evicted token can never be
+        # re-created with a value an older entry was stored under
+        cache.add(key, uuid.uuid4().hex, timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def _compute_and_store(property_obj, today) -> dict:
+    version = _current_version(property_obj.id)
+    # Concurrent misses (e.g. every phone at shift change) share one computation.
+    # The version is part of the key, so a request that arrives after a write
+    # never joins a computation that started before it
+    data = single_flight(
+        flight_key('home_summary', property_obj.id, today, version),
+        lambda: build_home_summary(property_obj, today),
+    )
+    # Stored under the token read before computing: a write that lands meanwhile
+    # leaves this entry stale rather than hiding its own change
+    cache.set(
+        _data_key(property_obj.id),
+        {'date': today, 'version': version, 'computed_at': time.time(), 'data': data},
+        timeout=settings.HOME_SUMMARY_CACHE_TIMEOUT + settings.HOME_SUMMARY_STALE_TIMEOUT,
+    )
+    return data
+
+
+def _start_background(target) -> None:
+    threading.Thread(target=target, daemon=True).start()
+
+
+def _refresh_in_background(property_obj, today) -> None:
+    """Recompute the summary off the request thread, at most once per property at a time."""
+    lock_key = _refresh_lock_key(property_obj.id)
+    if not cache.add(lock_key, 1, timeout=settings.HOME_SUMMARY_REFRESH_LOCK_TIMEOUT):
+        return
+
+    def refresh():
+        try:
+            _compute_and_store(property_obj, today)
+        except Exception:
+            logger.exception('Background home summary refresh failed for property %s', property_obj.id)
+        finally:
+            cache.delete(lock_key)
+            connection.close()
+
+    _start_background(refresh)
+
+
+def get_home_summary(property_obj, today=None, refresh: bool = False) -> tuple:
+    """
+    Home screen summary of a property, served from the cache when possible.
+
+    Args:
+        property_obj: Property instance
+        today: Date the dues are calculated for (defaults to today)
+        refresh: Recompute synchronously regardless of the cache
+
+    Returns:
+        tuple: (summary dict, HIT / STALE / MISS)
+    """
+    today = today or timezone.now().date()
+    if refresh:
+        return _compute_and_store(property_obj, today), MISS
+
+    entry = cache.get(_data_key(property_obj.id))
+    if entry is None:
+        return _compute_and_store(property_obj, today), MISS
+
+    fresh = (
+        entry['date'] == today
+        and entry['version'] == _current_version(property_obj.id)
+        and time.time() - entry['computed_at'] < settings.HOME_SUMMARY_CACHE_TIMEOUT
+    )
+    if fresh:
+        return entry['data'], HIT
+    if settings.HOME_SUMMARY_STALE_WHILE_REVALIDATE:
+        _refresh_in_background(property_obj, today)
+        return entry['data'], STALE
+    return _compute_and_store(property_obj, today), MISS
+
+
+def invalidate_home_summary(property_id) -> None:
+    """Mark the cached summary of a property stale once the current transaction commits."""
+    if property_id is None:
+        return
+    transaction.on_commit(
+        lambda: cache.set(_version_key(property_id), uuid.uuid4().hex, timeout=None)
+    )
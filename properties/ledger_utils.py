@@ -0,0 +1,544 @@
+"""
+Resident Ledger Utilities
+
+Maintains ResidentLedger: one row per charge (rent accrual, arrears, adjustment)
+or credit (payment) of a resident. Each row also stores the running balance and the
+running payment total after it, in (entry_date, id) order. So "paid up to date D"
+and "balance on date D" are single index lookups on (resident, entry_date, id)
+instead of a SUM over the resident's payments.
+
+Single writes (post_entry / remove_entry) lock the resident row, insert or delete
+the entry and shift the running totals of the later entries with one UPDATE. Bulk
+writes (rent accruals, rebuilds) insert rows and then recompute the running totals
+with one window-function UPDATE per batch of residents.
+
+Payment and arrears entries are kept current by the signal handlers in
+properties.signals. A rent entry is posted for each calendar month once the month
+has closed, by the daily billing run (generate_billing_charges, see
+post_rent_accruals_batch) or rebuild_ledger. Reads never write: the statement
+adds the closed months that are not posted yet on the fly. Payments written without signals
+(bulk_create, QuerySet.update, raw SQL) must be followed by rebuild_ledger() for
+the affected residents.
+"""
+
+import calendar
+from datetime import date, timedelta
+from decimal import Decimal
+from django.db import connection, transaction
+from django.db.models import F, Max, Q, Subquery, OuterRef, Value, DateField
+from django.db.models.functions import Coalesce, Least
+from django.utils import timezone
+from .models import Resident, Payment, ResidentLedger
+
+
+RENT = 'rent'
+ARREARS = 'arrears'
+ADJUSTMENT = 'adjustment'
+PAYMENT = 'payment'
+
+REBUILD_BATCH_SIZE = 500
+DEFAULT_STATEMENT_MONTHS = 12
+MAX_STATEMENT_MONTHS = 60
+
+
+def _paid_delta(entry_type: str, amount: Decimal) -> Decimal:
+    """Change of the running payment total caused by an entry."""
+    return -amount if entry_type == PAYMENT else Decimal(0)
+
+
+def _lock_resident(resident_id) -> None:
+    """Serialize ledger writers of one resident on its pg_resident row."""
+    list(Resident.objects.select_for_update().filter(pk=resident_id).values_list('pk', flat=True))
+
+
+def _shift_later_entries(resident_id, entry_date: date, entry_id, amount: Decimal, paid_delta: Decimal) -> None:
+    ResidentLedger.objects.filter(
+        Q(entry_date__gt=entry_date) | Q(entry_date=entry_date, id__gt=entry_id),
+        resident_id=resident_id,
+    ).update(balance=F('balance') + amount, total_paid=F('total_paid') + paid_delta)
+
+
+def post_entry(resident_id, property_id, entry_type: str, entry_date: date, amount: Decimal, **fields) -> ResidentLedger:
+    """
+    Insert one ledger entry and move the running totals of the entries after it.
+
+    Args:
+        resident_id: Resident id
+        property_id: Property id
+        entry_type: RENT / ARREARS / ADJUSTMENT / PAYMENT
+        entry_date: Date the entry takes effect
+        amount: Positive for charges, negative for credits
+        **fields: Other ResidentLedger fields (payment, period_start, description, ...)
+
+    Returns:
+        ResidentLedger: The saved entry
+    """
+    amount = Decimal(amount)
+    paid_delta = _paid_delta(entry_type, amount)
+    with transaction.atomic():
+        _lock_resident(resident_id)
+        previous = (
+            ResidentLedger.objects
+            .filter(resident_id=resident_id, entry_date__lte=entry_date)
+            .order_by('-entry_date', '-id')
+            .values_list('balance', 'total_paid')
+            .first()
+        ) or (Decimal(0), Decimal(0))
+        entry = ResidentLedger.objects.create(
+            resident_id=resident_id,
+            property_id=property_id,
+            entry_type=entry_type,
+            entry_date=entry_date,
+            amount=amount,
+            balance=previous[0] + amount,
+            total_paid=previous[1] + paid_delta,
+            **fields,
+        )
+        _shift_later_entries(resident_id, entry_date, entry.id, amount, paid_delta)
+    return entry
+
+
+def remove_entry(entry: ResidentLedger) -> None:
+    """Delete one ledger entry and move the running totals of the entries after it back."""
+    with transaction.atomic():
+        _lock_resident(entry.resident_id)
+        entry_id = entry.id
+        entry.delete()
+        _shift_later_entries(
+            entry.resident_id, entry.entry_date, entry_id,
+            -entry.amount, -_paid_delta(entry.entry_type, entry.amount),
+        )
+
+
+def payment_entry_date(payment: Payment):
+    """Ledger date of a payment: its payment_date in the active timezone (as __date lookups see it)."""
+    # Values assigned by callers may still be strings until the instance is reloaded
+    when = Payment._meta.get_field('payment_date').to_python(payment.payment_date)
+    if when is None:
+        return None
+    if timezone.is_aware(when):
+        when = timezone.localtime(when)
+    return when.date()
+
+
+def record_payment(payment: Payment) -> set:
+    """
+    Create or move the ledger entry of a saved payment.
+
+    Returns:
+        set: Ids of the residents whose ledger changed
+    """
+    entry_date = payment_entry_date(payment)
+    amount = -Decimal(payment.amount)
+    changed = set()
+    existing = ResidentLedger.objects.filter(payment_id=payment.pk).first()
+    if existing is not None:
+        unchanged = (
+            existing.resident_id == payment.resident_id
+            and existing.property_id == payment.property_id
+            and existing.entry_date == entry_date
+            and existing.amount == amount
+        )
+        if unchanged:
+            return changed
+        remove_entry(existing)
+        changed.add(existing.resident_id)
+    if entry_date is not None:
+        post_entry(
+            payment.resident_id, payment.property_id, PAYMENT, entry_date, amount,
+            payment=payment, description=payment.payment_method or '',
+        )
+        changed.add(payment.resident_id)
+    return changed
+
+
+def forget_payment(payment: Payment) -> None:
+    """Remove the ledger entry of a payment that is about to be deleted."""
+    existing = ResidentLedger.objects.filter(payment_id=payment.pk).first()
+    if existing is not None:
+        remove_entry(existing)
+
+
+def record_arrears_change(resident: Resident, previous_arrears) -> None:
+    """Post the change of Resident.arrears as an arrears entry dated at joining."""
+    delta = Decimal(resident.arrears or 0) - Decimal(previous_arrears or 0)
+    if delta:
+        post_entry(
+            resident.id, resident.property_id, ARREARS,
+            resident.joining_date or timezone.now().date(), delta,
+            description='Arrears',
+        )
+
+
+# ----------------------------------------------------------------------------
+# Lookups
+# ----------------------------------------------------------------------------
+
+def _paid_till(bound):
+    return Subquery(
+        ResidentLedger.objects
+        .filter(resident=OuterRef('pk'), entry_date__lte=bound)
+        .order_by('-entry_date', '-id')
+        .values('total_paid')[:1]
+    )
+
+
+def paid_through(resident: Resident, day: date) -> Decimal:
+    """Payments of a resident dated on or before `day` (one index lookup)."""
+    total = (
+        ResidentLedger.objects
+        .filter(resident=resident, entry_date__lte=day)
+        .order_by('-entry_date', '-id')
+        .values_list('total_paid', flat=True)
+        .first()
+    )
+    return Decimal(total or 0)
+
+
+def annotate_paid_totals(queryset, as_of_date: date):
+    """
+    Annotate residents with `paid_till_period_end` (payments up to
+    min(move_out_date, as_of_date)) and `paid_till_date` (payments up to
+    as_of_date), with one index lookup each per resident. NULL when nothing was paid.
+    """
+    as_of = Value(as_of_date, output_field=DateField())
+    return queryset.annotate(
+        paid_till_date=_paid_till(as_of),
+        paid_till_period_end=_paid_till(Least(Coalesce(OuterRef('move_out_date'), as_of), as_of)),
+    )
+
+
+def paid_totals(resident_ids, as_of_date: date) -> dict:
+    """
+    Payments up to min(move_out_date, as_of_date) and up to as_of_date for many
+    residents, with one index lookup per resident.
+
+    Returns:
+        dict: resident_id -> (paid_till_period_end, paid_till_date)
+    """
+    rows = (
+        annotate_paid_totals(Resident.objects.filter(id__in=resident_ids), as_of_date)
+        .values_list('id', 'paid_till_period_end', 'paid_till_date')
+        .order_by()
+    )
+    return {
+        resident_id: (Decimal(till_end or 0), Decimal(till_date or 0))
+        for resident_id, till_end, till_date in rows
+    }
+
+
+# ----------------------------------------------------------------------------
+# Rent accruals
+# ----------------------------------------------------------------------------
+
+def _month_end(day: date) -> date:
+    return day.replace(day=calendar.monthrange(day.year, day.month)[1])
+
+
+def _charge_date(resident: Resident, period_end: date) -> date:
+    """Day the rent of a period ending on period_end is counted as accrued."""
+    # Monthly rent of a month is counted from the first day of the next month
+    # (see calculate_due_amount); the other types accrue day by day
+    return period_end + timedelta(days=1) if resident.rent_type == 'monthly' else period_end
+
+
+def rent_accrual_rows(resident: Resident, posted_through: date = None, as_of_date: date = None) -> list:
+    """
+    Unsaved rent entries for the closed calendar months after posted_through.
+
+    Each entry holds the rent accrued for one month, as calculate_due_amount counts it:
+    the difference of expected_rent_total between consecutive charge dates. Posting
+    stops at the month of move_out_date; months with nothing accrued are skipped.
+
+    Args:
+        resident: Resident instance
+        posted_through: period_end of the last posted rent entry (None if none yet)
+        as_of_date: Only months that ended before this date are posted (defaults to today)
+
+    Returns:
+        list: ResidentLedger instances (balances not set)
+    """
+    from .payment_utils import expected_rent_total
+
+    as_of_date = as_of_date or timezone.now().date()
+    if not resident.joining_date:
+        return []
+    last_closed = as_of_date.replace(day=1) - timedelta(days=1)
+    if resident.move_out_date:
+        last_closed = min(last_closed, _month_end(resident.move_out_date))
+
+    def accrued(day):
+        # Rounded totals make consecutive entries telescope to the rounded total,
+        # however the months are split between runs
+        return expected_rent_total(resident, day).quantize(Decimal('0.01'))
+
+    period_start = posted_through + timedelta(days=1) if posted_through else resident.joining_date
+    previous_total = accrued(_charge_date(resident, period_start - timedelta(days=1)))
+    rows = []
+    while period_start <= last_closed:
+        period_end = _month_end(period_start)
+        entry_date = _charge_date(resident, period_end)
+        total = accrued(entry_date)
+        amount = total - previous_total
+        if amount:
+            rows.append(ResidentLedger(
+                resident_id=resident.id,
+                property_id=resident.property_id,
+                entry_type=RENT,
+                entry_date=entry_date,
+                period_start=period_start,
+                period_end=period_end,
+                amount=amount,
+                description=f"{resident.rent_type.capitalize()} rent {period_start:%b %Y}",
+            ))
+        previous_total = total
+        period_start = period_end + timedelta(days=1)
+    return rows
+
+
+def _rent_posted_through(resident_ids) -> dict:
+    """{resident_id: period_end of the latest posted rent entry} for residents with any."""
+    return dict(
+        ResidentLedger.objects
+        .filter(resident_id__in=list(resident_ids), entry_type=RENT)
+        .values('resident_id')
+        .annotate(last=Max('period_end'))
+        .values_list('resident_id', 'last')
+        .order_by()
+    )
+
+
+def post_rent_accruals_batch(residents, as_of_date: date = None) -> int:
+    """
+    Post the rent entries of closed months that are not in the ledger yet, for a
+    batch of residents in one transaction.
+
+    Idempotent: each resident continues after its latest posted rent period.
+
+    Returns:
+        int: Number of entries posted
+    """
+    residents = list(residents)
+    resident_ids = sorted(resident.id for resident in residents)
+    with transaction.atomic():
+        list(Resident.objects.select_for_update().filter(pk__in=resident_ids).order_by('pk').values_list('pk', flat=True))
+        posted = _rent_posted_through(resident_ids)
+        rows = []
+        for resident in residents:
+            rows.extend(rent_accrual_rows(resident, posted.get(resident.id), as_of_date))
+        if rows:
+            ResidentLedger.objects.bulk_create(rows, batch_size=1000)
+            recompute_running_totals({row.resident_id for row in rows})
+    return len(rows)
+
+
+def post_rent_accruals(resident: Resident, as_of_date: date = None) -> int:
+    """Post the rent entries of one resident's closed months that are not in the ledger yet."""
+    return post_rent_accruals_batch([resident], as_of_date)
+
+
+def reset_rent_accruals(resident: Resident) -> None:
+    """Drop posted rent entries (after rent terms change) so they are re-posted on the next accrual run."""
+    with transaction.atomic():
+        _lock_resident(resident.id)
+        deleted, _ = ResidentLedger.objects.filter(resident=resident, entry_type=RENT).delete()
+        if deleted:
+            recompute_running_totals([resident.id])
+
+
+# ----------------------------------------------------------------------------
+# Bulk maintenance
+# ----------------------------------------------------------------------------
+
+def recompute_running_totals(resident_ids) -> int:
+    """
+    Recompute balance/total_paid of every entry of the given residents in one statement.
+
+    Returns:
+        int: Number of entries whose totals changed
+    """
+    resident_ids = list(resident_ids)
+    if not resident_ids:
+        return 0
+    table = connection.ops.quote_name(ResidentLedger._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'UPDATE {table} AS l SET balance = s.balance, total_paid = s.total_paid '
+            f'FROM ('
+            f'  SELECT id,'
+            f'    SUM(amount) OVER w AS balance,'
+            f"    SUM(CASE WHEN entry_type = %s THEN -amount ELSE 0 END) OVER w AS total_paid"
+            f'  FROM {table} WHERE resident_id = ANY(%s)'
+            f'  WINDOW w AS (PARTITION BY resident_id ORDER BY entry_date, id)'
+            f') AS s '
+            'WHERE l.id = s.id AND (l.balance, l.total_paid) IS DISTINCT FROM (s.balance, s.total_paid)',
+            [PAYMENT, resident_ids],
+        )
+        return cursor.rowcount
+
+
+def rebuild_ledger(resident_ids=None, as_of_date: date = None) -> int:
+    """
+    Rebuild ledger entries from residents and payments.
+
+    Residents are processed in batches of REBUILD_BATCH_SIZE, each in its own
+    transaction, so an interrupted rebuild can simply be run again.
+
+    Args:
+        resident_ids: Limit the rebuild to these residents (all when None)
+        as_of_date: Post rent for months closed before this date (defaults to today)
+
+    Returns:
+        int: Number of ledger entries written
+    """
+    residents = Resident.objects.order_by('id')
+    if resident_ids is not None:
+        residents = residents.filter(id__in=resident_ids)
+    ids = list(residents.values_list('id', flat=True))
+
+    written = 0
+    for start in range(0, len(ids), REBUILD_BATCH_SIZE):
+        batch_ids = ids[start:start + REBUILD_BATCH_SIZE]
+        with transaction.atomic():
+            batch = list(Resident.objects.select_for_update().filter(id__in=batch_ids))
+            ResidentLedger.objects.filter(resident_id__in=batch_ids).delete()
+
+            rows = []
+            for resident in batch:
+                if resident.arrears:
+                    rows.append(ResidentLedger(
+                        resident_id=resident.id, property_id=resident.property_id, entry_type=ARREARS,
+                        entry_date=resident.joining_date or timezone.now().date(),
+                        amount=resident.arrears, description='Arrears',
+                    ))
+                rows.extend(rent_accrual_rows(resident, None, as_of_date))
+            for payment in Payment.objects.filter(resident_id__in=batch_ids).only(
+                'id', 'resident_id', 'property_id', 'amount', 'payment_date', 'payment_method'
+            ):
+                rows.append(ResidentLedger(
+                    resident_id=payment.resident_id, property_id=payment.property_id, entry_type=PAYMENT,
+                    entry_date=payment_entry_date(payment), amount=-payment.amount,
+                    payment_id=payment.id, description=payment.payment_method or '',
+                ))
+
+            ResidentLedger.objects.bulk_create(rows, batch_size=1000)
+            recompute_running_totals(batch_ids)
+            written += len(rows)
+    return written
+
+
+# ----------------------------------------------------------------------------
+# Statement
+# ----------------------------------------------------------------------------
+
+def _money(value) -> str:
+    return str(Decimal(value).quantize(Decimal('0.01')))
+
+
+def build_statement(resident: Resident, months: int = DEFAULT_STATEMENT_MONTHS, today: date = None) -> dict:
+    """
+    Month-by-month statement of a resident's ledger.
+
+    Read-only: rent of closed months that the billing run has not posted yet is
+    added on the fly (entries with 'id': None) and shifts the balances after it,
+    as if it had been posted. The opening balance is read from the last entry
+    before the first month (running balance), so only the entries of the
+    requested months are loaded.
+
+    Args:
+        resident: Resident instance
+        months: Number of calendar months including the current one
+        today: Reference date (defaults to today)
+
+    Returns:
+        dict: {'resident_id', 'resident_name', 'from', 'to', 'opening_balance',
+               'closing_balance', 'unbilled_rent', 'months': [...]}
+    """
+    from .payment_utils import expected_rent_total
+
+    today = today or timezone.now().date()
+
+    month_index = today.year * 12 + today.month - 1 - (months - 1)
+    start = date(month_index // 12, month_index % 12 + 1, 1)
+
+    entries = ResidentLedger.objects.filter(resident=resident).order_by('-entry_date', '-id')
+    opening = entries.filter(entry_date__lt=start).values_list('balance', flat=True).first() or Decimal(0)
+    rows = list(entries.filter(entry_date__gte=start).order_by('entry_date', 'id'))
+    posted_through = _rent_posted_through([resident.id]).get(resident.id)
+    unposted = rent_accrual_rows(resident, posted_through, today)
+    if unposted:
+        posted_through = unposted[-1].period_end
+
+    # Unposted rent before the window moves the opening balance; the rest is merged
+    # in date order, after the posted entries of the same day (as posting would)
+    unposted_total = sum((row.amount for row in unposted if row.entry_date < start), Decimal(0))
+    opening = Decimal(opening) + unposted_total
+    merged = sorted(
+        [(row.entry_date, 0, row.id, row) for row in rows]
+        + [(row.entry_date, 1, n, row) for n, row in enumerate(unposted) if row.entry_date >= start],
+        key=lambda item: item[:3],
+    )
+
+    buckets = []
+    for offset in range(months):
+        y, m = divmod(month_index + offset, 12)
+        buckets.append({'year': y, 'month': m + 1, 'charges': Decimal(0), 'credits': Decimal(0), 'entries': []})
+    by_month = {(b['year'], b['month']): b for b in buckets}
+
+    balance = opening
+    for _, is_unposted, _, row in merged:
+        if is_unposted:
+            unposted_total += row.amount
+            balance += row.amount
+        else:
+            balance = row.balance + unposted_total
+        bucket = by_month.get((row.entry_date.year, row.entry_date.month))
+        if bucket is None:
+            # Dated after today; keep it in the last month so balances add up
+            bucket = buckets[-1]
+        if row.amount >= 0:
+            bucket['charges'] += row.amount
+        else:
+            bucket['credits'] -= row.amount
+        bucket['entries'].append({
+            'id': row.id,
+            'date': row.entry_date.isoformat(),
+            'type': row.entry_type,
+            'description': row.description,
+            'period_start': row.period_start.isoformat() if row.period_start else None,
+            'period_end': row.period_end.isoformat() if row.period_end else None,
+            'amount': _money(row.amount),
+            'balance': _money(balance),
+            'payment_id': row.payment_id,
+        })
+
+    result_months = []
+    balance = opening
+    for bucket in buckets:
+        closing = balance + bucket['charges'] - bucket['credits']
+        result_months.append({
+            'month': f"{bucket['year']}-{bucket['month']:02d}",
+            'opening_balance': _money(balance),
+            'charges': _money(bucket['charges']),
+            'credits': _money(bucket['credits']),
+            'closing_balance': _money(closing),
+            'entries': bucket['entries'],
+        })
+        balance = closing
+
+    # Rent accrued in the current (open) month, posted once the month closes
+    unbilled = Decimal(0)
+    if resident.joining_date:
+        posted = expected_rent_total(resident, _charge_date(resident, posted_through)) if posted_through else Decimal(0)
+        unbilled = max(Decimal(0), expected_rent_total(resident, today).quantize(Decimal('0.01')) - posted.quantize(Decimal('0.01')))
+
+    return {
+        'resident_id': resident.id,
+        'resident_name': resident.name,
+        'from': start.isoformat(),
+        'to': today.isoformat(),
+        'opening_balance': _money(opening),
+        'closing_balance': _money(balance),
+        'unbilled_rent': _money(unbilled),
+        'months': result_months,
+    }
@@ -0,0 +1,91 @@
+import time
+import uuid
+from datetime import date, timedelta
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from properties.models import Property, Resident, Occupancy, OccupancyHistory, Expense, Payment
+from properties.structure_utils import plan_structure, create_structure, BULK_BATCH_SIZE
+from properties.deletion_utils import fast_delete
+
+
+class Command(BaseCommand):
+    help = 'Seed large throwaway properties and compare ORM deletion with the set-based fast_delete'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--floors', type=int, default=10)
+        parser.add_argument('--rooms', type=int, default=20, help='Rooms per floor')
+        parser.add_argument('--beds', type=int, default=4, help='Beds per room')
+        parser.add_argument('--months', type=int, default=36, help='Months of payment history per resident')
+        parser.add_argument('--expenses', type=int, default=2000)
+        parser.add_argument('--skip-orm', action='store_true', help='Only benchmark fast_delete')
+
+    def seed(self, options) -> Property:
+        prop = Property.objects.create(name=f'Delete benchmark {uuid.uuid4().hex[:8]}')
+        create_structure(prop, plan_structure(
+            floors_count=options['floors'], rooms_per_floor=options['rooms'], beds_per_room=options['beds'],
+        ))
+
+        occupancies = list(Occupancy.objects.filter(property=prop).order_by('id'))
+        start = date.today() - timedelta(days=31 * options['months'])
+        residents = Resident.objects.bulk_create(
+            [
+                Resident(property=prop, first_name=f'Resident {i}', mobile=f'9{i:09d}',
+                         rent=Decimal('5000.00'), joining_date=start)
+                for i in range(len(occupancies))
+            ],
+            batch_size=BULK_BATCH_SIZE,
+        )
+        histories = []
+        for occ, resident in zip(occupancies, residents):
+            occ.resident = resident
+            occ.is_occupied = True
+            histories.append(OccupancyHistory(
+                property=prop, floor_id=occ.floor_id, room_id=occ.room_id, bed_id=occ.bed_id,
+                resident=resident, action='occupied',
+            ))
+        Occupancy.objects.bulk_update(occupancies, ['resident', 'is_occupied'], batch_size=BULK_BATCH_SIZE)
+        OccupancyHistory.objects.bulk_create(histories, batch_size=BULK_BATCH_SIZE)
+
+        Payment.objects.bulk_create(
+            [
+                Payment(property=prop, resident=resident, resident_name=resident.first_name,
+                        amount=Decimal('5000.00'), payment_method='cash')
+                for resident in residents
+                for _ in range(options['months'])
+            ],
+            batch_size=BULK_BATCH_SIZE,
+        )
+        Expense.objects.bulk_create(
+            [
+                Expense(property=prop, category='maintenance', description='Benchmark expense',
+                        amount=Decimal('100.00'), expense_date=timezone.now())
+                for _ in range(options['expenses'])
+            ],
+            batch_size=BULK_BATCH_SIZE,
+        )
+        return prop
+
+    def timed(self, label, fn):
+        with CaptureQueriesContext(connection) as ctx:
+            started = time.perf_counter()
+            fn()
+            elapsed = time.perf_counter() - started
+        self.stdout.write(f'{label:<12} {elapsed * 1000:10.1f} ms  {len(ctx.captured_queries):6d} queries')
+
+    def handle(self, *args, **options):
+        beds = options['floors'] * options['rooms'] * options['beds']
+        self.stdout.write(self.style.WARNING(
+            f'Seeding {beds} beds/residents with {beds * options["months"]} payments per property...'
+        ))
+
+        prop = self.seed(options)
+        self.timed('fast_delete', lambda: fast_delete(Property.objects.filter(pk=prop.pk)))
+
+        if not options['skip_orm']:
+            prop = self.seed(options)
+            self.timed('orm delete', lambda: Property.objects.get(pk=prop.pk).delete())
+
+        self.stdout.write(self.style.SUCCESS('Done'))
@@ -0,0 +1,39 @@
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from properties.billing_utils import generate_charges, DEFAULT_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = 'Generate billing-cycle rent charges for every cycle that has started (safe to re-run; run daily)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', dest='as_of', help='Generate cycles starting on or before this date (YYYY-MM-DD, default: today)')
+        parser.add_argument('--resident', type=int, action='append', dest='residents',
+                            help='Resident id to process (repeatable; default: all active residents)')
+        parser.add_argument('--after', type=int, dest='after',
+                            help='Resume after this resident id (printed after every batch)')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                            help=f'Residents per transaction (default: {DEFAULT_BATCH_SIZE})')
+
+    def handle(self, *args, **options):
+        as_of = None
+        if options.get('as_of'):
+            try:
+                as_of = datetime.strptime(options['as_of'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('Invalid --date format. Use YYYY-MM-DD.')
+
+        def report(last_resident_id, created):
+            self.stdout.write(f'  up to resident {last_resident_id}: {created} charges')
+
+        self.stdout.write(self.style.WARNING('Generating billing charges...'))
+        result = generate_charges(
+            as_of_date=as_of,
+            resident_ids=options.get('residents'),
+            after_resident_id=options.get('after'),
+            batch_size=options['batch_size'],
+            on_batch=report,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Processed {result['residents']} residents, created {result['charges']} charges"
+        ))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from properties.rollup_utils import rebuild_rollup
+from properties.period_cache import invalidate_all
+
+
+class Command(BaseCommand):
+    help = 'Recompute the monthly finance rollup from payments and expenses'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--property', type=int, action='append', dest='properties',
+                            help='Property id to rebuild (repeatable; default: all)')
+
+    def handle(self, *args, **options):
+        property_ids = options.get('properties')
+        scope = f"properties {property_ids}" if property_ids else 'all properties'
+        self.stdout.write(self.style.WARNING(f'Rebuilding finance rollup for {scope}...'))
+        written = rebuild_rollup(property_ids)
+        # Reaches the server workers only through a shared cache backend; with
+        # locmem they pick up the rebuild once FINANCE_CLOSED_PERIOD_CACHE_TIMEOUT passes
+        invalidate_all()
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} rollup rows'))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from properties.ledger_utils import rebuild_ledger
+
+
+class Command(BaseCommand):
+    help = 'Rebuild resident ledger entries (arrears, rent accruals, payments) and running balances'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--resident', type=int, action='append', dest='residents',
+                            help='Resident id to rebuild (repeatable; default: all)')
+
+    def handle(self, *args, **options):
+        resident_ids = options.get('residents')
+        scope = f"residents {resident_ids}" if resident_ids else 'all residents'
+        self.stdout.write(self.style.WARNING(f'Rebuilding resident ledger for {scope}...'))
+        written = rebuild_ledger(resident_ids)
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} ledger entries'))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from properties.upload_utils import expire_uploads, resume_uploads
+
+
+class Command(BaseCommand):
+    help = ('Upload spooled resident photo/aadhar files whose background upload is pending or failed '
+            '(e.g. after a restart) and fail pending uploads whose spooled file is gone')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.WARNING('Resuming spooled media uploads...'))
+        queued = resume_uploads(inline=True)
+        expired = expire_uploads()
+        self.stdout.write(self.style.SUCCESS(f'Processed {queued} spooled uploads, marked {expired} lost uploads failed'))
@@ -0,0 +1,283 @@
+"""
+Media Proxy Utilities
+
+Builds the responses of ResidentViewSet.media: the object is streamed in
+MEDIA_CHUNK_SIZE chunks instead of being buffered in the worker, with ETag /
+If-None-Match revalidation and single byte ranges (Range / If-Range).
+
+Recently viewed objects can be kept in a bounded on-disk LRU cache
+(MEDIA_CACHE_DIR, MEDIA_CACHE_MAX_BYTES in total, objects up to
+MEDIA_CACHE_MAX_OBJECT_BYTES). It is off by default: on Cloud Run the disk is
+memory and counts against the instance's limit. A cached object is served
+without contacting the storage for MEDIA_CACHE_TTL seconds after it was last
+validated; after that one metadata call confirms the ETag before it is served
+from disk again.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
+from .storage import MediaObject, iter_file
+
+
+logger = logging.getLogger(__name__)
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(header: str, size: int):
+    """
+    Byte range requested by a Range header.
+
+    Only a single range is honoured; multiple ranges and malformed headers are
+    ignored, so the whole object is served (as RFC 9110 allows).
+
+    Args:
+        header: Range header value, e.g. 'bytes=0-1023', 'bytes=500-', 'bytes=-500'
+        size: Object size in bytes
+
+    Returns:
+        tuple or None: (start, end) inclusive, or None to serve the whole object
+
+    Raises:
+        RangeNotSatisfiable: the range starts beyond the end of the object
+    """
+    unit, _, spec = (header or '').partition('=')
+    if unit.strip().lower() != 'bytes' or ',' in spec:
+        return None
+    first, dash, last = spec.strip().partition('-')
+    if not dash:
+        return None
+    try:
+        if not first:
+            suffix = int(last)
+            if suffix <= 0 or size == 0:
+                raise RangeNotSatisfiable()
+            return max(size - suffix, 0), size - 1
+        start = int(first)
+        end = int(last) if last else start
+    except ValueError:
+        return None
+    if start > end:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable()
+    if not last:
+        end = size - 1
+    return start, min(end, size - 1)
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    """Weak comparison of an If-None-Match / If-Range value against our ETag."""
+    tags = [tag.strip() for tag in (header or '').split(',')]
+    return '*' in tags or any(tag.removeprefix('W/') == etag for tag in tags)
+
+
+def _digest(value: str) -> str:
+    return hashlib.sha256(value.encode()).hexdigest()
+
+
+class MediaCache:
+    """
+    Bounded LRU of media objects on local disk.
+
+    Each object is stored as <name digest>-<etag digest>.data next to a
+    <name digest>.json holding its metadata and when it was last validated.
+    Files are written to a temporary name and renamed into place, so
+    concurrent workers never read a partial object. Recency is the data
+    file's mtime, refreshed on every hit.
+    """
+
+    def __init__(self, directory, max_bytes: int, max_object_bytes: int, ttl: int):
+        self.directory = str(directory)
+        self.max_bytes = max_bytes
+        self.max_object_bytes = max_object_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _meta_path(self, object_name: str) -> str:
+        return os.path.join(self.directory, _digest(object_name) + '.json')
+
+    def _data_path(self, object_name: str, etag: str) -> str:
+        return os.path.join(self.directory, f'{_digest(object_name)}-{_digest(etag)[:16]}.data')
+
+    def lookup(self, object_name: str):
+        """
+        Cached metadata and data file of an object.
+
+        Returns:
+            tuple or None: (MediaObject, data_path, fresh) where fresh means it was
+            validated against the storage less than ttl seconds ago
+        """
+        try:
+            with open(self._meta_path(object_name)) as f:
+                meta = json.load(f)
+            media = MediaObject(**meta['media'])
+            path = self._data_path(object_name, media.etag)
+            os.utime(path)
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        return media, path, time.time() - meta['validated_at'] < self.ttl
+
+    def revalidated(self, media: MediaObject):
+        """Record that the cached copy still matches the storage."""
+        self._write_meta(media)
+
+    def _write_meta(self, media: MediaObject):
+        meta_path = self._meta_path(media.name)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'media': media._asdict(), 'validated_at': time.time()}, f)
+        os.replace(tmp_path, meta_path)
+
+    def cacheable(self, media: MediaObject) -> bool:
+        return media.size <= min(self.max_object_bytes, self.max_bytes)
+
+    def store(self, media: MediaObject, chunks):
+        """
+        Pass chunks through while writing them to the cache.
+
+        The object is only added once every byte has been streamed; an aborted
+        download (e.g. the client went away) leaves nothing behind.
+        """
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        written = 0
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    written += len(chunk)
+                    yield chunk
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        if written != media.size:
+            os.unlink(tmp_path)
+            return
+        try:
+            os.replace(tmp_path, self._data_path(media.name, media.etag))
+            self._write_meta(media)
+            self.evict()
+        except OSError:
+            logger.exception('Media cache: could not store object=%s', media.name)
+
+    def evict(self):
+        """Remove least recently used objects until the cache fits in max_bytes."""
+        with self._lock:
+            entries = []
+            total = 0
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if entry.name.endswith('.data'):
+                        info = entry.stat()
+                        entries.append((info.st_mtime, info.st_size, entry.path))
+                        total += info.st_size
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                name_digest = os.path.basename(path).split('-', 1)[0]
+                for stale in (path, os.path.join(self.directory, name_digest + '.json')):
+                    try:
+                        os.unlink(stale)
+                    except FileNotFoundError:
+                        pass
+                total -= size
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_media_cache():
+    """Process-wide MediaCache for the current settings (None when MEDIA_CACHE_MAX_BYTES is 0)."""
+    global _cache
+    if settings.MEDIA_CACHE_MAX_BYTES <= 0:
+        return None
+    with _cache_lock:
+        if _cache is None or _cache.directory != str(settings.MEDIA_CACHE_DIR):
+            _cache = MediaCache(
+                settings.MEDIA_CACHE_DIR, settings.MEDIA_CACHE_MAX_BYTES,
+                settings.MEDIA_CACHE_MAX_OBJECT_BYTES, settings.MEDIA_CACHE_TTL,
+            )
+        else:
+            _cache.max_bytes = settings.MEDIA_CACHE_MAX_BYTES
+            _cache.max_object_bytes = settings.MEDIA_CACHE_MAX_OBJECT_BYTES
+            _cache.ttl = settings.MEDIA_CACHE_TTL
+        return _cache
+
+
+def media_response(request, storage, object_name: str, cache=None):
+    """
+    Streaming response for a stored media object.
+
+    Args:
+        request: The incoming request (Range / If-None-Match / If-Range headers)
+        storage: MediaStorage backend
+        object_name: Object to serve
+        cache: Optional MediaCache
+
+    Returns:
+        HttpResponse or None: None when the object does not exist
+    """
+    cached = cache.lookup(object_name) if cache is not None else None
+    cached_path = None
+    if cached is not None and cached[2]:
+        media, cached_path = cached[0], cached[1]
+    else:
+        media = storage.stat(object_name)
+        if media is None:
+            return None
+        if cached is not None and cached[0].etag == media.etag:
+            cached_path = cached[1]
+            cache.revalidated(media)
+
+    etag = f'"{media.etag}"'
+    headers = {
+        'ETag': etag,
+        'Accept-Ranges': 'bytes',
+        'Cache-Control': 'private, max-age=300',
+    }
+    if _etag_matches(request.headers.get('If-None-Match'), etag):
+        response = HttpResponse(status=304)
+        for name, value in headers.items():
+            response[name] = value
+        return response
+
+    byte_range = None
+    if_range = request.headers.get('If-Range')
+    if request.headers.get('Range') and (not if_range or if_range == etag):
+        try:
+            byte_range = parse_range(request.headers['Range'], media.size)
+        except RangeNotSatisfiable:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{media.size}'
+            return response
+
+    start, end = byte_range or (0, media.size - 1)
+    chunk_size = settings.MEDIA_CHUNK_SIZE
+    if cached_path is not None:
+        chunks = iter_file(cached_path, start, end, chunk_size)
+    elif byte_range is None and cache is not None and cache.cacheable(media):
+        chunks = cache.store(media, storage.iter_range(media, start, end))
+    else:
+        chunks = storage.iter_range(media, start, end)
+
+    response = StreamingHttpResponse(chunks, status=206 if byte_range else 200, content_type=media.content_type)
+    for name, value in headers.items():
+        response[name] = value
+    response['Content-Length'] = str(end - start + 1)
+    if byte_range:
+        response['Content-Range'] = f'bytes {start}-{end}/{media.size}'
+    filename = object_name.rsplit('/', 1)[-1]
+    response['Content-Disposition'] = 'inline; filename="%s"' % filename
+    return response
@@ -0,0 +1,18 @@
+from django.db import migrations, models
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0021_add_resident_arrears'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['property', 'payment_date'], name='pg_payment_prop_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['property', 'expense_date'], name='pg_expense_prop_date_idx'),
+        ),
+    ]
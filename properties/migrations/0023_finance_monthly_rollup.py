@@ -0,0 +1,58 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# Same backfill as database/sql/2026-10-17_finance_monthly_rollup.sql, so the
+# finance endpoints read complete totals as soon as the table exists.
+BACKFILL_ROLLUP_SQL = """
+LOCK TABLE pg_payment, pg_expense IN SHARE MODE;
+
+INSERT INTO pg_finance_monthly_rollup (property_id, year, month, source, category, total, count, updated_at)
+SELECT property_id,
+       EXTRACT(YEAR FROM payment_date AT TIME ZONE 'UTC')::SMALLINT,
+       EXTRACT(MONTH FROM payment_date AT TIME ZONE 'UTC')::SMALLINT,
+       'payment', '', SUM(amount), COUNT(*), NOW()
+FROM pg_payment
+GROUP BY 1, 2, 3;
+
+INSERT INTO pg_finance_monthly_rollup (property_id, year, month, source, category, total, count, updated_at)
+SELECT property_id,
+       EXTRACT(YEAR FROM expense_date AT TIME ZONE 'UTC')::SMALLINT,
+       EXTRACT(MONTH FROM expense_date AT TIME ZONE 'UTC')::SMALLINT,
+       'expense', COALESCE(category, ''), SUM(amount), COUNT(*), NOW()
+FROM pg_expense
+GROUP BY 1, 2, 3, 5;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0022_finance_date_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FinanceMonthlyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.SmallIntegerField()),
+                ('month', models.SmallIntegerField()),
+                ('source', models.CharField(choices=[('payment', 'Payment'), ('expense', 'Expense')], max_length=20)),
+                ('category', models.CharField(blank=True, default='', max_length=100)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('property', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='finance_rollups', to='properties.property')),
+            ],
+            options={
+                'db_table': 'pg_finance_monthly_rollup',
+                'ordering': ['property', 'year', 'month'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='financemonthlyrollup',
+            constraint=models.UniqueConstraint(fields=('property', 'year', 'month', 'source', 'category'), name='pg_finance_rollup_key'),
+        ),
+        migrations.RunSQL(BACKFILL_ROLLUP_SQL, reverse_sql=migrations.RunSQL.noop),
+    ]
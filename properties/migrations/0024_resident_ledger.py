@@ -0,0 +1,68 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# Same backfill as database/sql/2026-10-17_resident_ledger.sql: arrears and payment
+# entries with their running totals, so payment totals read from the ledger are
+# right as soon as the table exists. Rent entries of closed months are posted by
+# the billing run (post_rent_accruals) or `manage.py rebuild_resident_ledger`.
+BACKFILL_LEDGER_SQL = """
+LOCK TABLE pg_payment, pg_resident IN SHARE MODE;
+
+INSERT INTO pg_resident_ledger (property_id, resident_id, entry_type, entry_date, amount, balance, total_paid, description, created_at)
+SELECT property_id, id, 'arrears', COALESCE(joining_date, CURRENT_DATE), arrears, 0, 0, 'Arrears', NOW()
+FROM pg_resident
+WHERE arrears <> 0;
+
+INSERT INTO pg_resident_ledger (property_id, resident_id, payment_id, entry_type, entry_date, amount, balance, total_paid, description, created_at)
+SELECT property_id, resident_id, id, 'payment', (payment_date AT TIME ZONE 'UTC')::DATE, -amount, 0, 0, COALESCE(payment_method, ''), NOW()
+FROM pg_payment;
+
+UPDATE pg_resident_ledger AS l
+SET balance = s.balance, total_paid = s.total_paid
+FROM (
+    SELECT id,
+           SUM(amount) OVER w AS balance,
+           SUM(CASE WHEN entry_type = 'payment' THEN -amount ELSE 0 END) OVER w AS total_paid
+    FROM pg_resident_ledger
+    WINDOW w AS (PARTITION BY resident_id ORDER BY entry_date, id)
+) AS s
+WHERE l.id = s.id;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0023_finance_monthly_rollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResidentLedger',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entry_type', models.CharField(choices=[('rent', 'Rent'), ('arrears', 'Arrears'), ('adjustment', 'Adjustment'), ('payment', 'Payment')], max_length=20)),
+                ('entry_date', models.DateField()),
+                ('period_start', models.DateField(blank=True, null=True)),
+                ('period_end', models.DateField(blank=True, null=True)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('balance', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('total_paid', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('description', models.CharField(blank=True, default='', max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('payment', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='ledger_entry', to='properties.payment')),
+                ('property', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ledger_entries', to='properties.property')),
+                ('resident', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ledger_entries', to='properties.resident')),
+            ],
+            options={
+                'db_table': 'pg_resident_ledger',
+                'ordering': ['resident', 'entry_date', 'id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='residentledger',
+            index=models.Index(fields=['resident', 'entry_date', 'id'], name='pg_ledger_resident_date_idx'),
+        ),
+        migrations.RunSQL(BACKFILL_LEDGER_SQL, reverse_sql=migrations.RunSQL.noop),
+    ]
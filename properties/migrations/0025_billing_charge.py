@@ -0,0 +1,43 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0024_resident_ledger'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BillingCharge',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cycle_number', models.PositiveIntegerField()),
+                ('cycle_start', models.DateField()),
+                ('cycle_end', models.DateField()),
+                ('due_date', models.DateField()),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('amount_paid', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('is_paid', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('property', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='billing_charges', to='properties.property')),
+                ('resident', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='billing_charges', to='properties.resident')),
+            ],
+            options={
+                'db_table': 'pg_billing_charge',
+                'ordering': ['resident', 'cycle_start'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='billingcharge',
+            constraint=models.UniqueConstraint(fields=('resident', 'cycle_number'), name='pg_billing_charge_cycle_key'),
+        ),
+        migrations.AddIndex(
+            model_name='billingcharge',
+            index=models.Index(condition=models.Q(('is_paid', False)), fields=['due_date'], name='pg_charge_unpaid_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='billingcharge',
+            index=models.Index(condition=models.Q(('is_paid', False)), fields=['property', 'due_date'], name='pg_charge_prop_unpaid_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+from django.db import migrations, models
+
+
+MEDIA_STATUS_CHOICES = [('pending', 'Pending'), ('uploaded', 'Uploaded'), ('failed', 'Failed')]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0026_user_token_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resident',
+            name='photo_status',
+            field=models.CharField(blank=True, choices=MEDIA_STATUS_CHOICES, max_length=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='resident',
+            name='aadhar_status',
+            field=models.CharField(blank=True, choices=MEDIA_STATUS_CHOICES, max_length=10, null=True),
+        ),
+    ]
@@ -135,6 +135,11 @@ class Resident(models.Model):
         ('weekly', 'Weekly'),
         ('bi-weekly', 'Bi-Weekly'),
     ]
+    MEDIA_STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('uploaded', 'Uploaded'),
+        ('failed', 'Failed'),
+    ]
 
     property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='residents')
     first_name = models.CharField(max_length=150)
@@ -156,6 +161,9 @@ class Resident(models.Model):
     )
     photo_url = models.URLField(null=True, blank=True)
     aadhar_url = models.URLField(null=True, blank=True)
+    # Background upload state of photo/aadhar (NULL when none was submitted); see upload_utils
+    photo_status = models.CharField(max_length=10, choices=MEDIA_STATUS_CHOICES, null=True, blank=True)
+    aadhar_status = models.CharField(max_length=10, choices=MEDIA_STATUS_CHOICES, null=True, blank=True)
     # Vehicle information
     vehicle_2wheeler = models.CharField(max_length=50, null=True, blank=True, help_text='2 Wheeler vehicle registration number')
     vehicle_4wheeler = models.CharField(max_length=50, null=True, blank=True, help_text='4 Wheeler vehicle registration number')
@@ -279,6 +287,7 @@ class Expense(models.Model):
             models.Index(fields=['property', 'category']),
             models.Index(fields=['-expense_date']),
             models.Index(fields=['amount']),
+            models.Index(fields=['property', 'expense_date'], name='pg_expense_prop_date_idx'),
         ]
 
     def __str__(self):
@@ -313,12 +322,124 @@ class Payment(models.Model):
             models.Index(fields=['property', 'resident']),
             models.Index(fields=['resident', '-payment_date']),
             models.Index(fields=['-payment_date']),
+            models.Index(fields=['property', 'payment_date'], name='pg_payment_prop_date_idx'),
         ]
 
     def __str__(self):
         return f"{self.resident_name} - {self.amount} on {self.payment_date}"
 
 
+# ============================================================================
+# FINANCE MONTHLY ROLLUP
+# ============================================================================
+class FinanceMonthlyRollup(models.Model):
+    """Per-property monthly totals of payments and expenses, maintained on write."""
+    SOURCE_CHOICES = [
+        ('payment', 'Payment'),
+        ('expense', 'Expense'),
+    ]
+
+    property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='finance_rollups')
+    year = models.SmallIntegerField()
+    month = models.SmallIntegerField()
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES)
+    # Expense category; empty for payments
+    category = models.CharField(max_length=100, blank=True, default='')
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'pg_finance_monthly_rollup'
+        ordering = ['property', 'year', 'month']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['property', 'year', 'month', 'source', 'category'],
+                name='pg_finance_rollup_key',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.property_id} {self.year}-{self.month:02d} {self.source} {self.category}: {self.total}"
+
+
+# ============================================================================
+# RESIDENT LEDGER
+# ============================================================================
+class ResidentLedger(models.Model):
+    """
+    Charges (positive amount) and credits (negative amount) of a resident, with the
+    running balance and running payment total after each entry in (entry_date, id)
+    order. Maintained by properties.ledger_utils.
+    """
+    ENTRY_TYPE_CHOICES = [
+        ('rent', 'Rent'),
+        ('arrears', 'Arrears'),
+        ('adjustment', 'Adjustment'),
+        ('payment', 'Payment'),
+    ]
+
+    property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='ledger_entries')
+    resident = models.ForeignKey(Resident, on_delete=models.CASCADE, related_name='ledger_entries')
+    payment = models.OneToOneField(Payment, on_delete=models.CASCADE, null=True, blank=True, related_name='ledger_entry')
+    entry_type = models.CharField(max_length=20, choices=ENTRY_TYPE_CHOICES)
+    entry_date = models.DateField()
+    # Rent accrual period covered by a 'rent' entry
+    period_start = models.DateField(null=True, blank=True)
+    period_end = models.DateField(null=True, blank=True)
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    balance = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total_paid = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    description = models.CharField(max_length=255, blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'pg_resident_ledger'
+        ordering = ['resident', 'entry_date', 'id']
+        indexes = [
+            models.Index(fields=['resident', 'entry_date', 'id'], name='pg_ledger_resident_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.resident_id} {self.entry_date} {self.entry_type}: {self.amount} (balance {self.balance})"
+
+
+# ============================================================================
+# BILLING CHARGES
+# ============================================================================
+class BillingCharge(models.Model):
+    """
+    Rent charge of one billing cycle of a resident, generated by the
+    generate_billing_charges command. amount_paid/is_paid are allocated from the
+    resident's payments oldest cycle first (see properties.billing_utils).
+    """
+    property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='billing_charges')
+    resident = models.ForeignKey(Resident, on_delete=models.CASCADE, related_name='billing_charges')
+    # 0 for the cycle starting on joining_date
+    cycle_number = models.PositiveIntegerField()
+    cycle_start = models.DateField()
+    cycle_end = models.DateField()
+    due_date = models.DateField()
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    amount_paid = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    is_paid = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'pg_billing_charge'
+        ordering = ['resident', 'cycle_start']
+        constraints = [
+            models.UniqueConstraint(fields=['resident', 'cycle_number'], name='pg_billing_charge_cycle_key'),
+        ]
+        indexes = [
+            models.Index(fields=['due_date'], condition=models.Q(is_paid=False), name='pg_charge_unpaid_due_idx'),
+            models.Index(fields=['property', 'due_date'], condition=models.Q(is_paid=False), name='pg_charge_prop_unpaid_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.resident_id} #{self.cycle_number} {self.cycle_start}..{self.cycle_end}: {self.amount}"
+
+
 # ============================================================================
 # MAINTENANCE REQUESTS
 # ============================================================================
@@ -380,6 +501,9 @@ class User(models.Model):
     password_hash = models.CharField(max_length=255)
     role = models.CharField(max_length=50, choices=ROLE_CHOICES, default='staff')
     is_active = models.BooleanField(default=True)
+    # Carried as the 'ver' claim of issued tokens; bumped (see properties.signals)
+    # on password, role, property or is_active changes to revoke older tokens
+    token_version = models.PositiveIntegerField(default=0)
     last_login = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
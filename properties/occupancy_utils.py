@@ -0,0 +1,126 @@
+"""
+Occupancy Tree Utilities
+
+Builds the consolidated property -> floors -> rooms -> beds occupancy structure
+used by the mobile occupancy tab. Everything is loaded with a fixed number of
+queries (floors, rooms, beds, occupancies with residents) and the nested tree and
+all counts are assembled in Python.
+
+The output matches PropertyOccupancyDetailSerializer field for field.
+"""
+
+from collections import defaultdict
+from .models import Property, Floor, Room, Bed, Occupancy
+
+
+def _bed_node(bed: Bed, occupancy: Occupancy) -> dict:
+    occupied = occupancy is not None and occupancy.is_occupied
+    resident = occupancy.resident if occupied else None
+    return {
+        'bed_id': bed.id,
+        'bed_number': bed.bed_number,
+        'bed_name': bed.bed_name,
+        'is_occupied': occupied,
+        'resident_name': resident.name if resident else None,
+        'resident_id': resident.id if resident else None,
+    }
+
+
+def build_occupancy_tree(property_obj: Property) -> dict:
+    """
+    Build the complete occupancy detail payload for a property.
+
+    Queries (independent of the number of floors, rooms and beds):
+    1. Floors of the property
+    2. Rooms of those floors
+    3. Beds of those rooms
+    4. Occupancies of the property, joined with their residents
+
+    Args:
+        property_obj: Property instance
+
+    Returns:
+        dict: Same shape as PropertyOccupancyDetailSerializer(property_obj).data
+    """
+    floors = list(Floor.objects.filter(property=property_obj).order_by('floor_level'))
+    floor_ids = [f.id for f in floors]
+
+    rooms_by_floor = defaultdict(list)
+    room_ids = []
+    for room in Room.objects.filter(floor_id__in=floor_ids).order_by('floor', 'room_number'):
+        rooms_by_floor[room.floor_id].append(room)
+        room_ids.append(room.id)
+
+    beds_by_room = defaultdict(list)
+    for bed in Bed.objects.filter(room_id__in=room_ids).order_by('room', 'bed_number'):
+        beds_by_room[bed.room_id].append(bed)
+
+    occupancy_by_bed = {}
+    occupied_by_room = defaultdict(int)
+    available_by_room = defaultdict(int)
+    occupied_by_floor = defaultdict(int)
+    available_by_floor = defaultdict(int)
+    occupied_total = 0
+    available_total = 0
+    occupancies = (
+        Occupancy.objects
+        .filter(property=property_obj)
+        .select_related('resident')
+        .order_by()
+    )
+    for occ in occupancies:
+        occupancy_by_bed[occ.bed_id] = occ
+        if occ.is_occupied:
+            occupied_by_room[occ.room_id] += 1
+            occupied_by_floor[occ.floor_id] += 1
+            occupied_total += 1
+        else:
+            available_by_room[occ.room_id] += 1
+            available_by_floor[occ.floor_id] += 1
+            available_total += 1
+
+    floor_nodes = []
+    rooms_total = 0
+    for floor in floors:
+        room_nodes = []
+        floor_total_beds = 0
+        for room in rooms_by_floor[floor.id]:
+            rooms_total += 1
+            floor_total_beds += room.total_beds or 0
+            room_nodes.append({
+                'room_id': room.id,
+                'room_number': room.room_number,
+                'room_name': room.room_name,
+                'room_type': room.room_type,
+                'total_beds': room.total_beds,
+                'beds': [_bed_node(bed, occupancy_by_bed.get(bed.id)) for bed in beds_by_room[room.id]],
+                'occupied_count': occupied_by_room[room.id],
+                'available_count': available_by_room[room.id],
+            })
+        floor_nodes.append({
+            'floor_id': floor.id,
+            'floor_level': floor.floor_level,
+            'floor_name': floor.floor_name,
+            'rooms': room_nodes,
+            'total_beds': floor_total_beds,
+            'occupied_beds': occupied_by_floor[floor.id],
+            'available_beds': available_by_floor[floor.id],
+        })
+
+    total_beds = property_obj.total_beds
+    return {
+        'property_id': property_obj.id,
+        'property_name': property_obj.name,
+        'address': property_obj.address,
+        'city': property_obj.city,
+        'state': property_obj.state,
+        'zip_code': property_obj.zip_code,
+        'description': property_obj.description,
+        'total_floors': len(floors),
+        'total_rooms': rooms_total,
+        'total_beds': total_beds,
+        'occupied_beds': occupied_total,
+        'available_beds': available_total,
+        'occupancy_percentage': round((occupied_total / total_beds) * 100, 2) if total_beds else 0,
+        'floors': floor_nodes,
+    }
@@ -9,16 +9,27 @@ and serializers.
 from decimal import Decimal
 from datetime import date, timedelta
 import calendar
+from functools import lru_cache
+from django.db.models import (
+    Case, When, Value, F, Q, Func, OuterRef, ExpressionWrapper, DateField, DecimalField,
+    IntegerField, BooleanField, CharField,
+)
+from django.db.models.functions import Coalesce, Greatest, Least, ExtractYear, ExtractMonth
 from django.utils import timezone
-from django.db.models import Sum
 from .models import Resident, Payment
+from .ledger_utils import paid_through, paid_totals, _paid_till
 
 
+PAYMENT_STATUSES = ('ON_TIME', 'DUE_SOON', 'OVERDUE', 'SEVERELY_OVERDUE')
+
+
+@lru_cache(maxsize=None)
 def get_days_in_month(year: int, month: int) -> int:
     """Get the number of days in a given month/year."""
     return calendar.monthrange(year, month)[1]
 
 
+@lru_cache(maxsize=4096)
 def _add_months_keep_day(base_date: date, months: int) -> date:
     """Add months to a date while clamping day to the target month's max day."""
     month_index = (base_date.month - 1) + months
@@ -28,28 +39,218 @@ def _add_months_keep_day(base_date: date, months: int) -> date:
     return date(year, month, day)
 
 
+@lru_cache(maxsize=4096)
+def _shortest_month(year: int, month: int, count: int) -> int:
+    """Fewest days among the `count` months following year/month."""
+    if count >= 24:
+        # Two Februaries, at most one of them in a leap year
+        return 28
+    shortest = 31
+    for offset in range(1, count + 1):
+        month_index = (month - 1) + offset
+        shortest = min(shortest, get_days_in_month(year + month_index // 12, month_index % 12 + 1))
+    return shortest
+
+
 def _count_monthly_cycles_started(joining_date: date, period_end: date) -> int:
-    """Count started monthly billing cycles between joining_date and period_end (inclusive)."""
+    """
+    Count started monthly billing cycles between joining_date and period_end (inclusive).
+
+    Each cycle starts one month after the previous one with the day clamped to the
+    month's length, so once a cycle lands on a shorter month the later cycles keep
+    the shorter day (31 Jan -> 28 Feb -> 28 Mar). The start of the cycle in
+    period_end's month is found directly instead of walking month by month.
+    """
     if period_end < joining_date:
         return 0
 
-    cycles = 1
-    cycle_start = joining_date
-    while True:
-        next_cycle_start = _add_months_keep_day(cycle_start, 1)
-        if next_cycle_start <= period_end:
-            cycles += 1
-            cycle_start = next_cycle_start
-            continue
-        break
+    months = (period_end.year - joining_date.year) * 12 + (period_end.month - joining_date.month)
+    if months == 0:
+        return 1
+    start_day = joining_date.day
+    if start_day > 28:
+        start_day = min(start_day, _shortest_month(joining_date.year, joining_date.month, months))
+    # Cycles 0..months-1 started before period_end's month
+    return months + 1 if start_day <= period_end.day else months
+
+
+def _months_until_last(joining_date: date, as_of_date: date) -> int:
+    """Calendar months from the joining month up to the month before as_of_date (inclusive)."""
+    months = (as_of_date.year - joining_date.year) * 12 + (as_of_date.month - joining_date.month)
+    return max(months, 0)
+
+
+class RentPolicy:
+    """
+    Billing rules of one rent type.
+
+    calculate_due_amount, is_overdue, get_overdue_amount, get_days_overdue and
+    next_billing_date look the policy up once with rent_policy() instead of
+    branching on rent_type; every method is constant time. The base class is
+    used for unknown rent types: no rent accrues and nothing is ever overdue.
+    """
+
+    rent_type = None
+
+    def expected_rent(self, rent: Decimal, joining_date: date, as_of_date: date, period_end: date) -> Decimal:
+        """Rent accrued from joining_date (calculate_due_amount rules)."""
+        return Decimal(0)
+
+    def is_overdue(self, joining_date: date, as_of_date: date) -> bool:
+        """Whether a positive due counts as overdue on as_of_date."""
+        return False
+
+    def overdue_rent(self, rent: Decimal, joining_date: date, as_of_date: date):
+        """Rent of the periods already past due, or None when nothing is past due yet."""
+        return None
+
+    def days_overdue(self, days_passed: int) -> int:
+        """Days overdue given the days since joining."""
+        return 0
+
+    def charge_due_date(self, cycle_start: date, cycle_end: date) -> date:
+        """
+        Last day the rent of a billing cycle can be paid before it is overdue.
+
+        Matches is_overdue: the charge of the cycle starting on joining_date is
+        overdue (due_date < as_of_date) exactly when is_overdue says so.
+        """
+        return date.max
+
+    def next_billing_date(self, resident: Resident, as_of_date: date) -> date:
+        return as_of_date
+
+
+class FixedCyclePolicy(RentPolicy):
+    """Rent accruing per day, billed every `cycle_days` days."""
 
-    return cycles
+    def __init__(self, rent_type: str, cycle_days: int):
+        self.rent_type = rent_type
+        self.cycle_days = cycle_days
+
+    @staticmethod
+    def _accrued_days(joining_date: date, period_end: date) -> int:
+        # Joining day counts as day 1
+        return max((period_end - joining_date).days + 1, 0)
+
+    def expected_rent(self, rent, joining_date, as_of_date, period_end):
+        daily_rate = rent / Decimal(self.cycle_days)
+        return daily_rate * Decimal(self._accrued_days(joining_date, period_end))
+
+    def is_overdue(self, joining_date, as_of_date):
+        return (as_of_date - joining_date).days >= self.cycle_days
+
+    def overdue_rent(self, rent, joining_date, as_of_date):
+        days = (as_of_date - joining_date).days
+        if days < self.cycle_days:
+            return None
+        daily_rate = rent / Decimal(self.cycle_days)
+        # Complete cycles only
+        return daily_rate * Decimal(self.cycle_days) * Decimal(days // self.cycle_days)
+
+    def days_overdue(self, days_passed):
+        if days_passed < self.cycle_days:
+            return 0
+        return days_passed - (self.cycle_days - 1)
+
+    def charge_due_date(self, cycle_start, cycle_end):
+        # Overdue once the whole cycle has passed
+        return cycle_end
+
+    def next_billing_date(self, resident, as_of_date):
+        return as_of_date + timedelta(days=self.cycle_days)
+
+
+class DailyPolicy(FixedCyclePolicy):
+    """Daily rent: 1-2 days unpaid is DUE, 3+ days is OVERDUE."""
+
+    overdue_after_days = 3
+
+    def __init__(self):
+        super().__init__('daily', 1)
+
+    def expected_rent(self, rent, joining_date, as_of_date, period_end):
+        return rent * Decimal(self._accrued_days(joining_date, period_end))
+
+    def is_overdue(self, joining_date, as_of_date):
+        return (as_of_date - joining_date).days >= self.overdue_after_days
+
+    def overdue_rent(self, rent, joining_date, as_of_date):
+        days = (as_of_date - joining_date).days + 1
+        if days <= 0:
+            return None
+        return rent * Decimal(days)
+
+    def days_overdue(self, days_passed):
+        return max(0, days_passed)
+
+    def charge_due_date(self, cycle_start, cycle_end):
+        return cycle_start + timedelta(days=self.overdue_after_days - 1)
+
+
+class MonthlyPolicy(RentPolicy):
+    """Monthly rent: a calendar month is due once it has ended."""
+
+    rent_type = 'monthly'
+    overdue_after_days = 30
+
+    def expected_rent(self, rent, joining_date, as_of_date, period_end):
+        # Full calendar months up to last month; move-out does not shorten them
+        return rent * Decimal(_months_until_last(joining_date, as_of_date))
+
+    def is_overdue(self, joining_date, as_of_date):
+        last_month_date = as_of_date.replace(day=1) - timedelta(days=1)
+        return joining_date <= last_month_date
+
+    def overdue_rent(self, rent, joining_date, as_of_date):
+        months = _months_until_last(joining_date, as_of_date)
+        if months == 0:
+            return None
+        return rent * Decimal(months)
+
+    def days_overdue(self, days_passed):
+        if days_passed < self.overdue_after_days:
+            return 0
+        return days_passed - (self.overdue_after_days - 1)
+
+    def charge_due_date(self, cycle_start, cycle_end):
+        # Overdue once the calendar month the cycle starts in has ended
+        return cycle_start.replace(day=get_days_in_month(cycle_start.year, cycle_start.month))
+
+    def next_billing_date(self, resident, as_of_date):
+        # preferred_billing_day or joining day, clamped to the month's length
+        billing_day = resident.preferred_billing_day or resident.joining_date.day
+        this_month_bill = as_of_date.replace(
+            day=min(billing_day, get_days_in_month(as_of_date.year, as_of_date.month))
+        )
+        if this_month_bill >= as_of_date:
+            return this_month_bill
+        next_month = _add_months_keep_day(as_of_date.replace(day=1), 1)
+        return next_month.replace(day=min(billing_day, get_days_in_month(next_month.year, next_month.month)))
+
+
+RENT_POLICIES = {
+    policy.rent_type: policy
+    for policy in (
+        DailyPolicy(),
+        FixedCyclePolicy('weekly', 7),
+        FixedCyclePolicy('bi-weekly', 14),
+        MonthlyPolicy(),
+    )
+}
+_NO_POLICY = RentPolicy()
+
+
+def rent_policy(rent_type: str) -> RentPolicy:
+    """Billing rules for a rent type (a no-op policy for unknown types)."""
+    return RENT_POLICIES.get(rent_type, _NO_POLICY)
 
 
 def calculate_checkout_breakdown(
     resident: Resident,
     as_of_date: date = None,
     monthly_option: str = 'rounded_month',
+    snapshot: 'ResidentFinancialSnapshot' = None,
 ) -> dict:
     """
     Build a detailed due breakdown for resident checkout.
@@ -59,9 +260,14 @@ def calculate_checkout_breakdown(
     - DAILY: (days_stayed * daily_rent) + arrears - payments_till_checkout
     - WEEKLY: ((days_stayed / 7) * weekly_rent) + arrears - payments_till_checkout
     - BI-WEEKLY: ((days_stayed / 14) * bi_weekly_rent) + arrears - payments_till_checkout
+
+    payments_till_checkout is read from the resident's financial snapshot for
+    as_of_date (computed here unless the caller already has it).
     """
     if as_of_date is None:
         as_of_date = timezone.now().date()
+    if snapshot is None:
+        snapshot = ResidentFinancialSnapshot.for_resident(resident, as_of_date)
 
     arrears = Decimal(resident.arrears or 0)
     rent = Decimal(resident.rent or 0)
@@ -75,7 +281,7 @@ def calculate_checkout_breakdown(
         resident=resident,
         payment_date__date__lte=period_end
     ).order_by('payment_date')
-    paid_total = Decimal(payments_qs.aggregate(total=Sum('amount'))['total'] or 0)
+    paid_total = snapshot.paid_total
 
     expected_rent = Decimal(0)
     period_count = 0
@@ -232,12 +438,33 @@ def calculate_checkout_breakdown(
         'formula': formula,
         'formula_values': formula_values,
         'explanation': explanation,
-        'payment_count': payments_qs.count(),
+        'payment_count': len(payment_breakdown),
         'payments': payment_breakdown,
     }
 
 
-def calculate_due_amount(resident: Resident, as_of_date: date = None) -> Decimal:
+def expected_rent_total(resident: Resident, as_of_date: date) -> Decimal:
+    """
+    Rent accrued from joining_date up to as_of_date, as counted by calculate_due_amount
+    (before arrears and payments).
+    
+    Args:
+        resident: Resident instance with a joining_date
+        as_of_date: Date to calculate as of
+    
+    Returns:
+        Decimal: Expected rent total
+    """
+    # Cap calculations at move_out_date if set and in the past
+    period_end = as_of_date
+    if resident.move_out_date and resident.move_out_date <= as_of_date:
+        period_end = resident.move_out_date
+    
+    rent = Decimal(resident.rent or 0)
+    return rent_policy(resident.rent_type).expected_rent(rent, resident.joining_date, as_of_date, period_end)
+
+
+def calculate_due_amount(resident: Resident, as_of_date: date = None, paid_total: Decimal = None) -> Decimal:
     """
     Calculate the total due amount for a resident as of a given date.
     
@@ -260,6 +487,8 @@ def calculate_due_amount(resident: Resident, as_of_date: date = None) -> Decimal
     Args:
         resident: Resident instance
         as_of_date: Date to calculate due as of (defaults to today)
+        paid_total: Payments made up to the billing period end, when already
+            known (e.g. from a batch query). Skips the per-resident ledger lookup.
     
     Returns:
         Decimal: Total due amount
@@ -279,54 +508,11 @@ def calculate_due_amount(resident: Resident, as_of_date: date = None) -> Decimal
     if resident.move_out_date and resident.move_out_date <= as_of_date:
         period_end = resident.move_out_date
     
-    # Calculate expected rent for billing periods completed
-    rent = Decimal(resident.rent or 0)
-    expected_total = Decimal(0)
-    
-    if resident.rent_type == 'daily':
-        # Count all days from joining date to today (inclusive)
-        # Joining day counts as day 1, so April 24 to May 17 = 24 days
-        days = (period_end - resident.joining_date).days + 1
-        if days < 0:
-            days = 0
-        expected_total = rent * Decimal(days)
-    
-    elif resident.rent_type == 'weekly':
-        # Calculate daily rate from weekly rent
-        days = (period_end - resident.joining_date).days + 1
-        if days < 0:
-            days = 0
-        daily_rate = rent / Decimal(7)
-        expected_total = daily_rate * Decimal(days)
-    
-    elif resident.rent_type == 'monthly':
-        # Count full calendar months from joining month to last month (not current month)
-        jy, jm = resident.joining_date.year, resident.joining_date.month
-        ly = as_of_date.year if as_of_date.month > 1 else as_of_date.year - 1
-        lm = as_of_date.month - 1 if as_of_date.month > 1 else 12
-        
-        if (jy > ly) or (jy == ly and jm > lm):
-            months_until_last = 0
-        else:
-            months_until_last = (ly - jy) * 12 + (lm - jm) + 1
-        
-        expected_total = rent * Decimal(months_until_last)
-    
-    elif resident.rent_type == 'bi-weekly':
-        # Calculate daily rate from bi-weekly rent
-        days = (period_end - resident.joining_date).days + 1
-        if days < 0:
-            days = 0
-        daily_rate = rent / Decimal(14)
-        expected_total = daily_rate * Decimal(days)
-    
-    # Sum all payments made up to period_end
-    paid_total = Decimal(
-        Payment.objects.filter(
-            resident=resident,
-            payment_date__date__lte=period_end
-        ).aggregate(total=Sum('amount'))['total'] or 0
-    )
+    expected_total = expected_rent_total(resident, as_of_date)
+    
+    # Payments made up to period_end, from the resident ledger
+    if paid_total is None:
+        paid_total = paid_through(resident, period_end)
     
     # Calculate total due
     due_total = expected_total + arrears - paid_total
@@ -336,7 +522,7 @@ def calculate_due_amount(resident: Resident, as_of_date: date = None) -> Decimal
     return due_total
 
 
-def is_overdue(resident: Resident, as_of_date: date = None) -> bool:
+def is_overdue(resident: Resident, as_of_date: date = None, due_amount: Decimal = None) -> bool:
     """
     Check if a resident has overdue payments.
     
@@ -355,6 +541,7 @@ def is_overdue(resident: Resident, as_of_date: date = None) -> bool:
     Args:
         resident: Resident instance
         as_of_date: Date to check as of (defaults to today)
+        due_amount: Pre-computed result of calculate_due_amount, if available
     
     Returns:
         bool: True if resident has overdue payments
@@ -362,45 +549,19 @@ def is_overdue(resident: Resident, as_of_date: date = None) -> bool:
     if as_of_date is None:
         as_of_date = timezone.now().date()
     
-    due_amount = calculate_due_amount(resident, as_of_date)
+    if not resident.joining_date:
+        return False
+    
+    if due_amount is None:
+        due_amount = calculate_due_amount(resident, as_of_date)
     
     if due_amount > 0:
-        # For daily residents: overdue only if 1+ full days have passed
-        # Same day joining = NOT overdue, just DUE
-        if resident.rent_type == 'daily':
-            if not resident.joining_date:
-                return False
-            days_since_joining = (as_of_date - resident.joining_date).days
-            # Per user requirement: 1-2 days = DUE, 3+ days = OVERDUE
-            return days_since_joining >= 3
-        
-        # For weekly residents, check if a full week has passed
-        elif resident.rent_type == 'weekly':
-            if not resident.joining_date:
-                return False
-            days_since_joining = (as_of_date - resident.joining_date).days
-            # Overdue if 7+ full days have passed
-            return days_since_joining >= 7
-        
-        # For monthly residents, check if a full month has passed
-        elif resident.rent_type == 'monthly':
-            if not resident.joining_date:
-                return False
-            # Overdue if we're past last full month + payment hasn't covered
-            last_month_date = as_of_date.replace(day=1) - timedelta(days=1)
-            return resident.joining_date <= last_month_date
-        
-        elif resident.rent_type == 'bi-weekly':
-            if not resident.joining_date:
-                return False
-            days_since_joining = (as_of_date - resident.joining_date).days
-            # Overdue if 14+ full days have passed
-            return days_since_joining >= 14
+        return rent_policy(resident.rent_type).is_overdue(resident.joining_date, as_of_date)
     
     return False
 
 
-def get_overdue_amount(resident: Resident, as_of_date: date = None) -> Decimal:
+def get_overdue_amount(resident: Resident, as_of_date: date = None, paid_total: Decimal = None) -> Decimal:
     """
     Get the overdue amount for a resident.
     
@@ -418,6 +579,7 @@ def get_overdue_amount(resident: Resident, as_of_date: date = None) -> Decimal:
     Args:
         resident: Resident instance
         as_of_date: Date to calculate as of (defaults to today)
+        paid_total: Payments made up to as_of_date, when already known
     
     Returns:
         Decimal: Overdue amount
@@ -429,56 +591,15 @@ def get_overdue_amount(resident: Resident, as_of_date: date = None) -> Decimal:
         return Decimal(0)
     
     rent = Decimal(resident.rent or 0)
-    
-    if resident.rent_type == 'daily':
-        # Calculate rent for all days from joining to today (inclusive)
-        # Same logic as calculate_due_amount for consistency
-        days = (as_of_date - resident.joining_date).days + 1
-        if days <= 0:
-            return Decimal(0)
-        expected = rent * Decimal(days)
-    
-    elif resident.rent_type == 'weekly':
-        days = (as_of_date - resident.joining_date).days
-        if days < 7:
-            return Decimal(0)
-        daily_rate = rent / Decimal(7)
-        # Round down to complete weeks
-        complete_weeks = days // 7
-        expected = daily_rate * Decimal(7) * Decimal(complete_weeks)
-    
-    elif resident.rent_type == 'monthly':
-        # Only count full months up to last month
-        jy, jm = resident.joining_date.year, resident.joining_date.month
-        if as_of_date.month == 1:
-            ly, lm = as_of_date.year - 1, 12
-        else:
-            ly, lm = as_of_date.year, as_of_date.month - 1
-        
-        if (jy > ly) or (jy == ly and jm > lm):
-            return Decimal(0)
-        
-        months = (ly - jy) * 12 + (lm - jm) + 1
-        expected = rent * Decimal(months)
-    
-    elif resident.rent_type == 'bi-weekly':
-        days = (as_of_date - resident.joining_date).days
-        if days < 14:
-            return Decimal(0)
-        daily_rate = rent / Decimal(14)
-        complete_bi_weeks = days // 14
-        expected = daily_rate * Decimal(14) * Decimal(complete_bi_weeks)
-    
-    else:
+    expected = rent_policy(resident.rent_type).overdue_rent(rent, resident.joining_date, as_of_date)
+    if expected is None:
         return Decimal(0)
     
     # Subtract payments received
-    paid = Decimal(
-        Payment.objects.filter(
-            resident=resident,
-            payment_date__date__lte=as_of_date
-        ).aggregate(total=Sum('amount'))['total'] or 0
-    )
+    if paid_total is None:
+        paid = paid_through(resident, as_of_date)
+    else:
+        paid = paid_total
     
     overdue = expected - paid
     if overdue < 0:
@@ -508,30 +629,7 @@ def get_days_overdue(resident: Resident, as_of_date: date = None) -> int:
         return 0
     
     days_passed = (as_of_date - resident.joining_date).days
-    
-    if resident.rent_type == 'daily':
-        # Overdue if more than 1 day has passed
-        return max(0, days_passed)
-    
-    elif resident.rent_type == 'weekly':
-        # Overdue if more than 7 days have passed
-        if days_passed < 7:
-            return 0
-        return days_passed - 6  # Subtract the first 7 days (day 1-7)
-    
-    elif resident.rent_type == 'monthly':
-        # Overdue after a full month
-        if days_passed < 30:
-            return 0
-        return days_passed - 29
-    
-    elif resident.rent_type == 'bi-weekly':
-        # Overdue if more than 14 days have passed
-        if days_passed < 14:
-            return 0
-        return days_passed - 13
-    
-    return 0
+    return rent_policy(resident.rent_type).days_overdue(days_passed)
 
 
 def next_billing_date(resident: Resident, as_of_date: date = None) -> date:
@@ -560,29 +658,243 @@ def next_billing_date(resident: Resident, as_of_date: date = None) -> date:
     if not resident.joining_date:
         return as_of_date
     
-    if resident.rent_type == 'daily':
-        return as_of_date + timedelta(days=1)
+    return rent_policy(resident.rent_type).next_billing_date(resident, as_of_date)
+
+
+def get_payment_status(
+    resident: Resident,
+    as_of_date: date = None,
+    due_amount: Decimal = None,
+) -> str:
+    """
+    Get human-readable payment status.
+    
+    Returns one of:
+    - 'ON_TIME': No due amount
+    - 'DUE_SOON': Has due but not yet overdue
+    - 'OVERDUE': Payment past due (1-2 days for daily, 7+ for weekly, etc.)
+    - 'SEVERELY_OVERDUE': Very late (3+ days for daily, 14+ for weekly, etc.)
+    """
+    if as_of_date is None:
+        as_of_date = timezone.now().date()
     
-    elif resident.rent_type == 'weekly':
-        return as_of_date + timedelta(days=7)
+    if due_amount is None:
+        due_amount = calculate_due_amount(resident, as_of_date)
     
-    elif resident.rent_type == 'monthly':
-        billingday = resident.preferred_billing_day or resident.joining_date.day
-        dim_this_month = get_days_in_month(as_of_date.year, as_of_date.month)
-        target_day_this_month = min(billingday, dim_this_month)
-        this_month_bill = as_of_date.replace(day=target_day_this_month)
-        
-        if this_month_bill >= as_of_date:
-            return this_month_bill
-        
-        # Next month
-        next_month = as_of_date.replace(day=1) + timedelta(days=32)
-        next_month = next_month.replace(day=1)
-        dim_next = get_days_in_month(next_month.year, next_month.month)
-        target_day_next = min(billingday, dim_next)
-        return next_month.replace(day=target_day_next)
-    
-    elif resident.rent_type == 'bi-weekly':
-        return as_of_date + timedelta(days=14)
-    
-    return as_of_date
+    if due_amount <= 0:
+        return 'ON_TIME'
+    
+    overdue = is_overdue(resident, as_of_date, due_amount=due_amount)
+    return _payment_status(due_amount, overdue, get_days_overdue(resident, as_of_date) if overdue else 0)
+
+
+def _payment_status(due_amount: Decimal, overdue: bool, days_overdue: int) -> str:
+    if due_amount <= 0:
+        return 'ON_TIME'
+    if overdue:
+        if days_overdue > 30:  # More than a month overdue
+            return 'SEVERELY_OVERDUE'
+        return 'OVERDUE'
+    return 'DUE_SOON'
+
+
+class ResidentFinancialSnapshot:
+    """
+    Due figures of one resident on one date, computed once.
+    
+    Everything that serializes or reports a resident's dues (ResidentSerializer,
+    home_summary, checkout) reads from a snapshot instead of calling the helpers
+    above one by one, so the payment totals are loaded once (one ledger query
+    for a single resident, see for_resident; one for a batch, see
+    calculate_dues_for_residents) and each figure is derived once.
+    
+    Attributes:
+        paid_total: Payments up to min(move_out_date, as_of_date)
+        paid_till_date: Payments up to as_of_date
+        expected: Rent accrued so far (expected_rent_total)
+        due, is_overdue, overdue_amount, days_overdue, next_billing_date,
+        payment_status: As returned by the helper of the same name
+    """
+    
+    __slots__ = (
+        'resident_id', 'as_of_date', 'paid_total', 'paid_till_date', 'expected', 'due',
+        'is_overdue', 'overdue_amount', 'days_overdue', 'next_billing_date', 'payment_status',
+    )
+    
+    def __init__(self, resident: Resident, as_of_date: date, paid_total: Decimal, paid_till_date: Decimal):
+        self.resident_id = resident.id
+        self.as_of_date = as_of_date
+        self.paid_total = paid_total
+        self.paid_till_date = paid_till_date
+        self.expected = expected_rent_total(resident, as_of_date) if resident.joining_date else Decimal(0)
+        self.due = calculate_due_amount(resident, as_of_date, paid_total=paid_total)
+        self.is_overdue = is_overdue(resident, as_of_date, due_amount=self.due)
+        self.overdue_amount = get_overdue_amount(resident, as_of_date, paid_total=paid_till_date)
+        self.days_overdue = get_days_overdue(resident, as_of_date)
+        self.next_billing_date = next_billing_date(resident, as_of_date) if resident.joining_date else None
+        self.payment_status = _payment_status(self.due, self.is_overdue, self.days_overdue)
+    
+    @classmethod
+    def for_resident(cls, resident: Resident, as_of_date: date = None) -> 'ResidentFinancialSnapshot':
+        """Snapshot of a single resident (one ledger query)."""
+        if as_of_date is None:
+            as_of_date = timezone.now().date()
+        paid_till_period_end, paid_till_date = get_paid_totals([resident], as_of_date).get(
+            resident.id, (Decimal(0), Decimal(0)))
+        return cls(resident, as_of_date, paid_till_period_end, paid_till_date)
+    
+    def __getitem__(self, key):
+        # Mapping-style access, as for the due summary dicts this replaces
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+
+def _days_between(end, start):
+    """SQL `end - start` for two dates, in days."""
+    return Func(end, start, template='(%(expressions)s)', arg_joiner=' - ', output_field=IntegerField())
+
+
+def annotate_payment_status(queryset, as_of_date: date = None):
+    """
+    Annotate residents with `due_amount`, `is_overdue`, `days_overdue` and
+    `payment_status` computed in SQL, so they can be filtered and ordered on.
+    
+    The expressions follow calculate_due_amount, is_overdue, get_days_overdue and
+    get_payment_status above (the paid total is one resident ledger lookup per row).
+    Keep the two in sync when changing the rules.
+    
+    Args:
+        queryset: Resident queryset
+        as_of_date: Date to calculate as of (defaults to today)
+    
+    Returns:
+        QuerySet: The annotated queryset
+    """
+    if as_of_date is None:
+        as_of_date = timezone.now().date()
+    
+    money = DecimalField(max_digits=20, decimal_places=6)
+    as_of = Value(as_of_date, output_field=DateField())
+    zero = Value(Decimal(0), output_field=money)
+    rent = Coalesce(F('rent'), zero, output_field=money)
+    arrears = Coalesce(F('arrears'), zero, output_field=money)
+    
+    # Days from joining to min(move_out_date, as_of_date), joining day included
+    period_end = Least(Coalesce(F('move_out_date'), as_of), as_of)
+    accrued_days = Greatest(
+        ExpressionWrapper(_days_between(period_end, F('joining_date')) + 1, output_field=IntegerField()),
+        Value(0),
+    )
+    # Monthly: full calendar months from the joining month to last month
+    last_month = as_of_date.replace(day=1) - timedelta(days=1)
+    months = Greatest(
+        ExpressionWrapper(
+            Value(last_month.year * 12 + last_month.month + 1)
+            - ExtractYear('joining_date') * 12 - ExtractMonth('joining_date'),
+            output_field=IntegerField(),
+        ),
+        Value(0),
+    )
+    expected = Case(
+        When(rent_type='daily', then=rent * accrued_days),
+        # Daily rate first, as FixedCyclePolicy.expected_rent does
+        When(rent_type='weekly', then=rent / Value(7) * accrued_days),
+        When(rent_type='bi-weekly', then=rent / Value(14) * accrued_days),
+        When(rent_type='monthly', then=rent * months),
+        default=zero,
+        output_field=money,
+    )
+    paid = Coalesce(
+        _paid_till(Least(Coalesce(OuterRef('move_out_date'), as_of), as_of)), zero, output_field=money,
+    )
+    
+    days_passed = _days_between(as_of, F('joining_date'))
+    overdue_rule = (
+        Q(rent_type='daily', days_passed__gte=3)
+        | Q(rent_type='weekly', days_passed__gte=7)
+        | Q(rent_type='monthly', joining_date__lte=last_month)
+        | Q(rent_type='bi-weekly', days_passed__gte=14)
+    )
+    
+    return queryset.alias(
+        days_passed=days_passed,
+    ).annotate(
+        due_amount=Case(
+            When(Q(is_active=False) | Q(joining_date__isnull=True), then=arrears),
+            default=Greatest(expected + arrears - paid, zero),
+            output_field=money,
+        ),
+        days_overdue=Case(
+            When(joining_date__isnull=True, then=Value(0)),
+            When(rent_type='daily', then=Greatest(F('days_passed'), Value(0))),
+            When(rent_type='weekly', days_passed__gte=7, then=F('days_passed') - 6),
+            When(rent_type='monthly', days_passed__gte=30, then=F('days_passed') - 29),
+            When(rent_type='bi-weekly', days_passed__gte=14, then=F('days_passed') - 13),
+            default=Value(0),
+            output_field=IntegerField(),
+        ),
+    ).annotate(
+        is_overdue=Case(
+            When(Q(due_amount__gt=0) & overdue_rule, then=Value(True)),
+            default=Value(False),
+            output_field=BooleanField(),
+        ),
+    ).annotate(
+        payment_status=Case(
+            When(due_amount__lte=0, then=Value('ON_TIME')),
+            When(is_overdue=True, days_overdue__gt=30, then=Value('SEVERELY_OVERDUE')),
+            When(is_overdue=True, then=Value('OVERDUE')),
+            default=Value('DUE_SOON'),
+            output_field=CharField(),
+        ),
+    )
+
+
+def get_paid_totals(residents, as_of_date: date = None) -> dict:
+    """
+    Fetch payment totals for many residents with a single query on the resident ledger.
+    
+    Returns a mapping of resident_id -> (paid_till_period_end, paid_till_date):
+    - paid_till_period_end: payments up to min(move_out_date, as_of_date), as used
+      by calculate_due_amount
+    - paid_till_date: payments up to as_of_date, as used by get_overdue_amount
+    """
+    if as_of_date is None:
+        as_of_date = timezone.now().date()
+    
+    resident_ids = [r.id for r in residents]
+    if not resident_ids:
+        return {}
+    
+    return paid_totals(resident_ids, as_of_date)
+
+
+def calculate_dues_for_residents(residents, as_of_date: date = None) -> dict:
+    """
+    Compute due/overdue figures for a batch of residents.
+    
+    Payment totals for all residents are loaded with one ledger query; everything
+    else is derived in memory using the same rules as the per-resident helpers
+    above, so the results are identical to calling them one by one.
+    
+    Args:
+        residents: Resident queryset or iterable of Resident instances
+        as_of_date: Date to calculate as of (defaults to today)
+    
+    Returns:
+        dict: resident_id -> ResidentFinancialSnapshot
+    """
+    if as_of_date is None:
+        as_of_date = timezone.now().date()
+    
+    residents = list(residents)
+    paid_totals = get_paid_totals(residents, as_of_date)
+    zero = (Decimal(0), Decimal(0))
+    
+    summaries = {}
+    for resident in residents:
+        paid_till_period_end, paid_till_date = paid_totals.get(resident.id, zero)
+        summaries[resident.id] = ResidentFinancialSnapshot(resident, as_of_date, paid_till_period_end, paid_till_date)
+    
+    return summaries
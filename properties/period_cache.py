@@ -0,0 +1,100 @@
+"""
+Closed-Period Finance Cache
+
+Payments and expenses of a month that has ended almost never change, so their
+per-property monthly aggregates are cached until someone writes a backdated
+Payment/Expense into that month.
+
+Each (property, year, month) has a version counter in the cache. Aggregates are
+stored under a key that includes the version the reader saw, and a backdated
+write bumps the version after its transaction commits. A reader that computed
+the aggregate before the write can only store it under the old version, which
+nobody reads again. Rebuilding the rollup bumps a global generation instead.
+
+Version bumps are only seen by processes sharing the cache backend. With the
+per-process locmem cache, a bump made by a management command or another
+worker is invisible here, so FINANCE_CLOSED_PERIOD_CACHE_TIMEOUT defaults to
+minutes for locmem (see settings) and bounds how long a stale month can live.
+"""
+
+from datetime import date
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+
+CACHE_PREFIX = 'finance:closed'
+GENERATION_KEY = f'{CACHE_PREFIX}:generation'
+
+
+def is_closed(year: int, month: int, today: date = None) -> bool:
+    """True for months that ended before the current month."""
+    today = today or timezone.localdate()
+    return (year, month) < (today.year, today.month)
+
+
+def _version_key(property_id, year, month):
+    return f'{CACHE_PREFIX}:version:{property_id}:{year}:{month}'
+
+
+def _data_key(generation, property_id, year, month, version):
+    return f'{CACHE_PREFIX}:{generation}:{property_id}:{year}:{month}:{version}'
+
+
+def get_closed_months(property_id: int, months: list, compute) -> dict:
+    """
+    Aggregates for closed months, computing only the ones not cached.
+
+    Args:
+        property_id: Property id
+        months: [(year, month), ...] closed months to fetch
+        compute: callable(missing_months) -> {(year, month): aggregate}; months it
+            omits are cached as None (no activity)
+
+    Returns:
+        dict: {(year, month): aggregate or None}
+    """
+    if not months:
+        return {}
+
+    version_keys = {ym: _version_key(property_id, *ym) for ym in months}
+    meta = cache.get_many([GENERATION_KEY, *version_keys.values()])
+    generation = meta.get(GENERATION_KEY, 0)
+    data_keys = {
+        ym: _data_key(generation, property_id, ym[0], ym[1], meta.get(vk, 0))
+        for ym, vk in version_keys.items()
+    }
+
+    cached = cache.get_many(list(data_keys.values()))
+    result = {ym: cached[key]['value'] for ym, key in data_keys.items() if key in cached}
+    missing = [ym for ym in months if ym not in result]
+    if missing:
+        computed = compute(missing)
+        fresh = {ym: computed.get(ym) for ym in missing}
+        cache.set_many(
+            {data_keys[ym]: {'value': value} for ym, value in fresh.items()},
+            timeout=settings.FINANCE_CLOSED_PERIOD_CACHE_TIMEOUT,
+        )
+        result.update(fresh)
+    return result
+
+
+def invalidate_month(property_id: int, year: int, month: int) -> None:
+    """Retire the cached aggregate of one month (call after the write commits)."""
+    key = _version_key(property_id, year, month)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, timeout=None)
+    # If the counter is ever evicted readers fall back to version 0; make sure no
+    # pre-invalidation value is waiting there
+    generation = cache.get(GENERATION_KEY, 0)
+    cache.delete(_data_key(generation, property_id, year, month, 0))
+
+
+def invalidate_all() -> None:
+    """Retire every cached closed-month aggregate (e.g. after a rollup rebuild)."""
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, 1, timeout=None)
@@ -0,0 +1,309 @@
+"""
+Portfolio Dues Engine
+
+Computes due, overdue amount, days overdue, payment status and aging bucket of
+every resident across many properties in a few vectorized NumPy passes, instead
+of one ResidentFinancialSnapshot (Python + Decimal) per resident.
+
+Residents and their ledger payment totals are loaded with a single query into
+arrays, with money as integer paise (int64). Weekly and bi-weekly rent accrue in
+fractions of a paisa, so due amounts are computed in units of 1/14 paisa and
+rounded half-even to paise at the end, which is what quantizing the Decimal
+result of payment_utils gives. The rules are the ones of payment_utils (rent
+policies, calculate_due_amount, get_overdue_amount, get_payment_status); keep
+the two in sync (test_portfolio_utils compares them).
+"""
+
+from datetime import date, timedelta
+import numpy as np
+from django.db.models import Sum
+from django.utils import timezone
+from .models import Property, Resident, Payment
+from .ledger_utils import annotate_paid_totals
+from .payment_utils import PAYMENT_STATUSES
+
+
+DEFAULT_RESIDENT_LIMIT = 50
+MAX_RESIDENT_LIMIT = 500
+
+# Rent type codes used in the arrays (0 = unknown rent type)
+RENT_TYPE_CODES = {'daily': 1, 'weekly': 2, 'bi-weekly': 3, 'monthly': 4}
+DAILY, WEEKLY, BI_WEEKLY, MONTHLY = 1, 2, 3, 4
+
+# Due amounts are computed in 1/SCALE paise (daily rent / 1, weekly / 7, bi-weekly / 14)
+SCALE = 14
+
+# Aging buckets of the due amount: not overdue yet, then by days overdue
+AGING_BUCKETS = ('current', '1_30', '31_60', '61_90', '90_plus')
+_AGING_EDGES = np.array([30, 60, 90])
+
+# Status codes are positions in PAYMENT_STATUSES
+_STATUS_ON_TIME, _STATUS_DUE_SOON, _STATUS_OVERDUE, _STATUS_SEVERELY_OVERDUE = (
+    PAYMENT_STATUSES.index(name) for name in ('ON_TIME', 'DUE_SOON', 'OVERDUE', 'SEVERELY_OVERDUE')
+)
+
+
+def _paise(value) -> int:
+    """Decimal rupees (2 decimal places) to integer paise."""
+    return int(value * 100) if value is not None else 0
+
+
+def format_paise(paise) -> str:
+    """Integer paise as a rupee string with two decimals ('-12.05')."""
+    paise = int(paise)
+    sign = '-' if paise < 0 else ''
+    rupees, rest = divmod(abs(paise), 100)
+    return f'{sign}{rupees}.{rest:02d}'
+
+
+def load_residents(queryset, as_of_date: date) -> dict:
+    """
+    Load residents and their payment totals into arrays (one query).
+
+    Args:
+        queryset: Resident queryset
+        as_of_date: Date the payment totals are taken at
+
+    Returns:
+        dict of equally long arrays: id, property_id, rent_type (code), rent, arrears,
+        paid_till_period_end, paid_till_date (int64 paise), joining_date,
+        move_out_date (datetime64[D], NaT when unset), is_active (bool), and a
+        `name` list
+    """
+    rows = list(
+        annotate_paid_totals(queryset, as_of_date)
+        .order_by('id')
+        .values_list(
+            'id', 'property_id', 'first_name', 'last_name', 'rent_type', 'rent', 'arrears',
+            'joining_date', 'move_out_date', 'is_active', 'paid_till_period_end', 'paid_till_date',
+        )
+    )
+    columns = list(zip(*rows)) if rows else [()] * 12
+    (ids, property_ids, first_names, last_names, rent_types, rents, arrears,
+     joining_dates, move_out_dates, is_active, paid_till_end, paid_till_date) = columns
+    return {
+        'id': np.array(ids, dtype=np.int64),
+        'property_id': np.array(property_ids, dtype=np.int64),
+        'name': [f'{first} {last}' if last else first for first, last in zip(first_names, last_names)],
+        'rent_type': np.array([RENT_TYPE_CODES.get(t, 0) for t in rent_types], dtype=np.int8),
+        'rent': np.array([_paise(v) for v in rents], dtype=np.int64),
+        'arrears': np.array([_paise(v) for v in arrears], dtype=np.int64),
+        'paid_till_period_end': np.array([_paise(v) for v in paid_till_end], dtype=np.int64),
+        'paid_till_date': np.array([_paise(v) for v in paid_till_date], dtype=np.int64),
+        'joining_date': np.array(joining_dates, dtype='datetime64[D]'),
+        'move_out_date': np.array(move_out_dates, dtype='datetime64[D]'),
+        'is_active': np.array(is_active, dtype=bool),
+    }
+
+
+def _round_half_even(scaled, scale: int):
+    """Divide integer arrays by scale, rounding half to even (Decimal.quantize)."""
+    quotient, remainder = np.divmod(scaled, scale)
+    half = scale / 2
+    round_up = (remainder > half) | ((remainder == half) & (quotient % 2 == 1))
+    return quotient + round_up
+
+
+def compute_dues(residents: dict, as_of_date: date) -> dict:
+    """
+    Due figures of every resident loaded by load_residents.
+
+    Returns:
+        dict of arrays: due, overdue_amount (int64 paise), days_overdue (int64),
+        is_overdue (bool), status (index into PAYMENT_STATUSES),
+        aging (index into AGING_BUCKETS, -1 when nothing is due)
+    """
+    rent = residents['rent']
+    arrears = residents['arrears']
+    rent_type = residents['rent_type']
+    joining = residents['joining_date']
+    move_out = residents['move_out_date']
+    as_of = np.datetime64(as_of_date, 'D')
+
+    has_joining = ~np.isnat(joining)
+    joining = np.where(has_joining, joining, as_of)
+    live = residents['is_active'] & has_joining
+    # Condition list for np.select, in the order daily, weekly, bi-weekly, monthly
+    by_type = [rent_type == DAILY, rent_type == WEEKLY, rent_type == BI_WEEKLY, rent_type == MONTHLY]
+
+    # Day and month counts (see the rent policies in payment_utils)
+    moved_out = ~np.isnat(move_out) & (move_out <= as_of)
+    period_end = np.where(moved_out, move_out, as_of)
+    accrued_days = np.maximum((period_end - joining).astype(np.int64) + 1, 0)
+    days_passed = (as_of - joining).astype(np.int64)
+    months = np.maximum(
+        as_of.astype('datetime64[M]').astype(np.int64) - joining.astype('datetime64[M]').astype(np.int64), 0,
+    )
+
+    # calculate_due_amount, in 1/SCALE paise
+    expected = np.select(
+        by_type,
+        [rent * accrued_days * SCALE, rent * accrued_days * (SCALE // 7),
+         rent * accrued_days * (SCALE // 14), rent * months * SCALE],
+        default=0,
+    )
+    due_scaled = np.where(
+        live,
+        np.maximum(expected + (arrears - residents['paid_till_period_end']) * SCALE, 0),
+        arrears * SCALE,
+    )
+    due = _round_half_even(due_scaled, SCALE)
+
+    # is_overdue
+    last_month_end = np.datetime64(as_of_date.replace(day=1) - timedelta(days=1), 'D')
+    overdue_rule = np.select(
+        by_type,
+        [days_passed >= 3, days_passed >= 7, days_passed >= 14, joining <= last_month_end],
+        default=False,
+    )
+    is_overdue = has_joining & (due_scaled > 0) & overdue_rule
+
+    # get_overdue_amount: rent of the past-due periods (complete cycles), then payments and arrears
+    overdue_rent = np.select(
+        by_type,
+        [rent * (days_passed + 1), rent * (days_passed // 7), rent * (days_passed // 14), rent * months],
+        default=0,
+    )
+    past_due = np.select(
+        by_type,
+        [days_passed + 1 > 0, days_passed >= 7, days_passed >= 14, months > 0],
+        default=False,
+    )
+    overdue_amount = np.where(
+        live & past_due,
+        np.maximum(overdue_rent - residents['paid_till_date'], 0) + arrears,
+        0,
+    )
+
+    # get_days_overdue
+    days_overdue = np.where(has_joining, np.select(
+        by_type,
+        [np.maximum(days_passed, 0),
+         np.where(days_passed >= 7, days_passed - 6, 0),
+         np.where(days_passed >= 14, days_passed - 13, 0),
+         np.where(days_passed >= 30, days_passed - 29, 0)],
+        default=0,
+    ), 0)
+
+    status = np.select(
+        [due_scaled <= 0, is_overdue & (days_overdue > 30), is_overdue],
+        [_STATUS_ON_TIME, _STATUS_SEVERELY_OVERDUE, _STATUS_OVERDUE],
+        default=_STATUS_DUE_SOON,
+    )
+    aging = np.where(
+        due > 0,
+        np.where(is_overdue, 1 + np.searchsorted(_AGING_EDGES, days_overdue, side='left'), 0),
+        -1,
+    )
+
+    return {
+        'due': due,
+        'overdue_amount': overdue_amount,
+        'days_overdue': days_overdue,
+        'is_overdue': is_overdue,
+        'status': status,
+        'aging': aging,
+    }
+
+
+def _aging_dict(row) -> dict:
+    return {bucket: format_paise(amount) for bucket, amount in zip(AGING_BUCKETS, row)}
+
+
+def portfolio_dues(property_ids=None, as_of_date: date = None, limit: int = DEFAULT_RESIDENT_LIMIT) -> dict:
+    """
+    Dues across properties: totals, one row per property and the residents owing the most.
+
+    Args:
+        property_ids: Limit to these properties (all properties when None)
+        as_of_date: Date to calculate as of (defaults to today)
+        limit: Number of residents to list, highest due first
+
+    Returns:
+        dict: {'as_of', 'totals', 'properties', 'residents'}; amounts are rupee strings
+    """
+    if as_of_date is None:
+        as_of_date = timezone.now().date()
+
+    properties = Property.objects.order_by('id')
+    residents = Resident.objects.filter(is_active=True)
+    payments = Payment.objects.filter(
+        payment_date__date__gte=as_of_date.replace(day=1), payment_date__date__lte=as_of_date,
+    )
+    if property_ids is not None:
+        properties = properties.filter(id__in=property_ids)
+        residents = residents.filter(property_id__in=property_ids)
+        payments = payments.filter(property_id__in=property_ids)
+    properties = list(properties.values_list('id', 'name'))
+
+    loaded = load_residents(residents, as_of_date)
+    dues = compute_dues(loaded, as_of_date)
+    collected = {
+        row['property_id']: _paise(row['total'])
+        for row in payments.values('property_id').annotate(total=Sum('amount')).order_by()
+    }
+
+    # Per-property sums (row index = position in `properties`)
+    index = {property_id: position for position, (property_id, _) in enumerate(properties)}
+    rows = np.array([index[p] for p in loaded['property_id']], dtype=np.int64)
+    size = len(properties)
+    owing = dues['due'] > 0
+    resident_counts = np.bincount(rows, minlength=size)
+    owing_counts = np.bincount(rows[owing], minlength=size)
+    overdue_counts = np.bincount(rows[dues['is_overdue']], minlength=size)
+    due_totals = np.zeros(size, dtype=np.int64)
+    overdue_totals = np.zeros(size, dtype=np.int64)
+    aging = np.zeros((size, len(AGING_BUCKETS)), dtype=np.int64)
+    np.add.at(due_totals, rows[owing], dues['due'][owing])
+    np.add.at(overdue_totals, rows, dues['overdue_amount'])
+    np.add.at(aging, (rows[owing], dues['aging'][owing]), dues['due'][owing])
+
+    property_rows = [
+        {
+            'id': property_id,
+            'name': name,
+            'residents': int(resident_counts[i]),
+            'residents_with_due': int(owing_counts[i]),
+            'overdue_residents': int(overdue_counts[i]),
+            'due': format_paise(due_totals[i]),
+            'overdue_amount': format_paise(overdue_totals[i]),
+            'collected_this_month': format_paise(collected.get(property_id, 0)),
+            'aging': _aging_dict(aging[i]),
+        }
+        for i, (property_id, name) in enumerate(properties)
+    ]
+
+    # Residents owing the most (stable: ties keep id order)
+    top = np.argsort(-dues['due'], kind='stable')[:min(int(owing.sum()), limit)]
+    names = dict(properties)
+    resident_rows = [
+        {
+            'id': int(loaded['id'][i]),
+            'name': loaded['name'][i],
+            'property': int(loaded['property_id'][i]),
+            'property_name': names[int(loaded['property_id'][i])],
+            'due': format_paise(dues['due'][i]),
+            'overdue_amount': format_paise(dues['overdue_amount'][i]),
+            'days_overdue': int(dues['days_overdue'][i]),
+            'payment_status': PAYMENT_STATUSES[dues['status'][i]],
+            'aging': AGING_BUCKETS[dues['aging'][i]],
+        }
+        for i in top
+    ]
+
+    return {
+        'as_of': as_of_date.isoformat(),
+        'totals': {
+            'properties': size,
+            'residents': int(resident_counts.sum()),
+            'residents_with_due': int(owing.sum()),
+            'overdue_residents': int(dues['is_overdue'].sum()),
+            'due': format_paise(due_totals.sum()),
+            'overdue_amount': format_paise(overdue_totals.sum()),
+            'collected_this_month': format_paise(sum(collected.values())),
+            'aging': _aging_dict(aging.sum(axis=0)),
+        },
+        'properties': property_rows,
+        'residents': resident_rows,
+    }
+
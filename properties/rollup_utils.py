@@ -0,0 +1,137 @@
+"""
+Finance Rollup Utilities
+
+Maintains FinanceMonthlyRollup: one row per (property, year, month, source, category)
+holding the running total and row count of payments and expenses. Writes are
+applied as increments with INSERT ... ON CONFLICT DO UPDATE, so concurrent writers
+never lose each other's changes and a payment edit costs one statement.
+
+Months are calendar months in the active Django timezone, the same buckets as
+__year/__month lookups on payment_date/expense_date.
+
+The rollup is kept current by the signal handlers in properties.signals. Bulk
+operations that bypass signals (bulk_create, QuerySet.update, raw SQL) must be
+followed by rebuild_rollup() for the affected properties.
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+from django.db import connection, transaction
+from django.db.models import Sum, Count
+from django.db.models.functions import ExtractYear, ExtractMonth
+from django.utils import timezone
+from .models import Payment, Expense, FinanceMonthlyRollup
+
+
+PAYMENT = 'payment'
+EXPENSE = 'expense'
+
+
+def rollup_key(obj):
+    """
+    Rollup bucket of a Payment or Expense instance.
+
+    Returns:
+        tuple: (property_id, year, month, source, category), or None if it has no date yet
+    """
+    if isinstance(obj, Payment):
+        field, source, category = 'payment_date', PAYMENT, ''
+    else:
+        field, source, category = 'expense_date', EXPENSE, obj.category or ''
+    # Values assigned by callers may still be strings until the instance is reloaded
+    when = obj._meta.get_field(field).to_python(getattr(obj, field))
+    if when is None or obj.property_id is None:
+        return None
+    if timezone.is_aware(when):
+        when = timezone.localtime(when)
+    return (obj.property_id, when.year, when.month, source, category)
+
+
+def apply_deltas(deltas: dict) -> None:
+    """
+    Add (amount, count) increments to rollup buckets in one statement.
+
+    Args:
+        deltas: {rollup_key: (Decimal amount, int count)}
+    """
+    rows = [(key, amount, count) for key, (amount, count) in deltas.items() if key and (amount or count)]
+    if not rows:
+        return
+
+    table = connection.ops.quote_name(FinanceMonthlyRollup._meta.db_table)
+    now = timezone.now()
+    values = ', '.join(['(%s, %s, %s, %s, %s, %s, %s, %s)'] * len(rows))
+    params = []
+    for (property_id, year, month, source, category), amount, count in rows:
+        params.extend([property_id, year, month, source, category, amount, count, now])
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {table} AS r (property_id, year, month, source, category, total, count, updated_at) '
+            f'VALUES {values} '
+            'ON CONFLICT (property_id, year, month, source, category) DO UPDATE '
+            'SET total = r.total + EXCLUDED.total, count = r.count + EXCLUDED.count, updated_at = EXCLUDED.updated_at',
+            params,
+        )
+
+
+def record_change(old_key, old_amount, new_key, new_amount) -> None:
+    """Move one row's contribution from its old bucket to its new one (either may be None)."""
+    deltas = defaultdict(lambda: (Decimal('0'), 0))
+    if old_key is not None:
+        amount, count = deltas[old_key]
+        deltas[old_key] = (amount - Decimal(old_amount or 0), count - 1)
+    if new_key is not None:
+        amount, count = deltas[new_key]
+        deltas[new_key] = (amount + Decimal(new_amount or 0), count + 1)
+    apply_deltas(deltas)
+
+
+def rebuild_rollup(property_ids=None) -> int:
+    """
+    Recompute rollup rows from pg_payment/pg_expense.
+
+    Args:
+        property_ids: Limit the rebuild to these properties (all when None)
+
+    Returns:
+        int: Number of rollup rows written
+    """
+    payments = Payment.objects.all()
+    expenses = Expense.objects.all()
+    existing = FinanceMonthlyRollup.objects.all()
+    if property_ids is not None:
+        payments = payments.filter(property_id__in=property_ids)
+        expenses = expenses.filter(property_id__in=property_ids)
+        existing = existing.filter(property_id__in=property_ids)
+
+    payment_rows = (
+        payments
+        .annotate(year=ExtractYear('payment_date'), month=ExtractMonth('payment_date'))
+        .values('property_id', 'year', 'month')
+        .annotate(total=Sum('amount'), count=Count('id'))
+        .order_by()
+    )
+    expense_rows = (
+        expenses
+        .annotate(year=ExtractYear('expense_date'), month=ExtractMonth('expense_date'))
+        .values('property_id', 'year', 'month', 'category')
+        .annotate(total=Sum('amount'), count=Count('id'))
+        .order_by()
+    )
+
+    rollups = [
+        FinanceMonthlyRollup(property_id=r['property_id'], year=r['year'], month=r['month'],
+                             source=PAYMENT, category='', total=r['total'], count=r['count'])
+        for r in payment_rows
+    ]
+    rollups.extend(
+        FinanceMonthlyRollup(property_id=r['property_id'], year=r['year'], month=r['month'],
+                             source=EXPENSE, category=r['category'] or '', total=r['total'], count=r['count'])
+        for r in expense_rows
+    )
+
+    with transaction.atomic():
+        existing.delete()
+        FinanceMonthlyRollup.objects.bulk_create(rollups, batch_size=1000)
+    return len(rollups)
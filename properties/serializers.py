@@ -1,15 +1,82 @@
 from rest_framework import serializers
-from django.db.models import Sum, Count
+from rest_framework.permissions import SAFE_METHODS
+from django.db.models import Sum, Count, Prefetch
 from django.utils import timezone
 from decimal import Decimal
 import calendar
 from .models import (
     Property, Floor, Room, Bed, Resident, Occupancy, OccupancyHistory,
-    Expense, Payment, MaintenanceRequest, User
+    Expense, Payment, MaintenanceRequest, User, BillingCharge
 )
 
 
-class PropertySerializer(serializers.ModelSerializer):
+# ============================================================================
+# SPARSE FIELDSETS
+# ============================================================================
+class DynamicFieldsMixin:
+    """
+    Sparse fieldsets and expansion driven by query parameters.
+
+    - ?fields=a,b  serialize only the listed fields
+    - ?omit=a,b    drop the listed fields
+    - ?expand=x    swap in a heavier representation registered in `expandable_fields`
+
+    Only the top-level serializer of a read request is affected, so writes and
+    nested serializers always work with their full field set. Fields that are
+    dropped are never evaluated, including their SerializerMethodFields.
+    """
+    # expand name -> (field name, factory returning the replacement field)
+    expandable_fields = {}
+
+    @staticmethod
+    def _param_set(request, name):
+        value = request.query_params.get(name) if request is not None else None
+        if not value:
+            return set()
+        return {v.strip() for v in value.split(',') if v.strip()}
+
+    def _is_top_level(self):
+        parent = self.parent
+        return parent is None or (isinstance(parent, serializers.ListSerializer) and parent.parent is None)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if request is None or request.method not in SAFE_METHODS or not self._is_top_level():
+            return fields
+
+        for name in self._param_set(request, 'expand'):
+            if name in self.expandable_fields:
+                field_name, factory = self.expandable_fields[name]
+                fields[field_name] = factory()
+
+        only = self._param_set(request, 'fields')
+        if only:
+            fields = type(fields)((k, v) for k, v in fields.items() if k in only)
+        for name in self._param_set(request, 'omit'):
+            fields.pop(name, None)
+        return fields
+
+    @classmethod
+    def setup_eager_loading(cls, queryset, fields=None):
+        """
+        Add select_related for every requested field sourced through a relation
+        (e.g. `property.name`). `fields` is the serializer's bound field mapping;
+        None means all fields.
+        """
+        if fields is None:
+            fields = cls().fields
+        related = set()
+        for field in fields.values():
+            source = getattr(field, 'source', None) or ''
+            if '.' in source:
+                related.add(source.rsplit('.', 1)[0].replace('.', '__'))
+        if related:
+            queryset = queryset.select_related(*sorted(related))
+        return queryset
+
+
+class PropertySerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     total_beds = serializers.SerializerMethodField()
 
     class Meta:
@@ -26,7 +93,7 @@ class PropertySerializer(serializers.ModelSerializer):
         return obj.total_beds
 
 
-class FloorSerializer(serializers.ModelSerializer):
+class FloorSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     property_name = serializers.CharField(source='property.name', read_only=True)
 
     class Meta:
@@ -38,7 +105,7 @@ class FloorSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
-class RoomSerializer(serializers.ModelSerializer):
+class RoomSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     floor_name = serializers.CharField(source='floor.floor_name', read_only=True)
     property_name = serializers.CharField(source='property.name', read_only=True)
 
@@ -55,72 +122,56 @@ class RoomSerializer(serializers.ModelSerializer):
         if self.instance:
             occupied_count = Occupancy.objects.filter(room=self.instance, is_occupied=True).count()
             if value < occupied_count:
-                diff = occupied_count - value
-                room_identifier = self.instance.room_number
-                # Exactly matching the user's expected phrasing
-                raise serializers.ValidationError(
-                    f"Room {room_identifier} currently has {occupied_count} residents. You must move {diff} resident{'s' if diff > 1 else ''} to another room before reducing the capacity to {value}."
-                )
+                raise serializers.ValidationError(room_capacity_error(self.instance.room_number, occupied_count, value))
         return value
 
     def update(self, instance, validated_data):
         from django.db import transaction
+        from .structure_utils import apply_room_capacity
         new_total_beds = validated_data.get('total_beds', instance.total_beds)
         old_total_beds = instance.total_beds
 
         with transaction.atomic():
             instance = super().update(instance, validated_data)
-
-            if new_total_beds < old_total_beds:
-                # Delete empty beds starting from the "highest" bed_number
-                beds_to_delete_count = old_total_beds - new_total_beds
-                empty_beds = list(Bed.objects.filter(room=instance, occupancy__is_occupied=False).order_by('-bed_number'))
-                
-                if len(empty_beds) >= beds_to_delete_count:
-                    for bed in empty_beds[:beds_to_delete_count]:
-                        bed.delete()
-            elif new_total_beds > old_total_beds:
-                # Create new beds
-                beds_to_create = new_total_beds - old_total_beds
-                existing_beds = Bed.objects.filter(room=instance).order_by('bed_number')
-                
-                highest_idx = 0
-                for b in existing_beds:
-                    if b.bed_number.isalpha() and len(b.bed_number) == 1:
-                        idx = ord(b.bed_number.upper()) - 64
-                        if idx > highest_idx:
-                            highest_idx = idx
-                    elif b.bed_number.isdigit():
-                        idx = int(b.bed_number)
-                        if idx > highest_idx:
-                            highest_idx = idx
-                
-                if highest_idx == 0:
-                    highest_idx = old_total_beds
-
-                for i in range(1, beds_to_create + 1):
-                    new_idx = highest_idx + i
-                    bed_number = chr(64 + new_idx) if new_idx <= 26 else str(new_idx)
-                    
-                    new_bed = Bed.objects.create(
-                        room=instance,
-                        floor=instance.floor,
-                        property=instance.property,
-                        bed_number=bed_number,
-                        bed_name=bed_number
-                    )
-                    Occupancy.objects.create(
-                        property=instance.property,
-                        floor=instance.floor,
-                        room=instance,
-                        bed=new_bed,
-                        is_occupied=False
-                    )
+            apply_room_capacity([(instance, old_total_beds, new_total_beds)])
 
         return instance
 
 
-class BedSerializer(serializers.ModelSerializer):
+def room_capacity_error(room_number, occupied_count, value):
+    diff = occupied_count - value
+    # Exactly matching the user's expected phrasing
+    return f"Room {room_number} currently has {occupied_count} residents. You must move {diff} resident{'s' if diff > 1 else ''} to another room before reducing the capacity to {value}."
+
+
+class RoomCapacityItemSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    total_beds = serializers.IntegerField(min_value=0)
+
+
+class RoomBulkCapacityRequestSerializer(serializers.Serializer):
+    # Either an explicit list of rooms...
+    rooms = RoomCapacityItemSerializer(many=True, required=False)
+    # ...or every room on a floor set to the same capacity
+    floor = serializers.IntegerField(required=False)
+    total_beds = serializers.IntegerField(min_value=0, required=False)
+
+    def validate(self, attrs):
+        if attrs.get('rooms'):
+            if 'floor' in attrs:
+                raise serializers.ValidationError('Provide either rooms or floor/total_beds, not both')
+        elif attrs.get('floor') is None or attrs.get('total_beds') is None:
+            raise serializers.ValidationError('Provide rooms, or floor together with total_beds')
+        return attrs
+
+
+class RoomBulkCapacityResponseSerializer(serializers.Serializer):
+    rooms = RoomSerializer(many=True)
+    created_beds = serializers.IntegerField()
+    deleted_beds = serializers.IntegerField()
+
+
+class BedSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     room_number = serializers.CharField(source='room.room_number', read_only=True)
     floor_level = serializers.IntegerField(source='floor.floor_level', read_only=True)
     property_name = serializers.CharField(source='property.name', read_only=True)
@@ -135,7 +186,33 @@ class BedSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
-class ResidentSerializer(serializers.ModelSerializer):
+class ActiveOccupancyMixin:
+    """Shared access to a resident's active occupancy (floor/room/bed)."""
+
+    @staticmethod
+    def active_occupancy_prefetch(lookup='occupancies'):
+        """Prefetch the active occupancy (with floor/room/bed) into `active_occupancies`."""
+        return Prefetch(
+            lookup,
+            queryset=Occupancy.objects.filter(is_occupied=True).select_related('floor', 'room', 'bed'),
+            to_attr='active_occupancies',
+        )
+
+    def _get_active_occupancy(self, obj):
+        # Prefetched by setup_eager_loading / active_occupancy_prefetch
+        prefetched = getattr(obj, 'active_occupancies', None)
+        if prefetched is not None:
+            return prefetched[0] if prefetched else None
+        # Not prefetched: query once and reuse for all current_* fields of this instance
+        if '_active_occupancy' not in obj.__dict__:
+            obj.__dict__['_active_occupancy'] = (
+                Occupancy.objects.select_related('floor', 'room', 'bed')
+                .filter(resident=obj, is_occupied=True).first()
+            )
+        return obj.__dict__['_active_occupancy']
+
+
+class ResidentSerializer(ActiveOccupancyMixin, DynamicFieldsMixin, serializers.ModelSerializer):
     property_name = serializers.CharField(source='property.name', read_only=True)
     name = serializers.CharField(read_only=True)
     # Write-only inputs for assigning occupancy on create
@@ -166,7 +243,7 @@ class ResidentSerializer(serializers.ModelSerializer):
             'id', 'property', 'property_name', 'first_name', 'last_name', 'name',
             'gender', 'email', 'mobile', 'dob', 'address', 'rent', 'rent_type',
             'joining_date', 'move_out_date', 'preferred_billing_day',
-            'photo_url', 'aadhar_url', 'vehicle_2wheeler', 'vehicle_4wheeler',
+            'photo_url', 'aadhar_url', 'photo_status', 'aadhar_status', 'vehicle_2wheeler', 'vehicle_4wheeler',
             'current_floor', 'current_floor_number',
             'current_room', 'current_room_number', 'current_bed', 'current_bed_number',
             'floor_id', 'room_id', 'bed_id',
@@ -176,10 +253,35 @@ class ResidentSerializer(serializers.ModelSerializer):
             'payments',
             'notes', 'override_comment', 'is_active', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at', 'name']
-
-    def _get_active_occupancy(self, obj):
-        return Occupancy.objects.select_related('floor', 'room', 'bed').filter(resident=obj, is_occupied=True).first()
+        read_only_fields = ['id', 'created_at', 'updated_at', 'name', 'photo_status', 'aadhar_status']
+
+    location_fields = (
+        'current_floor', 'current_floor_number', 'current_room',
+        'current_room_number', 'current_bed', 'current_bed_number',
+    )
+    due_fields = (
+        'due', 'is_overdue', 'overdue_amount', 'next_payment_date',
+        'days_overdue', 'payment_status',
+    )
+
+    @staticmethod
+    def payments_prefetch(lookup='payments'):
+        """Prefetch payment history (newest first) into `prefetched_payments`."""
+        return Prefetch(
+            lookup,
+            queryset=Payment.objects.order_by('-payment_date'),
+            to_attr='prefetched_payments',
+        )
+
+    @classmethod
+    def setup_eager_loading(cls, queryset, fields=None):
+        """Load what the requested fields need alongside the residents."""
+        queryset = super().setup_eager_loading(queryset, fields)
+        if fields is None or any(name in fields for name in cls.location_fields):
+            queryset = queryset.prefetch_related(cls.active_occupancy_prefetch())
+        if fields is None or 'payments' in fields:
+            queryset = queryset.prefetch_related(cls.payments_prefetch())
+        return queryset
 
     def get_current_floor(self, obj):
         occ = self._get_active_occupancy(obj)
@@ -206,38 +308,49 @@ class ResidentSerializer(serializers.ModelSerializer):
         return occ.bed.bed_number if occ and occ.bed else None
 
     def get_payments(self, obj):
-        qs = Payment.objects.filter(resident=obj).order_by('-payment_date')
+        qs = getattr(obj, 'prefetched_payments', None)
+        if qs is None:
+            qs = Payment.objects.filter(resident=obj).order_by('-payment_date')
         return PaymentSummarySerializer(qs, many=True).data
 
+    def _get_snapshot(self, obj):
+        """
+        Financial snapshot of the resident, computed once per request.
+
+        Views that serialize many residents supply them in bulk via the
+        `due_summaries` context (see calculate_dues_for_residents); otherwise the
+        snapshot is computed on first use and kept in the context for the other
+        due fields.
+        """
+        from .payment_utils import ResidentFinancialSnapshot
+        summaries = self.context.setdefault('due_summaries', {})
+        snapshot = summaries.get(obj.id)
+        if snapshot is None:
+            snapshot = summaries[obj.id] = ResidentFinancialSnapshot.for_resident(obj)
+        return snapshot
+
     def get_due(self, obj):
-        """Calculate total due amount for resident using centralized payment utils."""
-        from .payment_utils import calculate_due_amount
-        due_amount = calculate_due_amount(obj)
-        return str(due_amount.quantize(Decimal('0.01')))
+        """Total due amount (arrears + expected rent - payments)."""
+        return str(self._get_snapshot(obj).due.quantize(Decimal('0.01')))
 
     def get_is_overdue(self, obj):
         """Check if resident is overdue."""
-        from .payment_utils import is_overdue as check_overdue
-        return check_overdue(obj)
+        return self._get_snapshot(obj).is_overdue
 
     def get_overdue_amount(self, obj):
         """Get only the overdue portion of due amount."""
-        from .payment_utils import get_overdue_amount as get_overdue
-        overdue = get_overdue(obj)
-        return str(overdue.quantize(Decimal('0.01')))
+        return str(self._get_snapshot(obj).overdue_amount.quantize(Decimal('0.01')))
 
     def get_next_payment_date(self, obj):
         """Get next payment/billing date for resident."""
-        from .payment_utils import next_billing_date
         if not obj.joining_date:
             return None
-        next_date = next_billing_date(obj)
+        next_date = self._get_snapshot(obj).next_billing_date
         return next_date.isoformat() if next_date else None
 
     def get_days_overdue(self, obj):
         """Get number of days resident is overdue."""
-        from .payment_utils import get_days_overdue as get_days
-        return get_days(obj)
+        return self._get_snapshot(obj).days_overdue
 
     def get_payment_status(self, obj):
         """
@@ -249,21 +362,7 @@ class ResidentSerializer(serializers.ModelSerializer):
         - 'OVERDUE': Payment past due (1-2 days for daily, 7+ for weekly, etc.)
         - 'SEVERELY_OVERDUE': Very late (3+ days for daily, 14+ for weekly, etc.)
         """
-        from .payment_utils import calculate_due_amount, is_overdue as check_overdue, get_days_overdue as get_days
-        from decimal import Decimal
-        
-        due_amount = calculate_due_amount(obj)
-        
-        if due_amount <= 0:
-            return 'ON_TIME'
-        
-        if check_overdue(obj):
-            days_over = get_days(obj)
-            if days_over > 30:  # More than a month overdue
-                return 'SEVERELY_OVERDUE'
-            return 'OVERDUE'
-        
-        return 'DUE_SOON'
+        return self._get_snapshot(obj).payment_status
 
     def validate(self, attrs):
         # On create, require floor_id, room_id, bed_id; on update, allow missing
@@ -324,7 +423,7 @@ class ResidentSerializer(serializers.ModelSerializer):
 class ResidentMoveSerializer(serializers.Serializer):
     new_bed_id = serializers.IntegerField(required=True)
 
-class OccupancySerializer(serializers.ModelSerializer):
+class OccupancySerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     property_name = serializers.CharField(source='property.name', read_only=True)
     floor_level = serializers.IntegerField(source='floor.floor_level', read_only=True)
     room_number = serializers.CharField(source='room.room_number', read_only=True)
@@ -342,7 +441,7 @@ class OccupancySerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
-class OccupancyHistorySerializer(serializers.ModelSerializer):
+class OccupancyHistorySerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     property_name = serializers.CharField(source='property.name', read_only=True)
     floor_level = serializers.IntegerField(source='floor.floor_level', read_only=True)
     room_number = serializers.CharField(source='room.room_number', read_only=True)
@@ -359,7 +458,21 @@ class OccupancyHistorySerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'action_date']
 
 
-class ExpenseSerializer(serializers.ModelSerializer):
+class BillingChargeSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    property_name = serializers.CharField(source='property.name', read_only=True)
+    resident_name = serializers.CharField(source='resident.name', read_only=True)
+
+    class Meta:
+        model = BillingCharge
+        fields = [
+            'id', 'property', 'property_name', 'resident', 'resident_name',
+            'cycle_number', 'cycle_start', 'cycle_end', 'due_date',
+            'amount', 'amount_paid', 'is_paid', 'created_at'
+        ]
+        read_only_fields = fields
+
+
+class ExpenseSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     property_name = serializers.CharField(source='property.name', read_only=True)
 
     class Meta:
@@ -372,9 +485,44 @@ class ExpenseSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
-class PaymentSerializer(serializers.ModelSerializer):
+class ResidentSummarySerializer(ActiveOccupancyMixin, serializers.ModelSerializer):
+    """Compact resident projection used inside payment listings."""
+    name = serializers.CharField(read_only=True)
+    current_room_number = serializers.SerializerMethodField()
+    current_bed = serializers.SerializerMethodField()
+    current_bed_number = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Resident
+        fields = ['id', 'name', 'mobile', 'current_room_number', 'current_bed', 'current_bed_number']
+        read_only_fields = fields
+
+    def get_current_room_number(self, obj):
+        occ = self._get_active_occupancy(obj)
+        return occ.room.room_number if occ and occ.room else None
+
+    def get_current_bed(self, obj):
+        occ = self._get_active_occupancy(obj)
+        return occ.bed.id if occ and occ.bed else None
+
+    def get_current_bed_number(self, obj):
+        occ = self._get_active_occupancy(obj)
+        return occ.bed.bed_number if occ and occ.bed else None
+
+
+class PaymentSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    """
+    Payment with a compact `resident_detail`.
+
+    Pass `?expand=resident_full` to nest the full ResidentSerializer instead
+    (dues, payment history and location for every row).
+    """
     property_name = serializers.CharField(source='property.name', read_only=True)
-    resident_detail = ResidentSerializer(source='resident', read_only=True)
+    resident_detail = ResidentSummarySerializer(source='resident', read_only=True)
+
+    expandable_fields = {
+        'resident_full': ('resident_detail', lambda: ResidentSerializer(source='resident', read_only=True)),
+    }
 
     class Meta:
         model = Payment
@@ -385,6 +533,20 @@ class PaymentSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'created_at', 'payment_date']
 
+    @classmethod
+    def setup_eager_loading(cls, queryset, fields=None):
+        """Load property, resident and what the resident projection needs in bulk."""
+        queryset = super().setup_eager_loading(queryset, fields)
+        detail = cls().fields['resident_detail'] if fields is None else fields.get('resident_detail')
+        if detail is None:
+            return queryset
+        queryset = queryset.select_related('resident', 'resident__property').prefetch_related(
+            ActiveOccupancyMixin.active_occupancy_prefetch('resident__occupancies')
+        )
+        if isinstance(detail, ResidentSerializer):
+            queryset = queryset.prefetch_related(ResidentSerializer.payments_prefetch('resident__payments'))
+        return queryset
+
 class PaymentSummarySerializer(serializers.ModelSerializer):
     class Meta:
         model = Payment
@@ -430,7 +592,7 @@ class AuthTokenResponseSerializer(serializers.Serializer):
     user = AuthUserMiniSerializer()
 
 
-class MaintenanceRequestSerializer(serializers.ModelSerializer):
+class MaintenanceRequestSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     property_name = serializers.CharField(source='property.name', read_only=True)
     resident_name = serializers.CharField(source='resident.name', read_only=True, allow_null=True)
 
@@ -445,7 +607,7 @@ class MaintenanceRequestSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at', 'reported_date']
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     property_name = serializers.CharField(source='property.name', read_only=True, allow_null=True)
 
     class Meta:
@@ -618,6 +780,8 @@ class PropertySetupRequestSerializer(serializers.Serializer):
     bed_numbers = serializers.DictField(child=serializers.DictField(child=serializers.ListField(child=serializers.CharField())), required=False)
     # Reset existing structure
     reset = serializers.BooleanField(required=False, default=False)
+    # Apply the layout as a diff against the existing structure (keeps unchanged beds)
+    reconfigure = serializers.BooleanField(required=False, default=False)
 
     def validate(self, attrs):
         # Basic validation for property fields
@@ -705,3 +869,9 @@ class PropertySetupResponseSerializer(serializers.Serializer):
     created_floors = serializers.IntegerField()
     created_rooms = serializers.IntegerField()
     created_beds = serializers.IntegerField()
+    # Only non-zero in reconfigure mode
+    updated_floors = serializers.IntegerField(default=0)
+    updated_rooms = serializers.IntegerField(default=0)
+    deleted_floors = serializers.IntegerField(default=0)
+    deleted_rooms = serializers.IntegerField(default=0)
+    deleted_beds = serializers.IntegerField(default=0)
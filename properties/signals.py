@@ -0,0 +1,178 @@
+"""
+Model signal handlers
+
+Keeps FinanceMonthlyRollup in step with Payment and Expense writes. The rollup
+statement runs on the same connection as the triggering save/delete, so when the
+write happens inside transaction.atomic() (as the Payment/Expense API views do)
+both commit or roll back together. Writes into closed months also retire the
+closed-period cache entry for that month after commit.
+
+Payment, Resident and Occupancy writes (and bed/room/floor changes, which move
+the bed counts) mark the property's cached home summary stale after commit.
+
+Payment writes and Resident.arrears changes are posted to the resident ledger in
+the same transaction. A change of rent terms drops the posted rent entries so the
+next accrual run re-posts them, and regenerates the resident's billing charges.
+Payment and arrears changes refresh which billing charges of the resident are paid.
+"""
+
+from datetime import timedelta
+from decimal import Decimal
+from django.db import transaction
+from django.utils import timezone
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+from .models import Property, Floor, Room, Bed, Resident, Occupancy, Payment, Expense, User
+from .rollup_utils import rollup_key, record_change
+from .period_cache import is_closed, invalidate_month
+from .home_utils import invalidate_home_summary
+from .ledger_utils import record_payment, forget_payment, record_arrears_change, reset_rent_accruals
+from .billing_utils import allocate_payments, regenerate_charges
+from core.auth import forget_user
+
+
+def _invalidate_closed_periods(*keys):
+    """Backdated writes retire the cached aggregate of their month once committed."""
+    # Judge "closed" as of tomorrow so a write landing on the last day of a month
+    # still invalidates if it commits after midnight
+    tomorrow = timezone.localdate() + timedelta(days=1)
+    for key in keys:
+        if key is not None and is_closed(key[1], key[2], today=tomorrow):
+            property_id, year, month = key[:3]
+            transaction.on_commit(lambda p=property_id, y=year, m=month: invalidate_month(p, y, m))
+
+
+def _remember_previous(instance):
+    """Stash the stored bucket/amount so post_save can move the contribution."""
+    instance._rollup_previous = (None, None)
+    if instance.pk is None:
+        return
+    previous = type(instance).objects.filter(pk=instance.pk).first()
+    if previous is not None:
+        instance._rollup_previous = (rollup_key(previous), previous.amount)
+
+
+@receiver(pre_save, sender=Payment)
+@receiver(pre_save, sender=Expense)
+def finance_row_pre_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    _remember_previous(instance)
+
+
+@receiver(post_save, sender=Payment)
+@receiver(post_save, sender=Expense)
+def finance_row_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    old_key, old_amount = (None, None) if created else getattr(instance, '_rollup_previous', (None, None))
+    new_key = rollup_key(instance)
+    if old_key == new_key and old_amount == instance.amount:
+        return
+    record_change(old_key, old_amount, new_key, instance.amount)
+    _invalidate_closed_periods(old_key, new_key)
+
+
+@receiver(post_delete, sender=Payment)
+@receiver(post_delete, sender=Expense)
+def finance_row_deleted(sender, instance, **kwargs):
+    key = rollup_key(instance)
+    record_change(key, instance.amount, None, None)
+    _invalidate_closed_periods(key)
+
+
+HOME_SUMMARY_SOURCES = (Floor, Room, Bed, Resident, Occupancy, Payment)
+
+
+def _home_summary_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    invalidate_home_summary(instance.property_id)
+
+
+def _property_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    invalidate_home_summary(instance.pk)
+
+
+for _model in HOME_SUMMARY_SOURCES:
+    post_save.connect(_home_summary_changed, sender=_model, dispatch_uid=f'home_summary_save_{_model.__name__}')
+    post_delete.connect(_home_summary_changed, sender=_model, dispatch_uid=f'home_summary_delete_{_model.__name__}')
+post_save.connect(_property_changed, sender=Property, dispatch_uid='home_summary_save_Property')
+
+
+# Resident fields that rent accruals are computed from
+RENT_TERMS = ('rent', 'rent_type', 'joining_date', 'move_out_date')
+
+
+@receiver(post_save, sender=Payment)
+def payment_saved_to_ledger(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    allocate_payments(record_payment(instance))
+
+
+@receiver(pre_delete, sender=Payment)
+def payment_deleted_from_ledger(sender, instance, **kwargs):
+    forget_payment(instance)
+
+
+@receiver(post_delete, sender=Payment)
+def payment_deleted_from_charges(sender, instance, **kwargs):
+    allocate_payments([instance.resident_id])
+
+
+@receiver(pre_save, sender=Resident)
+def resident_pre_save(sender, instance, raw=False, **kwargs):
+    instance._ledger_previous = None
+    if raw or instance.pk is None:
+        return
+    instance._ledger_previous = (
+        Resident.objects.filter(pk=instance.pk).values('arrears', *RENT_TERMS).first()
+    )
+
+
+@receiver(post_save, sender=Resident)
+def resident_saved_to_ledger(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_ledger_previous', None)
+    previous_arrears = previous['arrears'] if previous else 0
+    record_arrears_change(instance, previous_arrears)
+    if previous is not None and Decimal(previous_arrears or 0) != Decimal(instance.arrears or 0):
+        allocate_payments([instance.id])
+    if previous and any(previous[field] != getattr(instance, field) for field in RENT_TERMS):
+        reset_rent_accruals(instance)
+        regenerate_charges(instance)
+
+
+# User fields that tokens are issued for; changing any of them revokes older tokens
+TOKEN_FIELDS = ('password_hash', 'role', 'property_id', 'is_active')
+
+
+@receiver(pre_save, sender=User)
+def user_pre_save(sender, instance, raw=False, **kwargs):
+    instance._revoke_tokens = False
+    if raw or instance.pk is None:
+        return
+    previous = User.objects.filter(pk=instance.pk).values('token_version', *TOKEN_FIELDS).first()
+    if previous and any(previous[field] != getattr(instance, field) for field in TOKEN_FIELDS):
+        instance.token_version = previous['token_version'] + 1
+        instance._revoke_tokens = True
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    if getattr(instance, '_revoke_tokens', False) and update_fields is not None and 'token_version' not in update_fields:
+        User.objects.filter(pk=instance.pk).update(token_version=instance.token_version)
+    user_id, token_version = instance.pk, instance.token_version
+    transaction.on_commit(lambda: forget_user(user_id, token_version))
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    user_id = instance.pk
+    transaction.on_commit(lambda: forget_user(user_id))
@@ -0,0 +1,144 @@
+"""
+Single-Flight Request Coalescing
+
+When many clients ask for the same expensive result at once, only one of them
+computes it and the others wait for and share that result.
+
+Within a process, the first caller for a key becomes the leader and concurrent
+callers wait on its Event. Across gunicorn workers, leaders of the same key take
+turns through a PostgreSQL advisory lock. The one holding it computes and
+publishes the result to the shared cache, and the others pick it up from there
+instead of recomputing.
+
+A waiter accepts the result of a computation that was still running when it
+arrived (across workers: one published after it arrived). That computation may
+have started before the waiter arrived, so the result can miss writes that
+committed just before the waiter's request. Callers that must reflect every
+write committed before the request put a data version in the key (as the home
+summary does), so requests on either side of a write never share a flight. If
+the leader fails, or nothing arrives within SINGLE_FLIGHT_WAIT_TIMEOUT seconds,
+the waiter computes the result itself. Sharing across workers needs a cache all workers can see, so it
+is off by default with the per-process LocMemCache; see SINGLE_FLIGHT_ACROSS_WORKERS.
+
+Results are shared objects: callers must not mutate what they get back.
+"""
+
+import hashlib
+import threading
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+
+CACHE_PREFIX = 'single_flight'
+
+# How often a worker waiting for another worker's result checks again (seconds)
+POLL_INTERVAL = 0.05
+
+_calls = {}
+_calls_lock = threading.Lock()
+
+
+class _Call:
+    """One in-flight computation inside this process."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.ok = False
+        self.value = None
+
+
+def flight_key(*parts) -> str:
+    """Build a key from (endpoint, property id, params...) parts."""
+    return ':'.join(str(part) for part in parts)
+
+
+def _lock_id(key: str) -> int:
+    """Signed 64-bit advisory lock id for a key."""
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'big', signed=True)
+
+
+def _result_key(key: str) -> str:
+    # Hashed so arbitrary parameter values stay within cache key limits
+    return f'{CACHE_PREFIX}:{hashlib.blake2b(key.encode(), digest_size=16).hexdigest()}'
+
+
+def _shared_result(key: str, arrived: float):
+    """(True, value) if another worker published a result finished after `arrived` (it may have started earlier)."""
+    shared = cache.get(_result_key(key))
+    if shared is not None and shared['finished_at'] >= arrived:
+        return True, shared['value']
+    return False, None
+
+
+def _across_workers(key: str, compute):
+    """Run compute() at most once at a time across workers, reusing a fresh published result."""
+    if not settings.SINGLE_FLIGHT_ACROSS_WORKERS or connection.vendor != 'postgresql':
+        return compute()
+
+    arrived = time.time()
+    deadline = arrived + settings.SINGLE_FLIGHT_WAIT_TIMEOUT
+    lock_id = _lock_id(key)
+    with connection.cursor() as cursor:
+        while True:
+            cursor.execute('SELECT pg_try_advisory_lock(%s)', [lock_id])
+            if cursor.fetchone()[0]:
+                break
+            found, value = _shared_result(key, arrived)
+            if found:
+                return value
+            if time.time() >= deadline:
+                return compute()
+            time.sleep(POLL_INTERVAL)
+
+    try:
+        # The previous holder may have published while we were acquiring the lock
+        found, value = _shared_result(key, arrived)
+        if found:
+            return value
+        value = compute()
+        cache.set(
+            _result_key(key),
+            {'finished_at': time.time(), 'value': value},
+            timeout=settings.SINGLE_FLIGHT_RESULT_TIMEOUT,
+        )
+        return value
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_unlock(%s)', [lock_id])
+
+
+def single_flight(key: str, compute):
+    """
+    Return compute(), sharing one computation among concurrent callers of the same key.
+
+    The result may come from a computation that started before this call, so
+    include any data version the result must be current with in the key.
+
+    Args:
+        key: Identifies identical requests, e.g. flight_key('occupancy_detail', property_id)
+        compute: Zero-argument callable producing the result
+
+    Returns:
+        The result of compute(), possibly computed by another request
+    """
+    with _calls_lock:
+        call = _calls.get(key)
+        leader = call is None
+        if leader:
+            call = _calls[key] = _Call()
+
+    if not leader:
+        if call.done.wait(settings.SINGLE_FLIGHT_WAIT_TIMEOUT) and call.ok:
+            return call.value
+        return compute()
+
+    try:
+        call.value = _across_workers(key, compute)
+        call.ok = True
+        return call.value
+    finally:
+        with _calls_lock:
+            _calls.pop(key, None)
+        call.done.set()
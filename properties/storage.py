@@ -0,0 +1,369 @@
+"""
+Media Storage
+
+Resident media (photo/aadhar) and expense receipts live in object storage.
+Views talk to it through a small backend interface so the GCS bucket can be
+swapped for a local directory (settings.MEDIA_STORAGE = 'local'), e.g. in tests
+or offline load tests:
+
+    stat(object_name)                 -> MediaObject or None, one metadata call
+    iter_range(media, start, end)     -> bytes chunks of [start, end]
+    upload(object_name, file_obj)     -> URL stored on the model
+    object_name(url)                  -> object name of a stored media URL
+
+The backend is built once per process (get_media_storage). The GCS client, with
+its credentials and pooled HTTP session, is created lazily on first use and
+shared by all request threads instead of being rebuilt per request.
+
+Every storage call is timed per backend and operation; storage_metrics()
+returns the counts, errors and latencies of this process.
+"""
+
+import logging
+import mimetypes
+import os
+import tempfile
+import threading
+import time
+from collections import deque, namedtuple
+from contextlib import contextmanager
+from pathlib import Path
+from urllib.parse import urlparse
+from django.conf import settings
+
+
+logger = logging.getLogger(__name__)
+
+# etag is the opaque version tag of the object (changes whenever it is rewritten)
+MediaObject = namedtuple('MediaObject', ['name', 'size', 'etag', 'content_type', 'version'])
+
+# Latency samples kept per operation for the percentiles in storage_metrics()
+METRICS_SAMPLES = 512
+
+
+class _OperationMetrics:
+    """Counts and recent latencies of one storage operation."""
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = deque(maxlen=METRICS_SAMPLES)
+
+    def add(self, elapsed: float, failed: bool):
+        self.count += 1
+        self.errors += failed
+        self.total += elapsed
+        self.max = max(self.max, elapsed)
+        self.samples.append(elapsed)
+
+    def summary(self) -> dict:
+        samples = sorted(self.samples)
+
+        def percentile(p):
+            return round(samples[min(len(samples) - 1, int(len(samples) * p))] * 1000, 2) if samples else None
+
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'avg_ms': round(self.total / self.count * 1000, 2) if self.count else None,
+            'p50_ms': percentile(0.5),
+            'p95_ms': percentile(0.95),
+            'max_ms': round(self.max * 1000, 2),
+        }
+
+
+_metrics = {}
+_metrics_lock = threading.Lock()
+
+
+@contextmanager
+def timed(backend: str, operation: str):
+    """Record the latency of a storage call under (backend, operation)."""
+    started = time.perf_counter()
+    failed = True
+    try:
+        yield
+        failed = False
+    finally:
+        elapsed = time.perf_counter() - started
+        with _metrics_lock:
+            _metrics.setdefault((backend, operation), _OperationMetrics()).add(elapsed, failed)
+        logger.debug('Storage %s %s: %.1f ms%s', backend, operation, elapsed * 1000, ' (failed)' if failed else '')
+
+
+def storage_metrics() -> dict:
+    """
+    Latency metrics of the storage calls made by this process.
+
+    Returns:
+        dict: {backend: {operation: {count, errors, avg_ms, p50_ms, p95_ms, max_ms}}}
+    """
+    with _metrics_lock:
+        result = {}
+        for (backend, operation), metrics in sorted(_metrics.items()):
+            result.setdefault(backend, {})[operation] = metrics.summary()
+        return result
+
+
+def reset_storage_metrics():
+    with _metrics_lock:
+        _metrics.clear()
+
+
+def _guess_type(object_name: str) -> str:
+    return mimetypes.guess_type(object_name)[0] or 'application/octet-stream'
+
+
+def iter_file(path, start: int, end: int, chunk_size: int):
+    """Bytes [start, end] of a local file in chunks of up to chunk_size."""
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def media_object_name(property_id, owner: str, owner_id, kind: str, filename: str) -> str:
+    """
+    Object name of an uploaded file.
+
+    e.g. properties/<property_id>/residents/<resident_id>/photo/<filename>
+    """
+    prefix = settings.GCS_UPLOAD_PREFIX or 'properties'
+    return f"{prefix}/{property_id}/{owner}/{owner_id}/{kind}/{filename}"
+
+
+class MediaStorage:
+    """Base class of the media storage backends."""
+
+    name = None
+    bucket_name = None
+
+    def object_name(self, url: str) -> str:
+        """
+        Object name of a media URL.
+
+        Stored URLs look like https://storage.googleapis.com/<bucket>/<object_name>;
+        URLs without the bucket segment are taken to be the object path itself.
+        """
+        parts = urlparse(url).path.strip('/').split('/')
+        if parts and parts[0] == self.bucket_name:
+            parts = parts[1:]
+        return '/'.join(part for part in parts if part)
+
+    def stat(self, object_name: str):
+        with timed(self.name, 'stat'):
+            return self._stat(object_name)
+
+    def iter_range(self, media: MediaObject, start: int, end: int):
+        chunks = self._iter_range(media, start, end)
+        try:
+            while True:
+                with timed(self.name, 'read'):
+                    chunk = next(chunks, None)
+                if chunk is None:
+                    return
+                yield chunk
+        finally:
+            chunks.close()
+
+    def upload(self, object_name: str, file_obj, content_type: str = None) -> str:
+        """Store a file object (read from its start) and return its URL."""
+        if hasattr(file_obj, 'seek'):
+            file_obj.seek(0)
+        with timed(self.name, 'upload'):
+            self._upload(object_name, getattr(file_obj, 'file', file_obj), content_type)
+        return self.url(object_name)
+
+    def url(self, object_name: str) -> str:
+        raise NotImplementedError
+
+    def _stat(self, object_name: str):
+        raise NotImplementedError
+
+    def _iter_range(self, media: MediaObject, start: int, end: int):
+        raise NotImplementedError
+
+    def _upload(self, object_name: str, file_obj, content_type: str):
+        raise NotImplementedError
+
+
+_gcs_client = None
+_gcs_client_lock = threading.Lock()
+
+
+def gcs_client():
+    """
+    Process-wide GCS client, created on first use.
+
+    Credential discovery runs once, and every request thread shares one
+    authorized HTTP session whose connection pool keeps up to
+    MEDIA_STORAGE_POOL_SIZE connections to storage.googleapis.com alive.
+    """
+    global _gcs_client
+    if _gcs_client is None:
+        with _gcs_client_lock:
+            if _gcs_client is None:
+                import google.auth
+                from google.auth.transport.requests import AuthorizedSession
+                from google.cloud import storage
+                from requests.adapters import HTTPAdapter
+                credentials, project = google.auth.default(scopes=storage.Client.SCOPE)
+                session = AuthorizedSession(credentials)
+                pool_size = settings.MEDIA_STORAGE_POOL_SIZE
+                session.mount('https://', HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size))
+                _gcs_client = storage.Client(
+                    project=settings.GOOGLE_CLOUD_PROJECT or project, credentials=credentials, _http=session,
+                )
+    return _gcs_client
+
+
+class GCSMediaStorage(MediaStorage):
+    """Google Cloud Storage bucket."""
+
+    name = 'gcs'
+
+    def __init__(self, bucket_name: str, chunk_size: int):
+        self.bucket_name = bucket_name
+        self.chunk_size = chunk_size
+        self._bucket = None
+
+    @property
+    def bucket(self):
+        if self._bucket is None:
+            self._bucket = gcs_client().bucket(self.bucket_name)
+        return self._bucket
+
+    def url(self, object_name: str) -> str:
+        return f"https://storage.googleapis.com/{self.bucket_name}/{object_name}"
+
+    def _stat(self, object_name: str):
+        blob = self.bucket.get_blob(object_name)
+        if blob is None:
+            return None
+        return MediaObject(
+            name=object_name,
+            size=blob.size,
+            etag=blob.etag,
+            content_type=blob.content_type or _guess_type(object_name),
+            version=blob.generation,
+        )
+
+    def _iter_range(self, media: MediaObject, start: int, end: int):
+        # Ranged reads pinned to the generation from stat(), so a concurrent
+        # overwrite fails the download instead of mixing two versions
+        blob = self.bucket.blob(media.name, generation=media.version)
+        position = start
+        while position <= end:
+            last = min(position + self.chunk_size, end + 1) - 1
+            yield blob.download_as_bytes(start=position, end=last, checksum=None)
+            position = last + 1
+
+    def _upload(self, object_name: str, file_obj, content_type: str):
+        self.bucket.blob(object_name).upload_from_file(file_obj, content_type=content_type, rewind=True)
+
+
+class LocalMediaStorage(MediaStorage):
+    """Directory on the local filesystem, laid out like the bucket."""
+
+    name = 'local'
+
+    def __init__(self, root, chunk_size: int, bucket_name: str = None):
+        self.root = Path(root).resolve()
+        self.chunk_size = chunk_size
+        self.bucket_name = bucket_name
+
+    def path(self, object_name: str) -> Path:
+        path = (self.root / object_name).resolve()
+        if self.root not in path.parents:
+            raise ValueError(f'Object name outside storage root: {object_name}')
+        return path
+
+    def url(self, object_name: str) -> str:
+        return f"local://{self.bucket_name or 'media'}/{object_name}"
+
+    def _stat(self, object_name: str):
+        try:
+            info = os.stat(self.path(object_name))
+        except FileNotFoundError:
+            return None
+        return MediaObject(
+            name=object_name,
+            size=info.st_size,
+            etag=f'{info.st_mtime_ns:x}-{info.st_size:x}',
+            content_type=_guess_type(object_name),
+            version=info.st_mtime_ns,
+        )
+
+    def _iter_range(self, media: MediaObject, start: int, end: int):
+        return iter_file(self.path(media.name), start, end, self.chunk_size)
+
+    def _upload(self, object_name: str, file_obj, content_type: str):
+        path = self.path(object_name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                while True:
+                    chunk = file_obj.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    f.write(chunk)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+
+_storage = None
+_storage_key = None
+_storage_lock = threading.Lock()
+
+
+def get_media_storage():
+    """
+    Process-wide media storage backend for the current settings.
+
+    Returns:
+        MediaStorage or None: None when MEDIA_STORAGE is 'gcs' and GCS_BUCKET is not set
+    """
+    global _storage, _storage_key
+    key = (settings.MEDIA_STORAGE, settings.MEDIA_STORAGE_ROOT, settings.GCS_BUCKET, settings.MEDIA_CHUNK_SIZE)
+    with _storage_lock:
+        if key != _storage_key:
+            if settings.MEDIA_STORAGE == 'local':
+                _storage = LocalMediaStorage(settings.MEDIA_STORAGE_ROOT, settings.MEDIA_CHUNK_SIZE, settings.GCS_BUCKET)
+            elif settings.GCS_BUCKET:
+                _storage = GCSMediaStorage(settings.GCS_BUCKET, settings.MEDIA_CHUNK_SIZE)
+            else:
+                _storage = None
+            _storage_key = key
+        return _storage
+
+
+def upload_media(file_obj, object_name: str):
+    """
+    Upload a file to the configured storage.
+
+    Returns:
+        str or None: URL of the stored object, None when storage is not
+        configured or the upload failed (logged)
+    """
+    storage = get_media_storage()
+    if storage is None or not file_obj:
+        logger.warning("Media upload skipped: storage=%s file_present=%s object=%s",
+                       settings.MEDIA_STORAGE, bool(file_obj), object_name)
+        return None
+    try:
+        url = storage.upload(object_name, file_obj, getattr(file_obj, 'content_type', None))
+    except Exception as e:
+        logger.exception("Media upload error for object=%s: %s", object_name, e)
+        return None
+    logger.info("Media upload success: url=%s", url)
+    return url
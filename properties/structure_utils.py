@@ -0,0 +1,337 @@
+"""
+Property Structure Utilities
+
+Turns a setup-structure request (counts and optional naming maps) into a concrete
+floor -> room -> bed layout and writes it with set-based statements, so the cost of
+configuring a property does not grow with one round trip per row.
+"""
+
+from .models import Property, Floor, Room, Bed, Occupancy
+from .deletion_utils import fast_delete
+from .home_utils import invalidate_home_summary
+
+
+# Rows per INSERT statement; keeps parameter counts well under PostgreSQL limits
+BULK_BATCH_SIZE = 1000
+
+
+def default_bed_number(index: int) -> str:
+    """Bed labels A..Z, then numeric beyond 26."""
+    return chr(64 + index) if index <= 26 else str(index)
+
+
+def plan_structure(
+    floors_count: int = None,
+    rooms_per_floor: int = None,
+    beds_per_room: int = None,
+    floor_names: list = None,
+    room_numbers_map: dict = None,
+    bed_numbers_map: dict = None,
+) -> list:
+    """
+    Resolve the requested structure into an explicit layout.
+
+    Returns:
+        list: [{'level': int, 'name': str, 'rooms': [{'room_number': str, 'beds': [str, ...]}, ...]}, ...]
+
+    Raises:
+        ValueError: when the request does not define a complete structure
+    """
+    floor_names = floor_names or []
+    room_numbers_map = room_numbers_map or {}
+    bed_numbers_map = bed_numbers_map or {}
+
+    floor_levels = list(range(1, (floors_count or 0) + 1))
+    if not floor_levels:
+        # Fallback: infer from provided maps
+        keys = set()
+        for k in (room_numbers_map.keys() | bed_numbers_map.keys()):
+            try:
+                keys.add(int(k))
+            except Exception:
+                pass
+        floor_levels = sorted(keys)
+    if not floor_levels:
+        raise ValueError('No floors defined (provide floors_count or room_numbers/bed_numbers keys).')
+
+    layout = []
+    for level in floor_levels:
+        fname = floor_names[level - 1] if level - 1 < len(floor_names) else f'Floor {level}'
+
+        # If explicit room list provided, use it; else fall back to default count
+        rn_list = room_numbers_map.get(str(level)) or room_numbers_map.get(level) or []
+        if not rn_list:
+            if not rooms_per_floor:
+                raise ValueError(f'rooms_per_floor missing and no room_numbers provided for floor {level}.')
+            rn_list = [f'{level:02d}{r_idx:02d}' for r_idx in range(1, rooms_per_floor + 1)]
+
+        bn_floor = bed_numbers_map.get(str(level)) or bed_numbers_map.get(level) or {}
+        rooms = []
+        for room_number in rn_list:
+            # Beds per room: explicit list overrides default
+            bn_list = bn_floor.get(room_number) or []
+            if not bn_list:
+                if not beds_per_room:
+                    raise ValueError(f'beds_per_room missing and no bed_numbers provided for floor {level} room {room_number}.')
+                bn_list = [default_bed_number(b_idx) for b_idx in range(1, beds_per_room + 1)]
+            rooms.append({'room_number': room_number, 'beds': list(bn_list)})
+
+        layout.append({'level': level, 'name': fname, 'rooms': rooms})
+    return layout
+
+
+def create_structure(property_obj: Property, layout: list) -> dict:
+    """
+    Insert a planned layout level by level: floors, rooms, beds, then one available
+    Occupancy per bed. Uses one bulk INSERT per level (per BULK_BATCH_SIZE rows).
+
+    Must be called inside a transaction.
+
+    Returns:
+        dict: {'floors': n, 'rooms': n, 'beds': n}
+    """
+    floors = Floor.objects.bulk_create(
+        [Floor(property=property_obj, floor_level=f['level'], floor_name=f['name']) for f in layout],
+        batch_size=BULK_BATCH_SIZE,
+    )
+
+    rooms = []
+    room_beds = []
+    for floor, floor_plan in zip(floors, layout):
+        for room_plan in floor_plan['rooms']:
+            rooms.append(Room(
+                floor=floor,
+                property=property_obj,
+                room_number=room_plan['room_number'],
+                total_beds=len(room_plan['beds']),
+            ))
+            room_beds.append(room_plan['beds'])
+    rooms = Room.objects.bulk_create(rooms, batch_size=BULK_BATCH_SIZE)
+
+    beds = Bed.objects.bulk_create(
+        [
+            Bed(room=room, floor=room.floor, property=property_obj, bed_number=bed_number, bed_name=bed_number)
+            for room, bed_numbers in zip(rooms, room_beds)
+            for bed_number in bed_numbers
+        ],
+        batch_size=BULK_BATCH_SIZE,
+    )
+
+    # Initialize occupancy as available
+    Occupancy.objects.bulk_create(
+        [
+            Occupancy(property=property_obj, floor=bed.floor, room=bed.room, bed=bed, is_occupied=False)
+            for bed in beds
+        ],
+        batch_size=BULK_BATCH_SIZE,
+    )
+
+    invalidate_home_summary(property_obj.id)
+    return {'floors': len(floors), 'rooms': len(rooms), 'beds': len(beds)}
+
+
+def reconfigure_structure(property_obj: Property, layout: list, rename_floors: bool = True) -> dict:
+    """
+    Bring an existing structure in line with a planned layout by diffing it against
+    the current Floor/Room/Bed rows. Floors are matched by level, rooms by
+    (level, room_number) and beds by (level, room_number, bed_number); only the
+    missing rows are inserted, changed rows updated and removed rows deleted.
+    Unchanged beds keep their occupancy and history.
+
+    Must be called inside a transaction.
+
+    Args:
+        property_obj: Property instance
+        layout: Output of plan_structure()
+        rename_floors: Apply floor names from the layout to existing floors
+
+    Returns:
+        dict: created/updated/deleted counts per level
+
+    Raises:
+        ValueError: when the layout would remove occupied beds (nothing is written)
+    """
+    floors_by_level = {f.floor_level: f for f in Floor.objects.filter(property=property_obj)}
+    floor_levels = {f.id: level for level, f in floors_by_level.items()}
+    rooms_by_key = {
+        (floor_levels[r.floor_id], r.room_number): r
+        for r in Room.objects.filter(property=property_obj)
+    }
+    room_keys = {r.id: key for key, r in rooms_by_key.items()}
+    # bed key -> (bed id, is_occupied)
+    beds_by_key = {
+        room_keys[b['room_id']] + (b['bed_number'],): (b['id'], bool(b['occupancy__is_occupied']))
+        for b in Bed.objects.filter(property=property_obj).values('id', 'room_id', 'bed_number', 'occupancy__is_occupied')
+    }
+
+    wanted_floors = {f['level']: f for f in layout}
+    wanted_rooms = {(f['level'], r['room_number']): r for f in layout for r in f['rooms']}
+    wanted_bed_keys = [key + (bed_number,) for key, r in wanted_rooms.items() for bed_number in r['beds']]
+    wanted_beds = set(wanted_bed_keys)
+
+    doomed_floors = [f.id for level, f in floors_by_level.items() if level not in wanted_floors]
+    doomed_rooms = [r.id for key, r in rooms_by_key.items() if key not in wanted_rooms]
+    doomed_beds = [bed_id for key, (bed_id, _) in beds_by_key.items() if key not in wanted_beds]
+
+    occupied = sorted(
+        f'{room_number}-{bed_number}'
+        for (level, room_number, bed_number), (_, is_occupied) in beds_by_key.items()
+        if is_occupied and (level, room_number, bed_number) not in wanted_beds
+    )
+    if occupied:
+        raise ValueError(f'Cannot remove occupied beds: {", ".join(occupied)}. Move or check out residents first.')
+
+    # Deletes, children first; set-based so no rows are loaded
+    if doomed_beds:
+        fast_delete(Bed.objects.filter(id__in=doomed_beds))
+    if doomed_rooms:
+        fast_delete(Room.objects.filter(id__in=doomed_rooms))
+    if doomed_floors:
+        fast_delete(Floor.objects.filter(id__in=doomed_floors))
+
+    # Updates
+    renamed_floors = []
+    if rename_floors:
+        for level, floor in floors_by_level.items():
+            wanted = wanted_floors.get(level)
+            if wanted and floor.floor_name != wanted['name']:
+                floor.floor_name = wanted['name']
+                renamed_floors.append(floor)
+        Floor.objects.bulk_update(renamed_floors, ['floor_name'], batch_size=BULK_BATCH_SIZE)
+
+    resized_rooms = []
+    for key, room in rooms_by_key.items():
+        wanted = wanted_rooms.get(key)
+        if wanted and room.total_beds != len(wanted['beds']):
+            room.total_beds = len(wanted['beds'])
+            resized_rooms.append(room)
+    Room.objects.bulk_update(resized_rooms, ['total_beds'], batch_size=BULK_BATCH_SIZE)
+
+    # Inserts, level by level
+    new_floors = Floor.objects.bulk_create(
+        [
+            Floor(property=property_obj, floor_level=level, floor_name=f['name'])
+            for level, f in wanted_floors.items() if level not in floors_by_level
+        ],
+        batch_size=BULK_BATCH_SIZE,
+    )
+    floors_by_level.update({f.floor_level: f for f in new_floors})
+
+    new_rooms = Room.objects.bulk_create(
+        [
+            Room(
+                floor=floors_by_level[level],
+                property=property_obj,
+                room_number=room_number,
+                total_beds=len(r['beds']),
+            )
+            for (level, room_number), r in wanted_rooms.items() if (level, room_number) not in rooms_by_key
+        ],
+        batch_size=BULK_BATCH_SIZE,
+    )
+    rooms_by_key.update({(r.floor.floor_level, r.room_number): r for r in new_rooms})
+
+    new_beds = Bed.objects.bulk_create(
+        [
+            Bed(room=rooms_by_key[key[:2]], floor_id=rooms_by_key[key[:2]].floor_id, property=property_obj,
+                bed_number=key[2], bed_name=key[2])
+            for key in wanted_bed_keys if key not in beds_by_key
+        ],
+        batch_size=BULK_BATCH_SIZE,
+    )
+    Occupancy.objects.bulk_create(
+        [
+            Occupancy(property=property_obj, floor_id=bed.floor_id, room_id=bed.room_id, bed=bed, is_occupied=False)
+            for bed in new_beds
+        ],
+        batch_size=BULK_BATCH_SIZE,
+    )
+
+    invalidate_home_summary(property_obj.id)
+    return {
+        'floors': len(new_floors),
+        'rooms': len(new_rooms),
+        'beds': len(new_beds),
+        'updated_floors': len(renamed_floors),
+        'updated_rooms': len(resized_rooms),
+        'deleted_floors': len(doomed_floors),
+        'deleted_rooms': len(doomed_rooms),
+        'deleted_beds': len(doomed_beds),
+    }
+
+
+def _highest_bed_index(bed_numbers) -> int:
+    """Largest A..Z / numeric bed index in use (0 if none are recognisable)."""
+    highest_idx = 0
+    for bed_number in bed_numbers:
+        if bed_number.isalpha() and len(bed_number) == 1:
+            highest_idx = max(highest_idx, ord(bed_number.upper()) - 64)
+        elif bed_number.isdigit():
+            highest_idx = max(highest_idx, int(bed_number))
+    return highest_idx
+
+
+def apply_room_capacity(changes: list) -> dict:
+    """
+    Add or remove beds for rooms whose total_beds changed, for any number of rooms
+    at once: one query to read the current beds, one set-based delete of the chosen
+    empty beds and one bulk insert each for new beds and their occupancies.
+
+    Shrinking removes empty beds starting from the highest bed_number (and skips the
+    room if it does not have enough empty beds); growing continues the room's
+    A..Z / numeric labelling.
+
+    Must be called inside a transaction.
+
+    Args:
+        changes: [(room, old_total_beds, new_total_beds), ...]
+
+    Returns:
+        dict: {'created_beds': n, 'deleted_beds': n}
+    """
+    changes = [(room, old, new) for room, old, new in changes if old != new]
+    if not changes:
+        return {'created_beds': 0, 'deleted_beds': 0}
+
+    beds_by_room = {room.id: [] for room, _, _ in changes}
+    beds = (
+        Bed.objects
+        .filter(room_id__in=list(beds_by_room))
+        .order_by('-bed_number')
+        .values_list('id', 'room_id', 'bed_number', 'occupancy__is_occupied')
+    )
+    for bed_id, room_id, bed_number, is_occupied in beds:
+        beds_by_room[room_id].append((bed_id, bed_number, is_occupied))
+
+    doomed_beds = []
+    new_beds = []
+    for room, old_total, new_total in changes:
+        room_beds = beds_by_room[room.id]
+        if new_total < old_total:
+            # Delete empty beds starting from the "highest" bed_number
+            empty_beds = [bed_id for bed_id, _, is_occupied in room_beds if is_occupied is False]
+            if len(empty_beds) >= old_total - new_total:
+                doomed_beds.extend(empty_beds[:old_total - new_total])
+        else:
+            highest_idx = _highest_bed_index(bed_number for _, bed_number, _ in room_beds) or old_total
+            for new_idx in range(highest_idx + 1, highest_idx + new_total - old_total + 1):
+                bed_number = default_bed_number(new_idx)
+                new_beds.append(Bed(
+                    room=room, floor_id=room.floor_id, property_id=room.property_id,
+                    bed_number=bed_number, bed_name=bed_number,
+                ))
+
+    if doomed_beds:
+        fast_delete(Bed.objects.filter(id__in=doomed_beds))
+
+    new_beds = Bed.objects.bulk_create(new_beds, batch_size=BULK_BATCH_SIZE)
+    Occupancy.objects.bulk_create(
+        [
+            Occupancy(property_id=bed.property_id, floor_id=bed.floor_id, room_id=bed.room_id, bed=bed, is_occupied=False)
+            for bed in new_beds
+        ],
+        batch_size=BULK_BATCH_SIZE,
+    )
+    for property_id in {room.property_id for room, _, _ in changes}:
+        invalidate_home_summary(property_id)
+    return {'created_beds': len(new_beds), 'deleted_beds': len(doomed_beds)}
@@ -0,0 +1,120 @@
+"""
+Test cases for JWT authentication (core.auth) and login password rehashing (core.hashers)
+
+Run with: python manage.py test properties.test_auth
+"""
+
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework import exceptions
+from rest_framework.test import APIClient, APIRequestFactory
+from core.auth import JWTAuthentication, TokenUser, generate_jwt, user_cache
+from properties.models import User
+
+
+class JWTAuthenticationTestCase(TestCase):
+
+    def setUp(self):
+        user_cache.clear()
+        cache.clear()
+        self.user = User.objects.create(username="auth", password_hash=make_password("secret-1"), role="manager")
+        self.token = generate_jwt(self.user)
+
+    def _authenticate(self, token):
+        request = APIRequestFactory().get('/api/properties/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        return JWTAuthentication().authenticate(request)
+
+    def _save(self, **changes):
+        for field, value in changes.items():
+            setattr(self.user, field, value)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+
+    def test_resolved_user_is_cached(self):
+        with self.assertNumQueries(1):
+            user, _ = self._authenticate(self.token)
+        with self.assertNumQueries(0):
+            cached, payload = self._authenticate(self.token)
+        self.assertEqual((cached.id, payload['ver']), (user.id, 0))
+
+    @override_settings(AUTH_USER_CACHE_SIZE=1)
+    def test_cache_is_bounded(self):
+        other = User.objects.create(username="auth-2", password_hash="x")
+        self._authenticate(self.token)
+        self._authenticate(generate_jwt(other))
+        with self.assertNumQueries(1):
+            self._authenticate(self.token)
+
+    def test_password_and_status_changes_revoke_tokens(self):
+        self._authenticate(self.token)
+        self._save(password_hash=make_password("secret-2"))
+        self.assertEqual(User.objects.get(pk=self.user.pk).token_version, 1)
+        with self.assertRaisesMessage(exceptions.AuthenticationFailed, 'Token revoked'):
+            self._authenticate(self.token)
+        fresh = generate_jwt(self.user)
+        self.assertEqual(self._authenticate(fresh)[0].token_version, 1)
+
+        # Unrelated edits keep tokens valid
+        self._save(email="auth@example.com")
+        self._authenticate(fresh)
+
+        self._save(is_active=False)
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            self._authenticate(fresh)
+
+    def test_update_fields_save_persists_bump(self):
+        self.user.role = 'admin'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save(update_fields=['role'])
+        self.assertEqual(User.objects.get(pk=self.user.pk).token_version, 1)
+
+    @override_settings(AUTH_STATELESS=True, AUTH_SHARED_TOKEN_VERSIONS=True)
+    def test_stateless_principal(self):
+        with self.assertNumQueries(0):
+            principal, _ = self._authenticate(self.token)
+        self.assertIsInstance(principal, TokenUser)
+        self.assertEqual((principal.id, principal.username, principal.role), (self.user.id, "auth", "manager"))
+
+        # A version bump published to the shared cache revokes stateless tokens too
+        self._save(role='staff')
+        with self.assertRaisesMessage(exceptions.AuthenticationFailed, 'Token revoked'):
+            self._authenticate(self.token)
+
+        # So does deleting the user
+        fresh = generate_jwt(User.objects.get(pk=self.user.pk))
+        self._authenticate(fresh)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.delete()
+        with self.assertRaisesMessage(exceptions.AuthenticationFailed, 'Token revoked'):
+            self._authenticate(fresh)
+
+
+@override_settings(PASSWORD_HASH_ITERATIONS=1000)
+class LoginRehashTestCase(TestCase):
+
+    def _login(self, password):
+        return APIClient().post('/api/auth/login/', {'username': 'rehash', 'password': password}, format='json')
+
+    def test_login_rehashes_to_configured_iterations(self):
+        user = User.objects.create(username="rehash", password_hash=make_password("secret-1"))
+        user.refresh_from_db()
+        self.assertTrue(user.password_hash.startswith('pbkdf2_sha256$1000$'))
+
+        with override_settings(PASSWORD_HASH_ITERATIONS=2000):
+            self.assertEqual(self._login("wrong").status_code, 401)
+            self.assertTrue(User.objects.get(pk=user.pk).password_hash.startswith('pbkdf2_sha256$1000$'))
+
+            response = self._login("secret-1")
+            self.assertEqual(response.status_code, 200)
+            user.refresh_from_db()
+            self.assertTrue(user.password_hash.startswith('pbkdf2_sha256$2000$'))
+            # A rehash is not a password change: the new token stays valid
+            self.assertEqual(user.token_version, 0)
+            self.assertEqual(self._login("secret-1").status_code, 200)
+
+    @override_settings(PASSWORD_HASH_THREADS=0)
+    def test_hashing_without_pool(self):
+        User.objects.create(username="rehash", password_hash=make_password("secret-1", hasher='pbkdf2_sha1'))
+        self.assertEqual(self._login("secret-1").status_code, 200)
+        self.assertTrue(User.objects.get(username="rehash").password_hash.startswith('pbkdf2_sha256$1000$'))
@@ -0,0 +1,72 @@
+"""
+Test cases for set-based property/floor deletion
+
+Run with: python manage.py test properties.test_deletion_utils
+"""
+
+from datetime import date
+from decimal import Decimal
+from django.test import TestCase
+from properties.models import (
+    Property, Floor, Room, Bed, Resident, Occupancy, OccupancyHistory,
+    Expense, Payment, MaintenanceRequest, User
+)
+from properties.structure_utils import plan_structure, create_structure
+from properties.deletion_utils import fast_delete
+
+
+class FastDeleteTestCase(TestCase):
+    """fast_delete removes the same rows as the ORM cascade."""
+
+    def _seed(self, name):
+        prop = Property.objects.create(name=name)
+        create_structure(prop, plan_structure(floors_count=2, rooms_per_floor=2, beds_per_room=2))
+        resident = Resident.objects.create(
+            property=prop, first_name="Kiran", mobile="9000033333",
+            rent=Decimal("4500.00"), joining_date=date(2025, 1, 1),
+        )
+        occ = Occupancy.objects.filter(property=prop).order_by('id').first()
+        occ.resident = resident
+        occ.is_occupied = True
+        occ.save()
+        OccupancyHistory.objects.create(
+            property=prop, floor_id=occ.floor_id, room_id=occ.room_id, bed_id=occ.bed_id,
+            resident=resident, action='occupied',
+        )
+        Payment.objects.create(property=prop, resident=resident, resident_name="Kiran",
+                               amount=Decimal("4500.00"), payment_method="cash")
+        Expense.objects.create(property=prop, amount=Decimal("200.00"), category="utilities",
+                               description="Power", expense_date="2025-01-05T00:00:00Z")
+        MaintenanceRequest.objects.create(property=prop, resident=resident, category="electrical", description="Noisy fan")
+        return prop
+
+    def setUp(self):
+        self.property = self._seed("Doomed Property")
+        self.other = self._seed("Kept Property")
+        self.user = User.objects.create(
+            username="manager", password_hash="x", role="manager", property=self.property,
+        )
+
+    def test_property_delete_cascades_and_nulls(self):
+        counts = fast_delete(Property.objects.filter(pk=self.property.pk))
+        self.assertEqual(counts['pg_property'], 1)
+        self.assertEqual(counts['pg_bed'], 8)
+        self.assertEqual(counts['pg_payment'], 1)
+
+        self.assertFalse(Property.objects.filter(pk=self.property.pk).exists())
+        for model in (Floor, Room, Bed, Resident, Occupancy, OccupancyHistory, Expense, Payment, MaintenanceRequest):
+            self.assertFalse(model.objects.filter(property_id=self.property.pk).exists(), model.__name__)
+            self.assertTrue(model.objects.filter(property=self.other).exists(), model.__name__)
+        self.user.refresh_from_db()
+        self.assertIsNone(self.user.property_id)
+
+    def test_floor_delete(self):
+        floor = Floor.objects.get(property=self.property, floor_level=1)
+        fast_delete(Floor.objects.filter(pk=floor.pk))
+        self.assertEqual(Bed.objects.filter(property=self.property).count(), 4)
+        self.assertEqual(Occupancy.objects.filter(property=self.property).count(), 4)
+        self.assertFalse(OccupancyHistory.objects.filter(floor_id=floor.pk).exists())
+        self.assertTrue(Resident.objects.filter(property=self.property).exists())
+
+    def test_empty_queryset(self):
+        self.assertEqual(fast_delete(Property.objects.none()), {})
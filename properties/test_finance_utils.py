@@ -0,0 +1,123 @@
+"""
+Test cases for the grouped financial summary
+
+Run with: python manage.py test properties.test_finance_utils
+"""
+
+from datetime import date, datetime
+from decimal import Decimal
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+from properties.models import Property, Resident, Expense, Payment
+from properties.finance_utils import build_financial_summary
+
+
+def aware(year, month, day):
+    return timezone.make_aware(datetime(year, month, day, 12, 0))
+
+
+class FinancialSummaryTestCase(TestCase):
+    """Multi-year report built from grouped queries."""
+
+    def setUp(self):
+        cache.clear()
+        self.property = Property.objects.create(name="Finance Property")
+        self.resident = Resident.objects.create(
+            property=self.property, first_name="Leela", mobile="9000055555",
+            rent=Decimal("6000.00"), joining_date=date(2024, 3, 10), move_out_date=date(2026, 2, 1),
+        )
+        Resident.objects.create(
+            property=self.property, first_name="Old", mobile="9000055556",
+            rent=Decimal("6000.00"), joining_date=date(2015, 1, 1),
+        )
+        for when, amount in [(aware(2026, 1, 5), "6000.00"), (aware(2026, 1, 20), "500.50"), (aware(2024, 12, 31), "6000.00")]:
+            payment = Payment.objects.create(
+                property=self.property, resident=self.resident, resident_name="Leela",
+                amount=Decimal(amount), payment_method="upi",
+            )
+            # payment_date is auto_now_add; only set on the first save
+            payment.payment_date = when
+            payment.save()
+        for when, category, amount in [
+            (aware(2026, 1, 2), "electricity", "1200.00"),
+            (aware(2026, 3, 2), "electricity", "800.00"),
+            (aware(2026, 3, 9), "cleaning", "300.00"),
+            (aware(2020, 6, 1), "repairs", "999.00"),
+        ]:
+            Expense.objects.create(
+                property=self.property, category=category, description=category,
+                amount=Decimal(amount), expense_date=when,
+            )
+
+    def test_year_window_and_values(self):
+        with self.assertNumQueries(2):
+            summary = build_financial_summary(self.property, years=3, today=date(2026, 10, 17))
+        self.assertEqual([y['year'] for y in summary['years']], [2026, 2025, 2024])
+
+        y2026 = summary['years'][0]
+        self.assertEqual(y2026['monthly']['income'][0], 6500.5)
+        self.assertEqual(y2026['monthly']['expenses'][:3], [1200.0, 0.0, 1100.0])
+        self.assertEqual(y2026['totals'], {'income': 6500.5, 'expenses': 2300.0, 'net': 4200.5})
+        self.assertEqual(
+            y2026['top_spendings']['categories'],
+            [{'category': 'electricity', 'total': 2000.0}, {'category': 'cleaning', 'total': 300.0}],
+        )
+        self.assertEqual(y2026['residents'], {'joined': 0, 'moved_out': 1})
+
+        y2024 = summary['years'][2]
+        self.assertEqual(y2024['monthly']['income'][11], 6000.0)
+        self.assertEqual(y2024['residents'], {'joined': 1, 'moved_out': 0})
+        self.assertEqual(summary['years'][1]['totals'], {'income': 0.0, 'expenses': 0.0, 'net': 0.0})
+
+    def test_older_rows_need_wider_window(self):
+        summary = build_financial_summary(self.property, years=7, today=date(2026, 10, 17))
+        self.assertEqual(summary['years'][-1]['year'], 2020)
+        self.assertEqual(summary['years'][-1]['totals']['expenses'], 999.0)
+
+
+class ClosedPeriodCacheTestCase(TestCase):
+    """Closed months are cached until a backdated write lands in them."""
+
+    def setUp(self):
+        cache.clear()
+        self.property = Property.objects.create(name="Cache Property")
+        self.resident = Resident.objects.create(
+            property=self.property, first_name="Ravi", mobile="9000077777",
+            rent=Decimal("5000.00"), joining_date=date(2024, 1, 1),
+        )
+        self.today = timezone.localdate()
+        self.last_year = self.today.year - 1
+        self._expense(aware(self.last_year, 6, 1), "700.00")
+
+    def _expense(self, when, amount):
+        return Expense.objects.create(
+            property=self.property, category="repairs", description="Fix",
+            amount=Decimal(amount), expense_date=when,
+        )
+
+    def _june_expenses(self, summary):
+        return summary['years'][1]['monthly']['expenses'][5]
+
+    def test_closed_months_served_from_cache(self):
+        summary = build_financial_summary(self.property, years=2)
+        self.assertEqual(self._june_expenses(summary), 700.0)
+        with self.assertNumQueries(2):
+            # Open month(s) + resident stats; closed months come from the cache
+            build_financial_summary(self.property, years=2)
+
+    def test_backdated_write_invalidates_month(self):
+        build_financial_summary(self.property, years=2)
+        with self.captureOnCommitCallbacks(execute=True):
+            expense = self._expense(aware(self.last_year, 6, 15), "300.00")
+        self.assertEqual(self._june_expenses(build_financial_summary(self.property, years=2)), 1000.0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            expense.delete()
+        self.assertEqual(self._june_expenses(build_financial_summary(self.property, years=2)), 700.0)
+
+    def test_open_month_is_live(self):
+        build_financial_summary(self.property, years=1)
+        self._expense(timezone.now(), "50.00")
+        summary = build_financial_summary(self.property, years=1)
+        self.assertEqual(summary['years'][0]['monthly']['expenses'][self.today.month - 1], 50.0)
@@ -0,0 +1,151 @@
+"""
+Test cases for the cached home screen summary
+
+Run with: python manage.py test properties.test_home_summary
+"""
+
+import threading
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from properties import home_utils
+from properties.home_utils import get_home_summary, HIT, STALE, MISS
+from properties.models import Property, Resident, Payment, User
+from properties.structure_utils import plan_structure, create_structure
+
+
+def outstanding(summary):
+    return Decimal(summary['overdue']['total_amount']) + Decimal(summary['due']['total_amount'])
+
+
+@override_settings(HOME_SUMMARY_STALE_WHILE_REVALIDATE=False)
+class HomeSummaryCacheTestCase(TestCase):
+    """Cached per property and day until a relevant write commits."""
+
+    def setUp(self):
+        cache.clear()
+        self.property = Property.objects.create(name="Home Property")
+        self.today = timezone.now().date()
+        self.resident = Resident.objects.create(
+            property=self.property, first_name="Asha", mobile="9000088888",
+            rent=Decimal("6000.00"), rent_type="monthly",
+            joining_date=self.today - timedelta(days=75),
+        )
+
+    def _pay(self, amount):
+        with self.captureOnCommitCallbacks(execute=True):
+            Payment.objects.create(
+                property=self.property, resident=self.resident, resident_name="Asha",
+                amount=Decimal(amount), payment_method="upi",
+            )
+
+    def test_second_read_is_served_from_cache(self):
+        summary, status = get_home_summary(self.property)
+        self.assertEqual(status, MISS)
+        self.assertGreater(outstanding(summary), 0)
+        with self.assertNumQueries(0):
+            cached, status = get_home_summary(self.property)
+        self.assertEqual(status, HIT)
+        self.assertEqual(cached, summary)
+
+    def test_payment_invalidates(self):
+        before, _ = get_home_summary(self.property)
+        self._pay("1000.00")
+        after, status = get_home_summary(self.property)
+        self.assertEqual(status, MISS)
+        self.assertEqual(outstanding(after), outstanding(before) - Decimal("1000.00"))
+
+    def test_other_property_writes_do_not_invalidate(self):
+        get_home_summary(self.property)
+        with self.captureOnCommitCallbacks(execute=True):
+            Resident.objects.create(
+                property=Property.objects.create(name="Elsewhere"), first_name="Zed",
+                mobile="9000088889", rent=Decimal("100.00"), joining_date=self.today,
+            )
+        self.assertEqual(get_home_summary(self.property)[1], HIT)
+
+    def test_structure_changes_invalidate(self):
+        get_home_summary(self.property)
+        with self.captureOnCommitCallbacks(execute=True):
+            create_structure(self.property, plan_structure(floors_count=1, rooms_per_floor=2, beds_per_room=3))
+        summary, status = get_home_summary(self.property)
+        self.assertEqual((status, summary['available_beds']), (MISS, 6))
+
+    def test_new_day_recomputes(self):
+        get_home_summary(self.property)
+        self.assertEqual(get_home_summary(self.property, today=self.today + timedelta(days=1))[1], MISS)
+
+    @override_settings(SINGLE_FLIGHT_ACROSS_WORKERS=False)
+    def test_write_during_computation_is_not_shared(self):
+        started, release = threading.Event(), threading.Event()
+        calls = []
+
+        def build(property_obj, today):
+            calls.append(1)
+            if len(calls) == 1:
+                started.set()
+                release.wait(5)
+                return {'summary': 'before write'}
+            return {'summary': 'after write'}
+
+        with mock.patch.object(home_utils, 'build_home_summary', side_effect=build):
+            leader = threading.Thread(target=get_home_summary, args=(self.property,))
+            leader.start()
+            started.wait(5)
+            # A write commits while the leader is still computing
+            cache.set(home_utils._version_key(self.property.id), 'after-write', timeout=None)
+            self.assertEqual(get_home_summary(self.property), ({'summary': 'after write'}, MISS))
+            release.set()
+            leader.join(5)
+            # The leader's result is stored under the version it started with
+            self.assertEqual(get_home_summary(self.property)[0], {'summary': 'after write'})
+
+
+class StaleWhileRevalidateTestCase(TestCase):
+    """Stale summaries are served at once and refreshed off the request."""
+
+    def setUp(self):
+        cache.clear()
+        self.property = Property.objects.create(name="Stale Property")
+        self.resident = Resident.objects.create(
+            property=self.property, first_name="Binu", mobile="9000099999",
+            rent=Decimal("6000.00"), rent_type="monthly",
+            joining_date=timezone.now().date() - timedelta(days=75),
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=User.objects.create(username="home", password_hash="x", role="admin"))
+
+    def test_stale_then_refreshed(self):
+        url = f'/api/properties/{self.property.id}/home_summary/'
+        first = self.client.get(url)
+        self.assertEqual(first['X-Home-Summary-Cache'], MISS)
+        with self.captureOnCommitCallbacks(execute=True):
+            Payment.objects.create(
+                property=self.property, resident=self.resident, resident_name="Binu",
+                amount=Decimal("500.00"), payment_method="cash",
+            )
+
+        refreshes = []
+        with mock.patch.object(home_utils, '_start_background', side_effect=refreshes.append):
+            stale = self.client.get(url)
+            # A second stale read does not start another refresh
+            self.client.get(url)
+        self.assertEqual(stale['X-Home-Summary-Cache'], STALE)
+        self.assertEqual(stale.data, first.data)
+        self.assertEqual(len(refreshes), 1)
+
+        # Run the refresh here: a real thread would not see this test's transaction
+        with mock.patch.object(home_utils.connection, 'close'):
+            refreshes[0]()
+        fresh = self.client.get(url)
+        self.assertEqual(fresh['X-Home-Summary-Cache'], HIT)
+        self.assertEqual(outstanding(fresh.data), outstanding(first.data) - Decimal("500.00"))
+
+    def test_refresh_param_bypasses_cache(self):
+        url = f'/api/properties/{self.property.id}/home_summary/'
+        self.client.get(url)
+        self.assertEqual(self.client.get(url, {'refresh': 'true'})['X-Home-Summary-Cache'], MISS)
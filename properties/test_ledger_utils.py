@@ -0,0 +1,197 @@
+"""
+Test cases for the resident ledger
+
+Run with: python manage.py test properties.test_ledger_utils
+"""
+
+from datetime import date, datetime
+from decimal import Decimal
+from django.db.models import Sum
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from properties.models import Property, Resident, Payment, ResidentLedger, User
+from properties.billing_utils import generate_charges
+from properties.ledger_utils import post_rent_accruals, rebuild_ledger, build_statement, paid_through
+from properties.payment_utils import calculate_due_amount, expected_rent_total
+
+
+def aware(year, month, day):
+    return timezone.make_aware(datetime(year, month, day, 10, 0))
+
+
+class LedgerTestMixin:
+
+    def _pay(self, resident, amount, when=None):
+        payment = Payment.objects.create(
+            property=resident.property, resident=resident, resident_name=resident.first_name,
+            amount=Decimal(amount), payment_method="cash",
+        )
+        if when is not None:
+            # payment_date is auto_now_add; only set on the first save
+            payment.payment_date = when
+            payment.save()
+        return payment
+
+    def assertRunningTotals(self, resident):
+        balance = paid = Decimal(0)
+        for entry in ResidentLedger.objects.filter(resident=resident).order_by('entry_date', 'id'):
+            balance += entry.amount
+            paid += -entry.amount if entry.entry_type == 'payment' else 0
+            self.assertEqual((entry.balance, entry.total_paid), (balance, paid), entry)
+
+
+class LedgerMaintenanceTestCase(LedgerTestMixin, TestCase):
+    """Payment and arrears writes keep running totals consistent."""
+
+    def setUp(self):
+        self.property = Property.objects.create(name="Ledger Property")
+        self.resident = Resident.objects.create(
+            property=self.property, first_name="Mira", mobile="9000011111",
+            rent=Decimal("6000.00"), joining_date=date(2026, 1, 10), arrears=Decimal("500.00"),
+        )
+
+    def test_backdated_edit_and_delete(self):
+        latest = self._pay(self.resident, "1000.00")
+        middle = self._pay(self.resident, "2000.00", aware(2026, 3, 5))
+        self._pay(self.resident, "300.00", aware(2026, 2, 1))
+        self.assertRunningTotals(self.resident)
+        self.assertEqual(paid_through(self.resident, date(2026, 3, 4)), Decimal("300.00"))
+
+        middle.amount = Decimal("2500.00")
+        middle.payment_date = aware(2026, 1, 20)
+        middle.save()
+        self.assertRunningTotals(self.resident)
+        self.assertEqual(paid_through(self.resident, date(2026, 3, 4)), Decimal("2800.00"))
+
+        latest.delete()
+        self.assertRunningTotals(self.resident)
+        self.assertEqual(ResidentLedger.objects.filter(payment__isnull=False).count(), 2)
+
+        self.resident.arrears = Decimal("200.00")
+        self.resident.save()
+        self.assertRunningTotals(self.resident)
+        self.assertEqual(
+            ResidentLedger.objects.filter(resident=self.resident, entry_type='arrears').aggregate(t=Sum('amount'))['t'],
+            Decimal("200.00"),
+        )
+
+    def test_paid_total_matches_payment_sum(self):
+        for when, amount in [(aware(2026, 1, 12), "6000.00"), (aware(2026, 2, 28), "450.50"), (None, "99.00")]:
+            self._pay(self.resident, amount, when)
+        for day in [date(2026, 1, 11), date(2026, 2, 28), timezone.now().date()]:
+            expected = Payment.objects.filter(
+                resident=self.resident, payment_date__date__lte=day,
+            ).aggregate(t=Sum('amount'))['t'] or Decimal(0)
+            self.assertEqual(paid_through(self.resident, day), expected)
+
+    def test_due_reads_one_ledger_row(self):
+        self._pay(self.resident, "700.00", aware(2026, 2, 1))
+        with self.assertNumQueries(1):
+            due = calculate_due_amount(self.resident, date(2026, 4, 15))
+        # Jan, Feb, Mar rent + arrears - payments
+        self.assertEqual(due, Decimal("18000.00") + Decimal("500.00") - Decimal("700.00"))
+
+    def test_rebuild_matches_maintained_ledger(self):
+        self._pay(self.resident, "1000.00", aware(2026, 2, 3))
+        self._pay(self.resident, "250.00", aware(2026, 1, 30))
+        maintained = sorted(ResidentLedger.objects.values_list('entry_type', 'entry_date', 'amount', 'payment_id'))
+        rebuild_ledger([self.resident.id], as_of_date=date(2026, 1, 1))
+        self.assertEqual(sorted(ResidentLedger.objects.values_list('entry_type', 'entry_date', 'amount', 'payment_id')), maintained)
+        self.assertRunningTotals(self.resident)
+
+
+class RentAccrualTestCase(LedgerTestMixin, TestCase):
+    """Closed months are posted once, matching the due calculation."""
+
+    def setUp(self):
+        self.property = Property.objects.create(name="Accrual Property")
+
+    def _resident(self, rent_type, rent, joining_date, **extra):
+        return Resident.objects.create(
+            property=self.property, first_name=rent_type, mobile="9000022222",
+            rent=Decimal(rent), rent_type=rent_type, joining_date=joining_date, **extra,
+        )
+
+    def test_monthly_rent_posted_in_arrears(self):
+        resident = self._resident('monthly', "6000.00", date(2026, 1, 15))
+        self.assertEqual(post_rent_accruals(resident, date(2026, 4, 10)), 3)
+        self.assertEqual(post_rent_accruals(resident, date(2026, 4, 30)), 0)
+        rows = list(ResidentLedger.objects.filter(resident=resident, entry_type='rent').values_list(
+            'entry_date', 'period_start', 'amount'))
+        self.assertEqual(rows, [
+            (date(2026, 2, 1), date(2026, 1, 15), Decimal("6000.00")),
+            (date(2026, 3, 1), date(2026, 2, 1), Decimal("6000.00")),
+            (date(2026, 4, 1), date(2026, 3, 1), Decimal("6000.00")),
+        ])
+        self.assertEqual(sum(r[2] for r in rows), expected_rent_total(resident, date(2026, 4, 10)))
+
+    def test_weekly_rent_telescopes_across_runs(self):
+        resident = self._resident('weekly', "1000.00", date(2026, 1, 3))
+        post_rent_accruals(resident, date(2026, 2, 10))
+        post_rent_accruals(resident, date(2026, 5, 2))
+        posted = ResidentLedger.objects.filter(resident=resident, entry_type='rent').aggregate(t=Sum('amount'))['t']
+        self.assertEqual(posted, expected_rent_total(resident, date(2026, 4, 30)).quantize(Decimal('0.01')))
+        self.assertRunningTotals(resident)
+
+    def test_rent_change_reposts(self):
+        resident = self._resident('daily', "100.00", date(2026, 3, 20))
+        post_rent_accruals(resident, date(2026, 5, 2))
+        resident.rent = Decimal("120.00")
+        resident.save()
+        self.assertFalse(ResidentLedger.objects.filter(resident=resident, entry_type='rent').exists())
+        post_rent_accruals(resident, date(2026, 5, 2))
+        self.assertEqual(
+            list(ResidentLedger.objects.filter(resident=resident, entry_type='rent').values_list('amount', flat=True)),
+            [Decimal("1440.00"), Decimal("3600.00")],
+        )
+
+
+class StatementTestCase(LedgerTestMixin, TestCase):
+    """Monthly statement built from running balances."""
+
+    def setUp(self):
+        self.property = Property.objects.create(name="Statement Property")
+        self.resident = Resident.objects.create(
+            property=self.property, first_name="Kiran", mobile="9000033333",
+            rent=Decimal("100.00"), rent_type="daily", joining_date=date(2026, 3, 20), arrears=Decimal("50.00"),
+        )
+        self._pay(self.resident, "1000.00", aware(2026, 4, 2))
+
+    def test_months_and_balances(self):
+        statement = build_statement(self.resident, months=2, today=date(2026, 5, 2))
+        self.assertEqual(statement['from'], '2026-04-01')
+        # March: arrears 50 + rent 12 days
+        self.assertEqual(statement['opening_balance'], '1250.00')
+        april, may = statement['months']
+        self.assertEqual(
+            (april['month'], april['charges'], april['credits'], april['closing_balance']),
+            ('2026-04', '3000.00', '1000.00', '3250.00'),
+        )
+        self.assertEqual([e['type'] for e in april['entries']], ['payment', 'rent'])
+        self.assertEqual((may['opening_balance'], may['closing_balance']), ('3250.00', '3250.00'))
+        self.assertEqual(statement['unbilled_rent'], '200.00')
+
+    def test_statement_is_read_only(self):
+        # Nothing posted: the closed months are added on the fly
+        statement = build_statement(self.resident, months=2, today=date(2026, 5, 2))
+        self.assertFalse(ResidentLedger.objects.filter(resident=self.resident, entry_type='rent').exists())
+        self.assertIsNone(statement['months'][0]['entries'][1]['id'])
+
+        # Same figures once the billing run has posted them
+        generate_charges(date(2026, 5, 2), resident_ids=[self.resident.id])
+        self.assertEqual(ResidentLedger.objects.filter(resident=self.resident, entry_type='rent').count(), 2)
+        posted = build_statement(self.resident, months=2, today=date(2026, 5, 2))
+        for month in (*statement['months'], *posted['months']):
+            for entry in month['entries']:
+                entry['id'] = None
+        self.assertEqual(posted, statement)
+
+    def test_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(user=User.objects.create(username="ledger", password_hash="x", role="admin"))
+        url = f'/api/residents/{self.resident.id}/statement/'
+        response = client.get(url, {'months': 3})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['months']), 3)
+        self.assertEqual(client.get(url, {'months': 0}).status_code, 400)
@@ -0,0 +1,219 @@
+"""
+Test cases for media storage (uploads, metrics), background resident uploads
+and the resident media proxy
+
+Run with: python manage.py test properties.test_media
+"""
+
+import os
+import shutil
+import tempfile
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from properties.media_utils import RangeNotSatisfiable, parse_range
+from properties.models import Property, Floor, Room, Bed, Resident, Expense, User
+from properties.storage import LocalMediaStorage, get_media_storage, reset_storage_metrics, storage_metrics
+from properties.upload_utils import expire_uploads, resume_uploads
+
+
+class ParseRangeTestCase(SimpleTestCase):
+
+    def test_ranges(self):
+        self.assertEqual(parse_range('bytes=0-9', 100), (0, 9))
+        self.assertEqual(parse_range('bytes=90-', 100), (90, 99))
+        self.assertEqual(parse_range('bytes=-10', 100), (90, 99))
+        self.assertEqual(parse_range('bytes=50-500', 100), (50, 99))
+        # Multiple or malformed ranges serve the whole object
+        self.assertIsNone(parse_range('bytes=0-1,5-6', 100))
+        self.assertIsNone(parse_range('items=0-1', 100))
+        self.assertIsNone(parse_range('bytes=a-b', 100))
+        with self.assertRaises(RangeNotSatisfiable):
+            parse_range('bytes=100-', 100)
+
+
+class MediaProxyTestCase(TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+        override = override_settings(
+            MEDIA_STORAGE='local', MEDIA_STORAGE_ROOT=self.root, GCS_BUCKET='media-bucket',
+            MEDIA_CACHE_DIR=self.cache_dir, MEDIA_CACHE_MAX_BYTES=1024 * 1024, MEDIA_CHUNK_SIZE=64,
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.data = bytes(range(256)) * 4
+        self.path = os.path.join(self.root, 'properties', 'photo.jpg')
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, 'wb') as f:
+            f.write(self.data)
+
+        prop = Property.objects.create(name="Media Property")
+        self.resident = Resident.objects.create(
+            property=prop, first_name="Media", mobile="9000000001", rent=Decimal('1000'),
+            joining_date=date(2026, 1, 1),
+            photo_url='https://storage.googleapis.com/media-bucket/properties/photo.jpg',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=User.objects.create(username="media", password_hash="x", role="admin"))
+        self.url = f'/api/residents/{self.resident.id}/media/photo/'
+
+    def test_streams_with_etag_and_range(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(b''.join(response.streaming_content), self.data)
+        self.assertEqual((response['Content-Type'], response['Content-Length']), ('image/jpeg', str(len(self.data))))
+        etag = response['ETag']
+
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        partial = self.client.get(self.url, HTTP_RANGE='bytes=100-299')
+        self.assertEqual(partial.status_code, 206)
+        self.assertEqual(partial['Content-Range'], f'bytes 100-299/{len(self.data)}')
+        self.assertEqual(b''.join(partial.streaming_content), self.data[100:300])
+
+        # A stale If-Range serves the whole object
+        self.assertEqual(self.client.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"old"').status_code, 200)
+        self.assertEqual(self.client.get(self.url, HTTP_RANGE='bytes=5000-').status_code, 416)
+
+    def test_repeat_views_served_from_cache(self):
+        b''.join(self.client.get(self.url).streaming_content)
+        os.remove(self.path)
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.data)
+        partial = self.client.get(self.url, HTTP_RANGE='bytes=-4')
+        self.assertEqual(b''.join(partial.streaming_content), self.data[-4:])
+
+        # Once the cached copy is due for revalidation the storage is asked again
+        with override_settings(MEDIA_CACHE_TTL=0):
+            self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_cache_is_bounded(self):
+        with override_settings(MEDIA_CACHE_MAX_BYTES=len(self.data) + 10):
+            b''.join(self.client.get(self.url).streaming_content)
+            other = os.path.join(self.root, 'properties', 'aadhar.pdf')
+            with open(other, 'wb') as f:
+                f.write(b'x' * 100)
+            self.resident.aadhar_url = 'properties/aadhar.pdf'
+            self.resident.save()
+            aadhar = self.client.get(f'/api/residents/{self.resident.id}/media/aadhar/')
+            self.assertEqual(b''.join(aadhar.streaming_content), b'x' * 100)
+
+        cached = [name for name in os.listdir(self.cache_dir) if name.endswith('.data')]
+        self.assertEqual(len(cached), 1)
+
+
+class MediaUploadTestCase(TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.spool = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.addCleanup(shutil.rmtree, self.spool)
+        override = override_settings(
+            MEDIA_STORAGE='local', MEDIA_STORAGE_ROOT=self.root, GCS_BUCKET='media-bucket', MEDIA_CACHE_MAX_BYTES=0,
+            MEDIA_SPOOL_DIR=self.spool, MEDIA_UPLOAD_THREADS=0, MEDIA_UPLOAD_RETRIES=1, MEDIA_UPLOAD_RETRY_DELAY=0,
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+        reset_storage_metrics()
+        self.property = Property.objects.create(name="Upload Property")
+        floor = Floor.objects.create(property=self.property, floor_level=1, floor_name="Ground")
+        room = Room.objects.create(floor=floor, property=self.property, room_number="0101", total_beds=1)
+        self.beds = [
+            Bed.objects.create(room=room, floor=floor, property=self.property, bed_number=n, bed_name=n) for n in "AB"
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(user=User.objects.create(username="upload", password_hash="x", role="admin"))
+
+    def test_storage_is_shared(self):
+        self.assertIs(get_media_storage(), get_media_storage())
+
+    def _create_resident(self):
+        bed = self.beds.pop()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/residents/', {
+                'property': self.property.id, 'first_name': "Upload", 'mobile': "9000000002",
+                'rent': '1000', 'joining_date': '2026-01-01', 'rent_type': 'monthly', 'is_active': 'true',
+                'floor_id': bed.floor_id, 'room_id': bed.room_id, 'bed_id': bed.id,
+                'photo': SimpleUploadedFile('face.png', b'png-bytes', content_type='image/png'),
+            }, format='multipart')
+            self.assertEqual(response.status_code, 201, response.data)
+            # The response does not wait for the upload
+            self.assertEqual((response.data['photo_status'], response.data['photo_url']), ('pending', None))
+            self.assertEqual(self.client.get(f"/api/residents/{response.data['id']}/media/photo/").status_code, 404)
+        return Resident.objects.get(pk=response.data['id'])
+
+    def test_resident_photo_round_trip(self):
+        resident = self._create_resident()
+        self.assertEqual(resident.photo_status, 'uploaded')
+        self.assertEqual(
+            resident.photo_url,
+            f'local://media-bucket/properties/{self.property.id}/residents/{resident.id}/photo/face.png',
+        )
+        self.assertIsNone(resident.aadhar_status)
+        self.assertEqual(os.listdir(self.spool), [])
+
+        media = self.client.get(f'/api/residents/{resident.id}/media/photo/')
+        self.assertEqual(b''.join(media.streaming_content), b'png-bytes')
+        self.assertEqual(media['Content-Type'], 'image/png')
+
+        operations = self.client.get('/api/health/storage/').json()['operations']['local']
+        self.assertEqual((operations['upload']['count'], operations['stat']['count']), (1, 1))
+        self.assertEqual(operations['upload']['errors'], 0)
+
+    def test_upload_retries_then_resumes(self):
+        upload = LocalMediaStorage._upload
+        with mock.patch.object(LocalMediaStorage, '_upload', autospec=True, side_effect=[OSError('flaky'), upload]) as flaky:
+            resident = self._create_resident()
+        self.assertEqual(flaky.call_count, 2)
+        self.assertEqual(resident.photo_status, 'uploaded')
+
+        with mock.patch.object(LocalMediaStorage, '_upload', side_effect=OSError('down')):
+            resident = self._create_resident()
+        self.assertEqual((resident.photo_status, resident.photo_url), ('failed', None))
+        self.assertEqual(storage_metrics()['local']['upload']['errors'], 3)
+
+        # The spooled file is kept for resume_media_uploads
+        self.assertEqual(resume_uploads(inline=True), 1)
+        resident.refresh_from_db()
+        self.assertEqual(resident.photo_status, 'uploaded')
+        self.assertEqual(resume_uploads(inline=True), 0)
+
+    def test_expense_receipt_upload(self):
+        response = self.client.post('/api/expenses/', {
+            'property': self.property.id, 'amount': '250.00', 'category': 'utilities',
+            'expense_date': '2026-10-01', 'description': "Power bill",
+            'receipt': SimpleUploadedFile('bill.pdf', b'%PDF-receipt', content_type='application/pdf'),
+        }, format='multipart')
+        self.assertEqual(response.status_code, 201, response.data)
+        expense = Expense.objects.get(pk=response.data['id'])
+        self.assertEqual(response.data['receipt_url'], expense.receipt_url)
+        object_name = get_media_storage().object_name(expense.receipt_url)
+        with open(os.path.join(self.root, object_name), 'rb') as f:
+            self.assertEqual(f.read(), b'%PDF-receipt')
+        self.assertEqual(storage_metrics()['local']['upload']['count'], 1)
+
+    def test_lost_pending_uploads_expire(self):
+        resident = self._create_resident()
+        Resident.objects.filter(pk=resident.pk).update(photo_url=None, photo_status='pending')
+        # Recently queued (possibly still uploading on another instance): left alone
+        self.assertEqual(expire_uploads(), 0)
+
+        Resident.objects.filter(pk=resident.pk).update(updated_at=timezone.now() - timedelta(hours=2))
+        self.assertEqual(expire_uploads(), 1)
+        resident.refresh_from_db()
+        self.assertEqual(resident.photo_status, 'failed')
+        response = self.client.get(f'/api/residents/{resident.id}/media/photo/')
+        self.assertEqual(response.data['detail'], 'Media not available for resident.')
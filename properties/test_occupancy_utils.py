@@ -0,0 +1,71 @@
+"""
+Test cases for the consolidated occupancy tree builder
+
+Run with: python manage.py test properties.test_occupancy_utils
+"""
+
+from datetime import date
+from decimal import Decimal
+from django.test import TestCase
+from properties.models import Property, Floor, Room, Bed, Resident, Occupancy
+from properties.serializers import PropertyOccupancyDetailSerializer
+from properties.occupancy_utils import build_occupancy_tree
+
+
+class OccupancyTreeTestCase(TestCase):
+    """Occupancy tree must match PropertyOccupancyDetailSerializer output."""
+
+    def setUp(self):
+        self.property = Property.objects.create(
+            name="Tree Property",
+            floors_count=2,
+            rooms_per_floor=2,
+            beds_per_room=2,
+        )
+        resident = Resident.objects.create(
+            property=self.property,
+            first_name="Asha",
+            last_name="K",
+            mobile="9876500000",
+            rent=Decimal("5000.00"),
+            joining_date=date(2025, 1, 1),
+        )
+        for level in (1, 2):
+            floor = Floor.objects.create(property=self.property, floor_level=level, floor_name=f"Floor {level}")
+            for r_idx in (1, 2):
+                room = Room.objects.create(
+                    floor=floor,
+                    property=self.property,
+                    room_number=f"{level:02d}{r_idx:02d}",
+                    total_beds=2,
+                )
+                for bed_number in ("A", "B"):
+                    bed = Bed.objects.create(
+                        room=room,
+                        floor=floor,
+                        property=self.property,
+                        bed_number=bed_number,
+                        bed_name=bed_number,
+                    )
+                    occupied = level == 1 and r_idx == 1 and bed_number == "A"
+                    Occupancy.objects.create(
+                        property=self.property,
+                        floor=floor,
+                        room=room,
+                        bed=bed,
+                        resident=resident if occupied else None,
+                        is_occupied=occupied,
+                    )
+
+    def test_matches_serializer(self):
+        """Builder output is identical to the nested serializers."""
+        expected = PropertyOccupancyDetailSerializer(self.property).data
+        self.assertEqual(build_occupancy_tree(self.property), expected)
+
+    def test_fixed_query_count(self):
+        """Floors, rooms, beds and occupancies are each loaded once."""
+        with self.assertNumQueries(4):
+            tree = build_occupancy_tree(self.property)
+        self.assertEqual(tree['occupied_beds'], 1)
+        self.assertEqual(tree['available_beds'], 7)
+        self.assertEqual(tree['floors'][0]['rooms'][0]['beds'][0]['resident_name'], "Asha K")
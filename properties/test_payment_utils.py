@@ -7,7 +7,9 @@ Run with: python manage.py test properties.tests
 import unittest
 from datetime import date, timedelta
 from decimal import Decimal
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 from properties.models import Property, Resident, Payment
 from properties.payment_utils import (
@@ -16,6 +18,9 @@ from properties.payment_utils import (
     get_overdue_amount,
     get_days_overdue,
     next_billing_date,
+    get_payment_status,
+    calculate_dues_for_residents,
+    annotate_payment_status,
 )
 
 
@@ -347,5 +352,135 @@ class DueCalculationTestCase(TestCase):
             self.assertEqual(next_bill.day, 15)
 
 
+
+class BatchDueCalculationTestCase(TestCase):
+    """Batch due engine must match the per-resident helpers."""
+    
+    def setUp(self):
+        self.property = Property.objects.create(name="Batch Property")
+        today = timezone.now().date()
+        specs = [
+            ("daily", Decimal("100.00"), 4, Decimal("0")),
+            ("weekly", Decimal("700.00"), 20, Decimal("150.00")),
+            ("bi-weekly", Decimal("1400.00"), 40, Decimal("0")),
+            ("monthly", Decimal("6000.00"), 75, Decimal("0")),
+            ("monthly", Decimal("6000.00"), 400, Decimal("1000.00")),
+        ]
+        self.residents = []
+        for idx, (rent_type, rent, days_ago, arrears) in enumerate(specs):
+            resident = Resident.objects.create(
+                property=self.property,
+                first_name=f"Batch{idx}",
+                mobile=f"90000000{idx:02d}",
+                rent=rent,
+                rent_type=rent_type,
+                joining_date=today - timedelta(days=days_ago),
+                arrears=arrears,
+            )
+            self.residents.append(resident)
+        # Partial payments for some residents
+        for resident in self.residents[::2]:
+            Payment.objects.create(
+                property=self.property,
+                resident=resident,
+                resident_name=resident.name,
+                amount=Decimal("250.00"),
+                payment_method="cash",
+            )
+        # Moved-out resident with a payment after move-out
+        self.moved_out = Resident.objects.create(
+            property=self.property,
+            first_name="Moved",
+            mobile="9000000099",
+            rent=Decimal("100.00"),
+            rent_type="daily",
+            joining_date=today - timedelta(days=10),
+            move_out_date=today - timedelta(days=3),
+        )
+        Payment.objects.create(
+            property=self.property,
+            resident=self.moved_out,
+            resident_name=self.moved_out.name,
+            amount=Decimal("300.00"),
+            payment_method="upi",
+        )
+        self.residents.append(self.moved_out)
+    
+    def test_batch_matches_per_resident_helpers(self):
+        """Every batch figure equals the individual helper result."""
+        today = timezone.now().date()
+        summaries = calculate_dues_for_residents(Resident.objects.all(), today)
+        
+        for resident in self.residents:
+            summary = summaries[resident.id]
+            self.assertEqual(summary['due'], calculate_due_amount(resident, today))
+            self.assertEqual(summary['is_overdue'], is_overdue(resident, today))
+            self.assertEqual(summary['overdue_amount'], get_overdue_amount(resident, today))
+            self.assertEqual(summary['days_overdue'], get_days_overdue(resident, today))
+            self.assertEqual(summary['next_billing_date'], next_billing_date(resident, today))
+            self.assertEqual(summary['payment_status'], get_payment_status(resident, today))
+    
+    def test_batch_uses_single_payment_query(self):
+        """Payment totals are fetched once regardless of how many residents are passed."""
+        residents = list(Resident.objects.all())
+        with self.assertNumQueries(1):
+            calculate_dues_for_residents(residents)
+    
+    def test_empty_batch(self):
+        """No residents means no queries and no summaries."""
+        with self.assertNumQueries(0):
+            self.assertEqual(calculate_dues_for_residents([]), {})
+
+
+
+class PaymentStatusAnnotationTestCase(TestCase):
+    """SQL payment status columns must match the Python helpers."""
+    
+    setUp = BatchDueCalculationTestCase.setUp
+    
+    def test_annotation_matches_helpers(self):
+        """due_amount / is_overdue / days_overdue / payment_status agree for every resident."""
+        today = timezone.now().date()
+        for as_of in [today, today - timedelta(days=5), today + timedelta(days=40)]:
+            summaries = calculate_dues_for_residents(Resident.objects.all(), as_of)
+            rows = annotate_payment_status(Resident.objects.all(), as_of).values_list(
+                'id', 'due_amount', 'is_overdue', 'days_overdue', 'payment_status')
+            for resident_id, due, overdue, days, payment_status in rows:
+                summary = summaries[resident_id]
+                self.assertEqual(
+                    (due.quantize(Decimal('0.01')), overdue, days, payment_status),
+                    (summary['due'].quantize(Decimal('0.01')), summary['is_overdue'],
+                     summary['days_overdue'], summary['payment_status']),
+                    (as_of, resident_id),
+                )
+    
+    def test_list_filters_and_orders_in_sql(self):
+        """The resident list filters by payment_status and orders by days_overdue."""
+        from rest_framework.test import APIClient
+        from properties.models import User
+        client = APIClient()
+        client.force_authenticate(user=User.objects.create(username="status", password_hash="x", role="admin"))
+        summaries = calculate_dues_for_residents(Resident.objects.filter(move_out_date__isnull=True))
+        expected = sorted(
+            (rid for rid, s in summaries.items() if s['payment_status'] in ('OVERDUE', 'SEVERELY_OVERDUE')),
+            key=lambda rid: -summaries[rid]['days_overdue'],
+        )
+        
+        response = client.get('/api/residents/', {
+            'payment_status': 'overdue,SEVERELY_OVERDUE', 'ordering': '-days_overdue', 'fields': 'id,days_overdue',
+        })
+        self.assertEqual(response.status_code, 200)
+        results = response.data['results'] if isinstance(response.data, dict) else response.data
+        self.assertEqual([r['id'] for r in results], expected)
+        self.assertEqual(client.get('/api/residents/', {'payment_status': 'LATE'}).status_code, 400)
+
+        by_due = client.get('/api/residents/', {'ordering': 'due_amount', 'fields': 'id'})
+        self.assertEqual(by_due.status_code, 200)
+        # Without a status filter or due ordering the list skips the ledger lookups
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(client.get('/api/residents/', {'fields': 'id'}).status_code, 200)
+        self.assertFalse(any('pg_resident_ledger' in query['sql'] for query in queries.captured_queries))
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,80 @@
+"""
+Test cases for the portfolio dues engine
+
+Run with: python manage.py test properties.test_portfolio_utils
+"""
+
+import random
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from properties.models import Property, Resident, Payment, User
+from properties.payment_utils import calculate_dues_for_residents, PAYMENT_STATUSES
+from properties.portfolio_utils import load_residents, compute_dues, portfolio_dues, format_paise, AGING_BUCKETS
+
+
+class PortfolioDuesTestCase(TestCase):
+    """Vectorized dues must equal the payment_utils snapshots, to the paisa."""
+
+    def setUp(self):
+        rng = random.Random(2026)
+        self.properties = [Property.objects.create(name=f"Portfolio {n}") for n in range(3)]
+        start = date(2024, 1, 1)
+        for n in range(60):
+            joining_date = start + timedelta(days=rng.randrange(900))
+            resident = Resident.objects.create(
+                property=rng.choice(self.properties),
+                first_name=f"P{n}", mobile=f"90000{n:05d}",
+                rent_type=rng.choice(['daily', 'weekly', 'bi-weekly', 'monthly', 'monthly']),
+                rent=Decimal(rng.randrange(100, 1500000)) / 100,
+                arrears=Decimal(rng.choice([0, 0, rng.randrange(-5000, 50000)])) / 100,
+                joining_date=joining_date,
+                move_out_date=joining_date + timedelta(days=rng.randrange(400)) if rng.random() < 0.2 else None,
+                is_active=rng.random() < 0.9,
+            )
+            for _ in range(rng.randrange(4)):
+                payment = Payment.objects.create(
+                    property=resident.property, resident=resident, resident_name=resident.first_name,
+                    amount=Decimal(rng.randrange(100, 2000000)) / 100, payment_method="cash",
+                )
+                paid_on = joining_date + timedelta(days=rng.randrange(500))
+                payment.payment_date = timezone.make_aware(datetime(paid_on.year, paid_on.month, paid_on.day, 9, 0))
+                payment.save()
+
+    def test_matches_payment_utils(self):
+        for as_of in [date(2024, 3, 15), date(2025, 2, 28), date(2026, 1, 1), date(2026, 10, 17)]:
+            loaded = load_residents(Resident.objects.all(), as_of)
+            dues = compute_dues(loaded, as_of)
+            snapshots = calculate_dues_for_residents(Resident.objects.all(), as_of)
+            for i, resident_id in enumerate(loaded['id']):
+                snapshot = snapshots[int(resident_id)]
+                self.assertEqual(
+                    (format_paise(dues['due'][i]), format_paise(dues['overdue_amount'][i]),
+                     int(dues['days_overdue'][i]), bool(dues['is_overdue'][i]), PAYMENT_STATUSES[dues['status'][i]]),
+                    (str(snapshot.due.quantize(Decimal('0.01'))), str(snapshot.overdue_amount.quantize(Decimal('0.01'))),
+                     snapshot.days_overdue, snapshot.is_overdue, snapshot.payment_status),
+                    (as_of, int(resident_id)),
+                )
+
+    def test_report_totals_and_endpoint(self):
+        as_of = date(2026, 10, 17)
+        report = portfolio_dues(as_of_date=as_of, limit=5)
+        active = Resident.objects.filter(is_active=True)
+        snapshots = calculate_dues_for_residents(active, as_of)
+        owing = sorted((s.due for s in snapshots.values() if s.due > 0), reverse=True)
+        self.assertEqual(report['totals']['residents'], active.count())
+        self.assertEqual(Decimal(report['totals']['due']), sum(d.quantize(Decimal('0.01')) for d in owing))
+        self.assertEqual(
+            sum(Decimal(report['totals']['aging'][bucket]) for bucket in AGING_BUCKETS),
+            Decimal(report['totals']['due']),
+        )
+        self.assertEqual([Decimal(r['due']) for r in report['residents']], [d.quantize(Decimal('0.01')) for d in owing[:5]])
+
+        client = APIClient()
+        client.force_authenticate(user=User.objects.create(username="portfolio", password_hash="x", role="admin"))
+        response = client.get('/api/portfolio/dues/', {'as_of': '2026-10-17', 'property': self.properties[0].id})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([p['id'] for p in response.data['properties']], [self.properties[0].id])
+        self.assertEqual(client.get('/api/portfolio/dues/', {'limit': 501}).status_code, 400)
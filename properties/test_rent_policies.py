@@ -0,0 +1,200 @@
+"""
+Test cases for the rent-type policies in payment_utils
+
+Checks the closed-form policies against the previous branch-per-rent-type
+implementation (kept below as the reference) on seeded random residents and
+dates spread over 20 years.
+
+Run with: python manage.py test properties.test_rent_policies
+"""
+
+import calendar
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+from django.test import SimpleTestCase
+from properties.models import Resident
+from properties.payment_utils import (
+    _count_monthly_cycles_started,
+    expected_rent_total,
+    calculate_due_amount,
+    is_overdue,
+    get_overdue_amount,
+    get_days_overdue,
+    next_billing_date,
+)
+
+
+RENT_TYPES = ['daily', 'weekly', 'bi-weekly', 'monthly', 'yearly']
+FIRST_DAY = date(2010, 1, 1)
+SPAN_DAYS = 20 * 365
+
+
+# ----------------------------------------------------------------------------
+# Reference implementation (payment_utils before the rent policies)
+# ----------------------------------------------------------------------------
+
+def _reference_add_months_keep_day(base_date, months):
+    month_index = (base_date.month - 1) + months
+    year = base_date.year + (month_index // 12)
+    month = (month_index % 12) + 1
+    day = min(base_date.day, calendar.monthrange(year, month)[1])
+    return date(year, month, day)
+
+
+def reference_cycles_started(joining_date, period_end):
+    if period_end < joining_date:
+        return 0
+    cycles = 1
+    cycle_start = joining_date
+    while True:
+        next_cycle_start = _reference_add_months_keep_day(cycle_start, 1)
+        if next_cycle_start <= period_end:
+            cycles += 1
+            cycle_start = next_cycle_start
+            continue
+        break
+    return cycles
+
+
+def reference_expected_rent(resident, as_of_date):
+    period_end = as_of_date
+    if resident.move_out_date and resident.move_out_date <= as_of_date:
+        period_end = resident.move_out_date
+    rent = Decimal(resident.rent or 0)
+    days = max((period_end - resident.joining_date).days + 1, 0)
+    if resident.rent_type == 'daily':
+        return rent * Decimal(days)
+    if resident.rent_type == 'weekly':
+        return rent / Decimal(7) * Decimal(days)
+    if resident.rent_type == 'bi-weekly':
+        return rent / Decimal(14) * Decimal(days)
+    if resident.rent_type == 'monthly':
+        jy, jm = resident.joining_date.year, resident.joining_date.month
+        ly = as_of_date.year if as_of_date.month > 1 else as_of_date.year - 1
+        lm = as_of_date.month - 1 if as_of_date.month > 1 else 12
+        if (jy > ly) or (jy == ly and jm > lm):
+            return Decimal(0)
+        return rent * Decimal((ly - jy) * 12 + (lm - jm) + 1)
+    return Decimal(0)
+
+
+def reference_is_overdue(resident, as_of_date, due_amount):
+    if due_amount <= 0 or not resident.joining_date:
+        return False
+    days = (as_of_date - resident.joining_date).days
+    if resident.rent_type == 'daily':
+        return days >= 3
+    if resident.rent_type == 'weekly':
+        return days >= 7
+    if resident.rent_type == 'monthly':
+        return resident.joining_date <= as_of_date.replace(day=1) - timedelta(days=1)
+    if resident.rent_type == 'bi-weekly':
+        return days >= 14
+    return False
+
+
+def reference_overdue_amount(resident, as_of_date, paid):
+    if not resident.joining_date or not resident.is_active:
+        return Decimal(0)
+    rent = Decimal(resident.rent or 0)
+    if resident.rent_type == 'daily':
+        days = (as_of_date - resident.joining_date).days + 1
+        if days <= 0:
+            return Decimal(0)
+        expected = rent * Decimal(days)
+    elif resident.rent_type in ('weekly', 'bi-weekly'):
+        length = 7 if resident.rent_type == 'weekly' else 14
+        days = (as_of_date - resident.joining_date).days
+        if days < length:
+            return Decimal(0)
+        expected = rent / Decimal(length) * Decimal(length) * Decimal(days // length)
+    elif resident.rent_type == 'monthly':
+        jy, jm = resident.joining_date.year, resident.joining_date.month
+        ly, lm = (as_of_date.year - 1, 12) if as_of_date.month == 1 else (as_of_date.year, as_of_date.month - 1)
+        if (jy > ly) or (jy == ly and jm > lm):
+            return Decimal(0)
+        expected = rent * Decimal((ly - jy) * 12 + (lm - jm) + 1)
+    else:
+        return Decimal(0)
+    return max(expected - paid, Decimal(0)) + Decimal(resident.arrears or 0)
+
+
+def reference_days_overdue(resident, as_of_date):
+    days = (as_of_date - resident.joining_date).days
+    if resident.rent_type == 'daily':
+        return max(0, days)
+    for rent_type, length in (('weekly', 7), ('monthly', 30), ('bi-weekly', 14)):
+        if resident.rent_type == rent_type:
+            return 0 if days < length else days - (length - 1)
+    return 0
+
+
+def reference_next_billing_date(resident, as_of_date):
+    if resident.rent_type == 'daily':
+        return as_of_date + timedelta(days=1)
+    if resident.rent_type == 'weekly':
+        return as_of_date + timedelta(days=7)
+    if resident.rent_type == 'bi-weekly':
+        return as_of_date + timedelta(days=14)
+    if resident.rent_type == 'monthly':
+        billingday = resident.preferred_billing_day or resident.joining_date.day
+        dim = calendar.monthrange(as_of_date.year, as_of_date.month)[1]
+        this_month_bill = as_of_date.replace(day=min(billingday, dim))
+        if this_month_bill >= as_of_date:
+            return this_month_bill
+        next_month = (as_of_date.replace(day=1) + timedelta(days=32)).replace(day=1)
+        dim_next = calendar.monthrange(next_month.year, next_month.month)[1]
+        return next_month.replace(day=min(billingday, dim_next))
+    return as_of_date
+
+
+class RentPolicyEquivalenceTestCase(SimpleTestCase):
+    """Policies give the same results as the reference on random inputs."""
+
+    def _random_resident(self, rng):
+        joining_date = FIRST_DAY + timedelta(days=rng.randrange(SPAN_DAYS))
+        move_out_date = None
+        if rng.random() < 0.3:
+            move_out_date = joining_date + timedelta(days=rng.randrange(-30, 800))
+        return Resident(
+            rent_type=rng.choice(RENT_TYPES),
+            rent=Decimal(rng.randrange(1, 5000000)) / 100,
+            arrears=Decimal(rng.randrange(-10000, 100000)) / 100,
+            joining_date=joining_date,
+            move_out_date=move_out_date,
+            preferred_billing_day=rng.choice([None, rng.randint(1, 31)]),
+            is_active=rng.random() < 0.9,
+        )
+
+    def test_matches_reference(self):
+        rng = random.Random(20261017)
+        for _ in range(3000):
+            resident = self._random_resident(rng)
+            as_of = resident.joining_date + timedelta(days=rng.randrange(-60, 3 * 365))
+            paid = Decimal(rng.randrange(0, 5000000)) / 100
+            case = (resident.rent_type, resident.rent, resident.joining_date, resident.move_out_date, as_of)
+
+            expected = reference_expected_rent(resident, as_of)
+            self.assertEqual(expected_rent_total(resident, as_of), expected, case)
+            due = calculate_due_amount(resident, as_of, paid_total=paid)
+            if resident.is_active:
+                self.assertEqual(due, max(expected + resident.arrears - paid, Decimal(0)), case)
+            self.assertEqual(is_overdue(resident, as_of, due_amount=due), reference_is_overdue(resident, as_of, due), case)
+            self.assertEqual(get_overdue_amount(resident, as_of, paid_total=paid), reference_overdue_amount(resident, as_of, paid), case)
+            self.assertEqual(get_days_overdue(resident, as_of), reference_days_overdue(resident, as_of), case)
+            self.assertEqual(next_billing_date(resident, as_of), reference_next_billing_date(resident, as_of), case)
+
+    def test_monthly_cycles_match_reference(self):
+        rng = random.Random(17)
+        # Month-end joining days exercise the clamping that carries over (31 Jan -> 28 Feb -> 28 Mar)
+        joining_dates = [date(2012, 1, 31), date(2015, 8, 30), date(2019, 12, 29), date(2011, 3, 1)]
+        joining_dates += [FIRST_DAY + timedelta(days=rng.randrange(SPAN_DAYS)) for _ in range(200)]
+        for joining_date in joining_dates:
+            for _ in range(25):
+                period_end = joining_date + timedelta(days=rng.randrange(-40, SPAN_DAYS))
+                self.assertEqual(
+                    _count_monthly_cycles_started(joining_date, period_end),
+                    reference_cycles_started(joining_date, period_end),
+                    (joining_date, period_end),
+                )
@@ -0,0 +1,134 @@
+"""
+Test cases for the monthly finance rollup
+
+Run with: python manage.py test properties.test_rollup_utils
+"""
+
+from datetime import date, datetime
+from decimal import Decimal
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from properties.models import Property, Resident, Expense, Payment, FinanceMonthlyRollup, User
+from properties.rollup_utils import rebuild_rollup
+
+
+def aware(year, month, day):
+    return timezone.make_aware(datetime(year, month, day, 9, 30))
+
+
+def rollup_snapshot():
+    return sorted(
+        FinanceMonthlyRollup.objects.filter(count__gt=0)
+        .values_list('property_id', 'year', 'month', 'source', 'category', 'total', 'count')
+    )
+
+
+class FinanceRollupTestCase(TestCase):
+    """Signal-maintained rollup always matches a full rebuild."""
+
+    def setUp(self):
+        self.property = Property.objects.create(name="Rollup Property")
+        self.other = Property.objects.create(name="Other Rollup Property")
+        self.resident = Resident.objects.create(
+            property=self.property, first_name="Gita", mobile="9000066666",
+            rent=Decimal("5000.00"), joining_date=date(2025, 1, 1),
+        )
+
+    def assertMatchesRebuild(self):
+        maintained = rollup_snapshot()
+        rebuild_rollup()
+        self.assertEqual(maintained, rollup_snapshot())
+
+    def test_payment_create_update_delete(self):
+        payment = Payment.objects.create(
+            property=self.property, resident=self.resident, resident_name="Gita",
+            amount=Decimal("5000.00"), payment_method="cash",
+        )
+        Payment.objects.create(
+            property=self.property, resident=self.resident, resident_name="Gita",
+            amount=Decimal("250.00"), payment_method="upi",
+        )
+        row = FinanceMonthlyRollup.objects.get(property=self.property, source='payment')
+        self.assertEqual((row.total, row.count), (Decimal("5250.00"), 2))
+
+        # Backdate and change the amount: contribution moves between months
+        payment.payment_date = aware(2025, 2, 10)
+        payment.amount = Decimal("4800.00")
+        payment.save()
+        self.assertMatchesRebuild()
+        feb = FinanceMonthlyRollup.objects.get(property=self.property, source='payment', year=2025, month=2)
+        self.assertEqual((feb.total, feb.count), (Decimal("4800.00"), 1))
+
+        payment.delete()
+        self.assertMatchesRebuild()
+        self.assertFalse(FinanceMonthlyRollup.objects.filter(year=2025, month=2, count__gt=0).exists())
+
+    def test_expense_category_and_property_change(self):
+        expense = Expense.objects.create(
+            property=self.property, category="power", description="Bill",
+            amount=Decimal("900.00"), expense_date=aware(2026, 5, 3),
+        )
+        Expense.objects.create(
+            property=self.property, category="power", description="Bill 2",
+            amount=Decimal("100.00"), expense_date=aware(2026, 5, 20),
+        )
+        expense.category = "water"
+        expense.save()
+        self.assertMatchesRebuild()
+
+        expense.property = self.other
+        expense.save()
+        self.assertMatchesRebuild()
+        self.assertEqual(
+            FinanceMonthlyRollup.objects.get(property=self.other, source='expense', category='water').total,
+            Decimal("900.00"),
+        )
+
+    def test_resident_delete_cascades_into_rollup(self):
+        Payment.objects.create(
+            property=self.property, resident=self.resident, resident_name="Gita",
+            amount=Decimal("5000.00"), payment_method="cash",
+        )
+        self.resident.delete()
+        self.assertEqual(rollup_snapshot(), [])
+
+
+class FinanceEndpointsTestCase(TestCase):
+    """Finance endpoints read totals from the rollup."""
+
+    def setUp(self):
+        self.property = Property.objects.create(name="Endpoint Property")
+        self.client = APIClient()
+        self.client.force_authenticate(user=User.objects.create(username="fin", password_hash="x", role="admin"))
+        now = timezone.now()
+        for category, amount, when in [
+            ("power", "80.00", now), ("power", "20.00", aware(2020, 1, 1)), ("food", "120.50", now),
+        ]:
+            Expense.objects.create(
+                property=self.property, category=category, description=category,
+                amount=Decimal(amount), expense_date=when,
+            )
+
+    def test_by_category_counts_rows(self):
+        response = self.client.get('/api/expenses/by_category/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(r['category'], r['total'], r['count']) for r in response.data],
+            [('food', Decimal('120.50'), 1), ('power', Decimal('100.00'), 2)],
+        )
+
+    def test_by_category_keeps_blank_category(self):
+        Expense.objects.create(
+            property=self.property, category='', description="misc",
+            amount=Decimal('5.00'), expense_date=timezone.now(),
+        )
+        response = self.client.get('/api/expenses/by_category/')
+        # As Expense.objects.values('category') reported it before the rollup
+        self.assertEqual(response.data[-1]['category'], '')
+
+    def test_summary_this_month(self):
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/expenses/summary/', {'property': self.property.id})
+        self.assertEqual(response.data['total_expenses'], Decimal('220.50'))
+        self.assertEqual(response.data['this_month_expenses'], Decimal('200.50'))
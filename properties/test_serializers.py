@@ -0,0 +1,135 @@
+"""
+Test cases for serializer query behaviour
+
+Run with: python manage.py test properties.test_serializers
+"""
+
+from datetime import date
+from decimal import Decimal
+from django.test import TestCase
+from rest_framework.test import APIRequestFactory
+from rest_framework.request import Request
+from properties.models import Property, Floor, Room, Bed, Resident, Occupancy, Payment
+from properties.serializers import ResidentSerializer, PaymentSerializer
+
+
+LOCATION_FIELDS = [
+    'current_floor', 'current_floor_number',
+    'current_room', 'current_room_number',
+    'current_bed', 'current_bed_number',
+]
+
+
+class SerializerTestBase(TestCase):
+    """Property with one floor, one room, two beds and one placed resident."""
+
+    def setUp(self):
+        self.property = Property.objects.create(name="Serializer Property")
+        self.floor = Floor.objects.create(property=self.property, floor_level=1, floor_name="Ground")
+        self.room = Room.objects.create(floor=self.floor, property=self.property, room_number="0101", total_beds=2)
+        self.beds = [
+            Bed.objects.create(room=self.room, floor=self.floor, property=self.property, bed_number=n, bed_name=n)
+            for n in ("A", "B")
+        ]
+        self.resident = Resident.objects.create(
+            property=self.property,
+            first_name="Ravi",
+            mobile="9000011111",
+            rent=Decimal("4000.00"),
+            joining_date=date(2025, 3, 1),
+        )
+        Occupancy.objects.create(
+            property=self.property, floor=self.floor, room=self.room, bed=self.beds[0],
+            resident=self.resident, is_occupied=True,
+        )
+        Occupancy.objects.create(
+            property=self.property, floor=self.floor, room=self.room, bed=self.beds[1],
+        )
+
+
+class ResidentLocationFieldsTestCase(SerializerTestBase):
+    """current_* fields read the active occupancy once."""
+
+    def test_prefetched_location_costs_no_queries(self):
+        resident = ResidentSerializer.setup_eager_loading(Resident.objects.filter(id=self.resident.id)).get()
+        serializer = ResidentSerializer(resident)
+        with self.assertNumQueries(0):
+            values = {name: serializer.fields[name].to_representation(resident) for name in LOCATION_FIELDS}
+        self.assertEqual(values['current_floor'], self.floor.id)
+        self.assertEqual(values['current_room_number'], "0101")
+        self.assertEqual(values['current_bed_number'], "A")
+
+    def test_unprefetched_location_queries_once(self):
+        resident = Resident.objects.get(id=self.resident.id)
+        serializer = ResidentSerializer(resident)
+        with self.assertNumQueries(1):
+            values = [serializer.fields[name].to_representation(resident) for name in LOCATION_FIELDS]
+        self.assertEqual(values[-1], "A")
+
+
+class ResidentDueFieldsTestCase(SerializerTestBase):
+    """Due fields of a single resident share one financial snapshot."""
+
+    def test_due_fields_query_ledger_once(self):
+        from properties.payment_utils import calculate_due_amount, get_payment_status
+        Payment.objects.create(
+            property=self.property, resident=self.resident, resident_name=self.resident.name,
+            amount=Decimal("1500.00"), payment_method="cash",
+        )
+        resident = Resident.objects.get(id=self.resident.id)
+        serializer = ResidentSerializer(resident)
+        with self.assertNumQueries(1):
+            values = {name: serializer.fields[name].to_representation(resident) for name in ResidentSerializer.due_fields}
+        self.assertEqual(values['due'], str(calculate_due_amount(resident).quantize(Decimal('0.01'))))
+        self.assertEqual(values['payment_status'], get_payment_status(resident))
+
+
+class PaymentResidentDetailTestCase(SerializerTestBase):
+    """Payments nest a compact resident unless resident_full is requested."""
+
+    def setUp(self):
+        super().setUp()
+        for amount in ("1000.00", "2000.00"):
+            Payment.objects.create(
+                property=self.property, resident=self.resident, resident_name=self.resident.name,
+                amount=Decimal(amount), payment_method="cash",
+            )
+
+    def _serialize(self, query=''):
+        context = {'request': Request(APIRequestFactory().get(f'/api/payments/{query}'))}
+        fields = PaymentSerializer(context=context).fields
+        payments = PaymentSerializer.setup_eager_loading(Payment.objects.all(), fields)
+        return PaymentSerializer(payments, many=True, context=context).data
+
+    def test_compact_resident_detail(self):
+        with self.assertNumQueries(2):
+            data = self._serialize()
+        self.assertEqual(
+            dict(data[0]['resident_detail']),
+            {
+                'id': self.resident.id,
+                'name': 'Ravi',
+                'mobile': '9000011111',
+                'current_room_number': '0101',
+                'current_bed': self.beds[0].id,
+                'current_bed_number': 'A',
+            },
+        )
+
+    def test_fields_parameter_limits_output_and_queries(self):
+        with self.assertNumQueries(1):
+            data = self._serialize('?fields=id,amount')
+        self.assertEqual(set(data[0]), {'id', 'amount'})
+
+    def test_omit_parameter(self):
+        data = self._serialize('?omit=resident_detail,notes')
+        self.assertNotIn('resident_detail', data[0])
+        self.assertNotIn('notes', data[0])
+        self.assertIn('amount', data[0])
+
+    def test_expand_resident_full(self):
+        data = self._serialize('?expand=resident_full')
+        detail = data[0]['resident_detail']
+        self.assertEqual(detail['current_bed_number'], 'A')
+        self.assertIn('due', detail)
+        self.assertEqual(len(detail['payments']), 2)
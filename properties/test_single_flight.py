@@ -0,0 +1,110 @@
+"""
+Test cases for single-flight request coalescing
+
+Run with: python manage.py test properties.test_single_flight
+"""
+
+import threading
+import time
+from django.core.cache import cache
+from django.db import connection, connections
+from django.test import TestCase, override_settings
+from properties import single_flight as sf
+from properties.single_flight import single_flight, flight_key
+
+
+@override_settings(SINGLE_FLIGHT_ACROSS_WORKERS=False)
+class InProcessSingleFlightTestCase(TestCase):
+    """Concurrent callers in one process share the leader's result."""
+
+    def _run_concurrently(self, compute, callers=5):
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(single_flight('k', compute)))
+            for _ in range(callers)
+        ]
+        for thread in threads:
+            thread.start()
+        return threads, results
+
+    def test_followers_share_result(self):
+        calls = []
+        release = threading.Event()
+
+        def compute():
+            calls.append(1)
+            release.wait(5)
+            return {'value': 42}
+
+        threads, results = self._run_concurrently(compute)
+        # Let every follower queue up behind the leader
+        time.sleep(0.2)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{'value': 42}] * 5)
+        self.assertIs(results[0], results[1])
+        self.assertEqual(sf._calls, {})
+
+    def test_leader_failure_lets_followers_compute(self):
+        release = threading.Event()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            if len(calls) == 1:
+                release.wait(5)
+                raise RuntimeError('boom')
+            return 'ok'
+
+        threads, results = self._run_concurrently(compute, callers=3)
+        time.sleep(0.2)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(results, ['ok', 'ok'])
+
+    def test_flight_key(self):
+        self.assertEqual(flight_key('financial_summary', 7, 5), 'financial_summary:7:5')
+
+
+@override_settings(SINGLE_FLIGHT_ACROSS_WORKERS=True, SINGLE_FLIGHT_WAIT_TIMEOUT=5)
+class AcrossWorkersSingleFlightTestCase(TestCase):
+    """Workers coordinate through an advisory lock and the shared cache."""
+
+    def setUp(self):
+        cache.clear()
+
+    def _advisory_locks(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT count(*) FROM pg_locks WHERE locktype = 'advisory' AND pid = pg_backend_pid()")
+            return cursor.fetchone()[0]
+
+    def test_computes_publishes_and_unlocks(self):
+        self.assertEqual(single_flight('report:1', lambda: [1, 2]), [1, 2])
+        self.assertEqual(self._advisory_locks(), 0)
+        found, value = sf._shared_result('report:1', arrived=0)
+        self.assertEqual((found, value), (True, [1, 2]))
+
+    def test_waiter_uses_result_of_lock_holder(self):
+        key = 'report:2'
+        other_worker = connections.create_connection('default')
+        try:
+            with other_worker.cursor() as cursor:
+                cursor.execute('SELECT pg_advisory_lock(%s)', [sf._lock_id(key)])
+
+            def publish():
+                time.sleep(0.2)
+                cache.set(sf._result_key(key), {'finished_at': time.time(), 'value': 'shared'})
+
+            threading.Thread(target=publish).start()
+            self.assertEqual(single_flight(key, lambda: self.fail('should not compute')), 'shared')
+        finally:
+            other_worker.close()
+
+    def test_older_published_result_is_ignored(self):
+        key = 'report:3'
+        cache.set(sf._result_key(key), {'finished_at': time.time() - 60, 'value': 'old'})
+        self.assertEqual(single_flight(key, lambda: 'new'), 'new')
@@ -0,0 +1,181 @@
+"""
+Test cases for bulk property structure setup
+
+Run with: python manage.py test properties.test_structure_utils
+"""
+
+from datetime import date
+from decimal import Decimal
+from django.test import TestCase
+from rest_framework.test import APIClient
+from properties.models import Property, Floor, Room, Bed, Resident, Occupancy, OccupancyHistory, User
+from properties.serializers import RoomSerializer
+from properties.structure_utils import (
+    plan_structure, create_structure, reconfigure_structure, apply_room_capacity
+)
+
+
+class PlanStructureTestCase(TestCase):
+    """Layout resolution from counts and naming maps."""
+
+    def test_default_numbering(self):
+        layout = plan_structure(floors_count=2, rooms_per_floor=2, beds_per_room=3, floor_names=['Ground'])
+        self.assertEqual([f['name'] for f in layout], ['Ground', 'Floor 2'])
+        self.assertEqual([r['room_number'] for r in layout[1]['rooms']], ['0201', '0202'])
+        self.assertEqual(layout[0]['rooms'][0]['beds'], ['A', 'B', 'C'])
+
+    def test_explicit_maps_override_counts(self):
+        layout = plan_structure(
+            room_numbers_map={'1': ['G1', 'G2']},
+            bed_numbers_map={'1': {'G2': ['X']}},
+            beds_per_room=2,
+        )
+        self.assertEqual(len(layout), 1)
+        self.assertEqual(layout[0]['rooms'][0]['beds'], ['A', 'B'])
+        self.assertEqual(layout[0]['rooms'][1]['beds'], ['X'])
+
+    def test_missing_counts_raise(self):
+        with self.assertRaises(ValueError):
+            plan_structure()
+        with self.assertRaises(ValueError):
+            plan_structure(floors_count=1, rooms_per_floor=1)
+
+
+class CreateStructureTestCase(TestCase):
+    """Bulk creation writes every level with a fixed number of statements."""
+
+    def setUp(self):
+        self.property = Property.objects.create(name="Bulk Property")
+
+    def test_creates_full_structure(self):
+        layout = plan_structure(floors_count=3, rooms_per_floor=4, beds_per_room=2)
+        with self.assertNumQueries(4):
+            counts = create_structure(self.property, layout)
+        self.assertEqual(counts, {'floors': 3, 'rooms': 12, 'beds': 24})
+
+        self.assertEqual(Floor.objects.filter(property=self.property).count(), 3)
+        room = Room.objects.get(property=self.property, room_number='0302')
+        self.assertEqual(room.floor.floor_level, 3)
+        self.assertEqual(room.total_beds, 2)
+        self.assertEqual(
+            list(Bed.objects.filter(room=room).order_by('bed_number').values_list('bed_number', 'floor_id')),
+            [('A', room.floor_id), ('B', room.floor_id)],
+        )
+        occupancies = Occupancy.objects.filter(property=self.property)
+        self.assertEqual(occupancies.count(), 24)
+        self.assertFalse(occupancies.filter(is_occupied=True).exists())
+
+
+class ReconfigureStructureTestCase(TestCase):
+    """Reconfigure applies only the differences and keeps unchanged beds."""
+
+    def setUp(self):
+        self.property = Property.objects.create(name="Diff Property")
+        create_structure(self.property, plan_structure(floors_count=2, rooms_per_floor=2, beds_per_room=2))
+        self.resident = Resident.objects.create(
+            property=self.property, first_name="Meena", mobile="9000022222",
+            rent=Decimal("3000.00"), joining_date=date(2025, 1, 1),
+        )
+        self.occupied_bed = Bed.objects.get(room__room_number='0101', bed_number='A')
+        Occupancy.objects.filter(bed=self.occupied_bed).update(resident=self.resident, is_occupied=True)
+        OccupancyHistory.objects.create(
+            property=self.property, floor=self.occupied_bed.floor, room=self.occupied_bed.room,
+            bed=self.occupied_bed, resident=self.resident, action='occupied',
+        )
+
+    def test_unchanged_layout_is_a_no_op(self):
+        bed_ids = set(Bed.objects.values_list('id', flat=True))
+        counts = reconfigure_structure(
+            self.property, plan_structure(floors_count=2, rooms_per_floor=2, beds_per_room=2), rename_floors=False,
+        )
+        self.assertEqual(set(counts.values()), {0})
+        self.assertEqual(set(Bed.objects.values_list('id', flat=True)), bed_ids)
+
+    def test_applies_inserts_updates_and_deletes(self):
+        layout = plan_structure(
+            floors_count=3, beds_per_room=2,
+            floor_names=['Ground', 'First', 'Second'],
+            room_numbers_map={'1': ['0101', '0102'], '2': ['0201'], '3': ['0301']},
+            bed_numbers_map={'1': {'0101': ['A', 'B', 'C'], '0102': ['A']}},
+        )
+        counts = reconfigure_structure(self.property, layout)
+        self.assertEqual(counts, {
+            'floors': 1, 'rooms': 1, 'beds': 3,
+            'updated_floors': 2, 'updated_rooms': 2,
+            'deleted_floors': 0, 'deleted_rooms': 1, 'deleted_beds': 3,
+        })
+        self.assertEqual(Occupancy.objects.filter(property=self.property).count(), 8)
+        self.assertEqual(Room.objects.get(room_number='0101').total_beds, 3)
+        self.assertEqual(Floor.objects.get(property=self.property, floor_level=1).floor_name, 'Ground')
+        self.assertFalse(Room.objects.filter(room_number='0202').exists())
+        # The occupied bed and its history are untouched
+        occupancy = Occupancy.objects.get(bed=self.occupied_bed)
+        self.assertEqual(occupancy.resident, self.resident)
+        self.assertEqual(OccupancyHistory.objects.filter(bed=self.occupied_bed).count(), 1)
+
+    def test_refuses_to_remove_occupied_beds(self):
+        layout = plan_structure(floors_count=1, rooms_per_floor=1, beds_per_room=1,
+                                bed_numbers_map={'1': {'0101': ['B']}})
+        with self.assertRaisesMessage(ValueError, '0101-A'):
+            reconfigure_structure(self.property, layout)
+        self.assertEqual(Bed.objects.filter(property=self.property).count(), 8)
+
+
+class RoomCapacityTestCase(TestCase):
+    """Capacity changes add/remove beds in bulk, for one room or many."""
+
+    def setUp(self):
+        self.property = Property.objects.create(name="Capacity Property")
+        create_structure(self.property, plan_structure(floors_count=1, rooms_per_floor=3, beds_per_room=2))
+        self.floor = Floor.objects.get(property=self.property)
+        self.rooms = list(Room.objects.filter(property=self.property).order_by('room_number'))
+        self.resident = Resident.objects.create(
+            property=self.property, first_name="Anil", mobile="9000044444",
+            rent=Decimal("3500.00"), joining_date=date(2025, 1, 1),
+        )
+        Occupancy.objects.filter(bed__room=self.rooms[0], bed__bed_number='B').update(
+            resident=self.resident, is_occupied=True,
+        )
+        self.user = User.objects.create(username="capacity", password_hash="x", role="admin")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def _bed_numbers(self, room):
+        return list(Bed.objects.filter(room=room).order_by('bed_number').values_list('bed_number', flat=True))
+
+    def test_serializer_update_grows_and_shrinks(self):
+        room = self.rooms[1]
+        serializer = RoomSerializer(room, data={'total_beds': 4}, partial=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        self.assertEqual(self._bed_numbers(room), ['A', 'B', 'C', 'D'])
+        self.assertEqual(Occupancy.objects.filter(room=room, is_occupied=False).count(), 4)
+
+        serializer = RoomSerializer(room, data={'total_beds': 1}, partial=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        self.assertEqual(self._bed_numbers(room), ['A'])
+
+    def test_shrink_keeps_occupied_beds(self):
+        counts = apply_room_capacity([(self.rooms[0], 2, 1)])
+        self.assertEqual(counts, {'created_beds': 0, 'deleted_beds': 1})
+        self.assertEqual(self._bed_numbers(self.rooms[0]), ['B'])
+
+    def test_bulk_capacity_for_floor(self):
+        with self.assertNumQueries(9):
+            response = self.client.post(
+                '/api/rooms/bulk-capacity/', {'floor': self.floor.id, 'total_beds': 3}, format='json',
+            )
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.data['created_beds'], 3)
+        self.assertEqual([r['total_beds'] for r in response.data['rooms']], [3, 3, 3])
+        for room in self.rooms:
+            self.assertEqual(self._bed_numbers(room), ['A', 'B', 'C'])
+
+    def test_bulk_capacity_rejects_below_occupancy(self):
+        response = self.client.post('/api/rooms/bulk-capacity/', {
+            'rooms': [{'id': self.rooms[0].id, 'total_beds': 0}, {'id': self.rooms[1].id, 'total_beds': 1}],
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(str(self.rooms[0].id), response.data['rooms'])
+        self.assertEqual(Bed.objects.filter(property=self.property).count(), 6)
@@ -0,0 +1,234 @@
+"""
+Background Media Upload Utilities
+
+Resident create no longer uploads photo/aadhar inside the request. Each file is
+spooled to local disk (MEDIA_SPOOL_DIR/<resident_id>/<kind>/<filename>), the
+resident's <kind>_status is set to 'pending' and the response is returned
+right away. Once the create transaction commits, the upload is handed to a
+per-process pool of MEDIA_UPLOAD_THREADS threads (0 uploads inline, e.g. in
+tests), which stores the file through properties.storage and then sets
+<kind>_url and <kind>_status = 'uploaded'.
+
+Failed uploads are retried MEDIA_UPLOAD_RETRIES times with exponential backoff
+from MEDIA_UPLOAD_RETRY_DELAY seconds; after that the status becomes 'failed'
+and the spooled file is kept. `manage.py resume_media_uploads` (run at startup
+by scripts/start.sh) requeues every spooled file whose upload is pending or
+failed, and marks uploads 'failed' that have been pending for more than
+MEDIA_UPLOAD_TIMEOUT seconds without a spooled file on this instance (the
+instance or its ephemeral disk went away mid-upload).
+
+The background pool only works where the process keeps its CPU after the
+response is sent. On Cloud Run that needs --no-cpu-throttling; without it
+MEDIA_UPLOAD_THREADS defaults to 0 there and uploads run inside the request.
+"""
+
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from .models import Resident
+from .storage import get_media_storage, media_object_name
+
+
+logger = logging.getLogger(__name__)
+
+MEDIA_KINDS = ('photo', 'aadhar')
+
+
+def _spool_path(resident_id, kind: str, filename: str) -> str:
+    filename = os.path.basename(filename or '') or f'{kind}.bin'
+    return os.path.join(str(settings.MEDIA_SPOOL_DIR), str(resident_id), kind, filename)
+
+
+def spool_upload(resident: Resident, kind: str, file_obj) -> str:
+    """
+    Copy an uploaded file to the spool directory.
+
+    Any previously spooled file of the same kind is replaced.
+
+    Returns:
+        str: Path of the spooled file
+    """
+    path = _spool_path(resident.id, kind, getattr(file_obj, 'name', None))
+    directory = os.path.dirname(path)
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            for chunk in file_obj.chunks():
+                f.write(chunk)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return path
+
+
+def _discard_spool(path: str):
+    """Remove a spooled file's directory, and the resident's once it is empty."""
+    directory = os.path.dirname(path)
+    shutil.rmtree(directory, ignore_errors=True)
+    try:
+        os.rmdir(os.path.dirname(directory))
+    except OSError:
+        pass
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _upload_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=settings.MEDIA_UPLOAD_THREADS, thread_name_prefix='media-upload')
+    return _executor
+
+
+def _set_media(resident_id, kind: str, **fields):
+    # Plain UPDATE: the worker must not overwrite fields edited since the create.
+    # updated_at marks when the status changed (see MEDIA_UPLOAD_TIMEOUT).
+    changes = {f'{kind}_{name}': value for name, value in fields.items()}
+    return Resident.objects.filter(pk=resident_id).update(updated_at=timezone.now(), **changes)
+
+
+def process_upload(resident_id, property_id, kind: str, path: str) -> bool:
+    """
+    Upload a spooled file with retries and record the outcome on the resident.
+
+    Returns:
+        bool: True once uploaded
+    """
+    storage = get_media_storage()
+    object_name = media_object_name(property_id, 'residents', resident_id, kind, os.path.basename(path))
+    attempts = settings.MEDIA_UPLOAD_RETRIES + 1
+    for attempt in range(1, attempts + 1):
+        try:
+            if storage is None:
+                raise RuntimeError('Media storage not configured')
+            with open(path, 'rb') as f:
+                url = storage.upload(object_name, f)
+        except Exception as e:
+            logger.warning("Media upload attempt %s/%s failed resident_id=%s kind=%s: %s",
+                           attempt, attempts, resident_id, kind, e)
+            if storage is None or attempt == attempts:
+                break
+            time.sleep(settings.MEDIA_UPLOAD_RETRY_DELAY * 2 ** (attempt - 1))
+            continue
+        _set_media(resident_id, kind, url=url, status='uploaded')
+        _discard_spool(path)
+        logger.info("Media upload success: resident_id=%s kind=%s url=%s", resident_id, kind, url)
+        return True
+    _set_media(resident_id, kind, status='failed')
+    logger.error("Media upload failed: resident_id=%s kind=%s spooled at %s", resident_id, kind, path)
+    return False
+
+
+def _run_pooled(*args):
+    try:
+        process_upload(*args)
+    except Exception:
+        logger.exception("Media upload worker error args=%s", args)
+    finally:
+        # Pool threads keep their own connection; don't leave it open between jobs
+        connection.close()
+
+
+def submit_upload(resident_id, property_id, kind: str, path: str):
+    """Run the upload in the pool (or inline when MEDIA_UPLOAD_THREADS is 0)."""
+    if settings.MEDIA_UPLOAD_THREADS <= 0:
+        process_upload(resident_id, property_id, kind, path)
+    else:
+        _upload_executor().submit(_run_pooled, resident_id, property_id, kind, path)
+
+
+def queue_upload(resident: Resident, kind: str, file_obj):
+    """
+    Spool a resident's photo/aadhar and upload it in the background.
+
+    Sets <kind>_status to 'pending' on the instance and in the database; the
+    upload starts when the current transaction commits.
+    """
+    path = spool_upload(resident, kind, file_obj)
+    setattr(resident, f'{kind}_status', 'pending')
+    _set_media(resident.id, kind, status='pending')
+    resident_id, property_id = resident.id, resident.property_id
+    transaction.on_commit(lambda: submit_upload(resident_id, property_id, kind, path))
+
+
+def expire_uploads() -> int:
+    """
+    Mark uploads 'failed' that have been pending for more than MEDIA_UPLOAD_TIMEOUT
+    seconds and have no spooled file here, so they can never complete.
+
+    Returns:
+        int: Number of uploads marked failed
+    """
+    spool_dir = str(settings.MEDIA_SPOOL_DIR)
+    cutoff = timezone.now() - timedelta(seconds=settings.MEDIA_UPLOAD_TIMEOUT)
+    expired = 0
+    for kind in MEDIA_KINDS:
+        stale = Resident.objects.filter(**{f'{kind}_status': 'pending'}, updated_at__lt=cutoff)
+        for resident_id in stale.values_list('id', flat=True):
+            directory = os.path.join(spool_dir, str(resident_id), kind)
+            if os.path.isdir(directory) and any(not name.endswith('.tmp') for name in os.listdir(directory)):
+                continue
+            expired += Resident.objects.filter(pk=resident_id, **{f'{kind}_status': 'pending'}).update(
+                **{f'{kind}_status': 'failed'},
+            )
+            logger.warning("Media upload expired: resident_id=%s kind=%s (no spooled file)", resident_id, kind)
+    return expired
+
+
+def resume_uploads(inline: bool = False) -> int:
+    """
+    Requeue spooled files whose upload is still pending or failed, and drop the
+    spool of residents that no longer exist.
+
+    Args:
+        inline: Upload in the calling thread instead of the pool
+
+    Returns:
+        int: Number of uploads queued
+    """
+    spool_dir = str(settings.MEDIA_SPOOL_DIR)
+    if not os.path.isdir(spool_dir):
+        return 0
+    queued = 0
+    spooled = [name for name in os.listdir(spool_dir) if name.isdigit()]
+    residents = {
+        str(resident['id']): resident
+        for resident in Resident.objects.filter(
+            id__in=spooled,
+        ).values('id', 'property_id', 'photo_status', 'aadhar_status')
+    }
+    for resident_id in spooled:
+        if resident_id not in residents:
+            # Resident deleted before its upload finished
+            shutil.rmtree(os.path.join(spool_dir, resident_id), ignore_errors=True)
+    for resident_id, resident in residents.items():
+        for kind in MEDIA_KINDS:
+            if resident[f'{kind}_status'] not in ('pending', 'failed'):
+                continue
+            directory = os.path.join(spool_dir, resident_id, kind)
+            files = [name for name in os.listdir(directory) if not name.endswith('.tmp')] if os.path.isdir(directory) else []
+            if not files:
+                continue
+            _set_media(resident['id'], kind, status='pending')
+            args = (resident['id'], resident['property_id'], kind, os.path.join(directory, files[0]))
+            if inline:
+                process_upload(*args)
+            else:
+                submit_upload(*args)
+            queued += 1
+    return queued
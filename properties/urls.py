@@ -4,7 +4,7 @@ from .views import (
     PropertyViewSet, FloorViewSet, RoomViewSet, BedViewSet,
     ResidentViewSet, OccupancyViewSet, OccupancyHistoryViewSet,
     ExpenseViewSet, PaymentViewSet, MaintenanceRequestViewSet,
-    UserViewSet, AuthViewSet
+    UserViewSet, AuthViewSet, BillingChargeViewSet, PortfolioViewSet
 )
 
 router = DefaultRouter()
@@ -19,6 +19,8 @@ router.register(r'occupancy', OccupancyViewSet, basename='occupancy')
 router.register(r'occupancy-history', OccupancyHistoryViewSet, basename='occupancy-history')
 router.register(r'expenses', ExpenseViewSet, basename='expense')
 router.register(r'payments', PaymentViewSet, basename='payment')
+router.register(r'billing-charges', BillingChargeViewSet, basename='billing-charge')
+router.register(r'portfolio', PortfolioViewSet, basename='portfolio')
 router.register(r'maintenance-requests', MaintenanceRequestViewSet, basename='maintenance-request')
 router.register(r'users', UserViewSet, basename='user')
 router.register(r'auth', AuthViewSet, basename='auth')
@@ -6,21 +6,18 @@ from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from django.db import transaction
 from django.db import IntegrityError
-from drf_spectacular.utils import extend_schema, OpenApiParameter
+from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiParameter
 from drf_spectacular.types import OpenApiTypes
 from rest_framework.permissions import AllowAny
-from django.contrib.auth.hashers import make_password, check_password
 from core.auth import generate_jwt
-from django.conf import settings
+from core.hashers import check_user_password, hash_password
 import logging
-import mimetypes
-from urllib.parse import urlparse
 from .serializers import (
     AuthRegisterSerializer, AuthLoginSerializer, AuthTokenResponseSerializer, AuthUserMiniSerializer
 )
 from .models import (
     Property, Floor, Room, Bed, Resident, Occupancy, OccupancyHistory,
-    Expense, Payment, MaintenanceRequest, User
+    Expense, Payment, MaintenanceRequest, User, BillingCharge
 )
 from .serializers import (
     PropertySerializer, FloorSerializer, RoomSerializer, BedSerializer,
@@ -28,12 +25,99 @@ from .serializers import (
     ExpenseSerializer, PaymentSerializer, MaintenanceRequestSerializer,
     UserSerializer, PropertyOccupancyDetailSerializer,
     PropertySetupRequestSerializer, PropertySetupResponseSerializer,
-    ResidentMoveSerializer
+    ResidentMoveSerializer, RoomBulkCapacityRequestSerializer, RoomBulkCapacityResponseSerializer,
+    BillingChargeSerializer
 )
 
 
+class SparseFieldsetMixin:
+    """
+    Query-parameter driven field selection for ModelViewSets.
+
+    Works together with serializers.DynamicFieldsMixin:
+    - ?fields=a,b / ?omit=a,b pick which fields are serialized
+    - ?expand=x swaps in heavier nested representations
+    The queryset only eager-loads what the selected fields need
+    (see the serializer's setup_eager_loading).
+    """
+
+    def get_requested_fields(self):
+        """Bound fields of the serializer for this request (after fields/omit/expand)."""
+        if not hasattr(self, '_requested_fields'):
+            self._requested_fields = self.get_serializer().fields
+        return self._requested_fields
+
+    # Actions that load objects without serializing them
+    skip_eager_load_actions = ()
+
+    def eager_load(self, queryset):
+        setup = getattr(self.get_serializer_class(), 'setup_eager_loading', None)
+        if setup is None or self.action in self.skip_eager_load_actions:
+            return queryset
+        return setup(queryset, self.get_requested_fields())
+
+    def get_queryset(self):
+        return self.eager_load(super().get_queryset())
+
+    def get_list_serializer_context(self, objs):
+        """Hook for views that pre-compute per-page data (e.g. batch dues)."""
+        return self.get_serializer_context()
+
+    def get_list_serializer(self, objs):
+        objs = list(objs)
+        return self.get_serializer(objs, many=True, context=self.get_list_serializer_context(objs))
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_list_serializer(page)
+            return self.get_paginated_response(serializer.data)
+        serializer = self.get_list_serializer(queryset)
+        return Response(serializer.data)
+
+
+PROPERTY_ROLLUP_PARAMETER = OpenApiParameter(
+    name='property', type=OpenApiTypes.INT, location=OpenApiParameter.QUERY, required=False,
+    description='Limit totals to one property (default: all properties)',
+)
+
+
+def _rollup_property_param(request):
+    try:
+        return int(request.query_params['property'])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+class AtomicWriteMixin:
+    """Run create/update/destroy in one transaction with their signal handlers (e.g. finance rollup)."""
+
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            super().perform_create(serializer)
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            super().perform_update(serializer)
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            super().perform_destroy(instance)
+
+
+def add_payment_due_summaries(context, payments, fields):
+    """Batch-compute dues when payments nest the full ResidentSerializer."""
+    from .payment_utils import calculate_dues_for_residents
+    detail = fields.get('resident_detail')
+    if isinstance(detail, ResidentSerializer) and any(f in detail.fields for f in ResidentSerializer.due_fields):
+        residents = {p.resident_id: p.resident for p in payments}
+        context['due_summaries'] = calculate_dues_for_residents(residents.values())
+    return context
+
+
 @extend_schema(tags=['Properties'])
-class PropertyViewSet(viewsets.ModelViewSet):
+class PropertyViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     """
     API endpoints for managing properties.
     
@@ -53,6 +137,11 @@ class PropertyViewSet(viewsets.ModelViewSet):
     ordering_fields = ['name', 'created_at', 'updated_at']
     ordering = ['-created_at']
 
+    def perform_destroy(self, instance):
+        # Set-based cascade; years of payments/history are never loaded into memory
+        from .deletion_utils import fast_delete
+        fast_delete(Property.objects.filter(pk=instance.pk))
+
     @action(detail=True, methods=['get'])
     def summary(self, request, pk=None):
         """Get property summary with occupancy and payment stats"""
@@ -68,6 +157,7 @@ class PropertyViewSet(viewsets.ModelViewSet):
         }
         return Response(data)
 
+    @extend_schema(responses=PropertyOccupancyDetailSerializer)
     @action(detail=True, methods=['get'])
     def occupancy_detail(self, request, pk=None):
         """
@@ -82,14 +172,20 @@ class PropertyViewSet(viewsets.ModelViewSet):
         - Occupancy statistics at property, floor, and room levels
         
         Perfect for mobile app occupancy tab display.
+        The tree is built with a fixed number of queries regardless of property size.
         """
+        from .occupancy_utils import build_occupancy_tree
+        from .single_flight import single_flight, flight_key
+
         property_obj = self.get_object()
-        serializer = PropertyOccupancyDetailSerializer(property_obj)
-        return Response(serializer.data)
+        return Response(single_flight(
+            flight_key('occupancy_detail', property_obj.id),
+            lambda: build_occupancy_tree(property_obj),
+        ))
 
     @extend_schema(
         tags=['Properties'],
-        description='Configure property structure in one call: create floors, rooms per floor, and beds per room. Optionally provide names.',
+        description='Configure property structure in one call: create floors, rooms per floor, and beds per room. Optionally provide names. Pass reconfigure=true to apply only the differences to an existing structure.',
         request=PropertySetupRequestSerializer,
         responses=PropertySetupResponseSerializer,
     )
@@ -105,6 +201,8 @@ class PropertyViewSet(viewsets.ModelViewSet):
         - room_numbers: { '<floor_level>': [str, ...] } (optional)
         - bed_numbers: { '<floor_level>': { '<room_number>': [str, ...] } } (optional)
         - reset: bool (optional) — if true, clears existing floors/rooms/beds first
+        - reconfigure: bool (optional) — if true, diffs the layout against the existing
+          structure and only inserts/updates/deletes what changed; occupied beds are never removed
         """
         property_obj = self.get_object()
         input_ser = PropertySetupRequestSerializer(data=request.data)
@@ -123,100 +221,49 @@ class PropertyViewSet(viewsets.ModelViewSet):
             except IntegrityError:
                 return Response({'detail': 'Property name must be unique.'}, status=status.HTTP_400_BAD_REQUEST)
 
+        from .structure_utils import plan_structure, create_structure, reconfigure_structure
+        from .deletion_utils import fast_delete
+
         floors_count = data.get('floors_count')
         rooms_per_floor = data.get('rooms_per_floor')  # default when room_numbers absent
         beds_per_room = data.get('beds_per_room')      # default when bed_numbers absent
-        floor_names = data.get('floor_names') or []
-        room_numbers_map = data.get('room_numbers') or {}
-        bed_numbers_map = data.get('bed_numbers') or {}
         reset = data.get('reset', False)
+        reconfigure = data.get('reconfigure', False)
 
-        created_floors = 0
-        created_rooms = 0
-        created_beds = 0
+        # Resolve and validate the whole layout before touching the database
+        try:
+            layout = plan_structure(
+                floors_count=floors_count,
+                rooms_per_floor=rooms_per_floor,
+                beds_per_room=beds_per_room,
+                floor_names=data.get('floor_names'),
+                room_numbers_map=data.get('room_numbers'),
+                bed_numbers_map=data.get('bed_numbers'),
+            )
+        except ValueError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
         with transaction.atomic():
-            if reset:
-                # Cascade deletes rooms/beds/occupancies via FK
-                property_obj.floors.all().delete()
+            if reconfigure:
+                # Serialize concurrent reconfigurations of the same property
+                Property.objects.select_for_update().filter(pk=property_obj.pk).first()
+                try:
+                    created = reconfigure_structure(property_obj, layout, rename_floors=bool(data.get('floor_names')))
+                except ValueError as e:
+                    return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+            elif reset:
+                # Cascade deletes rooms/beds/occupancies with set-based SQL
+                fast_delete(property_obj.floors.all())
+                created = create_structure(property_obj, layout)
 
             # If not resetting, ensure no conflict with existing structure
             elif property_obj.floors.exists():
-                return Response({'detail': 'Property already has floors. Pass reset=true to reconfigure.'}, status=status.HTTP_400_BAD_REQUEST)
-
-            # Determine floors to create
-            floor_levels = list(range(1, (floors_count or 0) + 1))
-            if not floor_levels:
-                # Fallback: infer from provided maps
-                keys = set()
-                for k in (room_numbers_map.keys() | bed_numbers_map.keys()):
-                    try:
-                        keys.add(int(k))
-                    except Exception:
-                        pass
-                floor_levels = sorted(keys)
-            if not floor_levels:
-                return Response({'detail': 'No floors defined (provide floors_count or room_numbers/bed_numbers keys).'}, status=status.HTTP_400_BAD_REQUEST)
-
-            # Create floors → rooms → beds (+ occupancy)
-            for level in floor_levels:
-                fname = floor_names[level - 1] if level - 1 < len(floor_names) else f'Floor {level}'
-                floor = Floor.objects.create(property=property_obj, floor_level=level, floor_name=fname)
-                created_floors += 1
-
-                # Determine room numbers for this floor
-                rn_list = room_numbers_map.get(str(level)) or room_numbers_map.get(level) or []
-
-                # If explicit room list provided, use it; else fall back to default count
-                if rn_list:
-                    room_iter = [(i + 1, rn_list[i]) for i in range(len(rn_list))]
-                else:
-                    if not rooms_per_floor:
-                        return Response({'detail': f'rooms_per_floor missing and no room_numbers provided for floor {level}.'}, status=status.HTTP_400_BAD_REQUEST)
-                    room_iter = [(r_idx, f'{level:02d}{r_idx:02d}') for r_idx in range(1, rooms_per_floor + 1)]
-
-                bn_floor = bed_numbers_map.get(str(level)) or bed_numbers_map.get(level) or {}
-
-                for r_idx, room_number in room_iter:
-                    # Beds per room: explicit list overrides default
-                    bn_list = bn_floor.get(room_number) or []
-
-                    # Determine bed iteration
-                    if bn_list:
-                        bed_iter = [(i + 1, bn_list[i]) for i in range(len(bn_list))]
-                        bed_count_for_room = len(bn_list)
-                    else:
-                        if not beds_per_room:
-                            return Response({'detail': f'beds_per_room missing and no bed_numbers provided for floor {level} room {room_number}.'}, status=status.HTTP_400_BAD_REQUEST)
-                        bed_iter = [(b_idx, (chr(64 + b_idx) if b_idx <= 26 else str(b_idx))) for b_idx in range(1, beds_per_room + 1)]
-                        bed_count_for_room = beds_per_room
-
-                    room = Room.objects.create(
-                        floor=floor,
-                        property=property_obj,
-                        room_number=room_number,
-                        total_beds=bed_count_for_room,
-                    )
-                    created_rooms += 1
-
-                    for b_idx, bed_number in bed_iter:
-                        bed = Bed.objects.create(
-                            room=room,
-                            floor=floor,
-                            property=property_obj,
-                            bed_number=bed_number,
-                            bed_name=bed_number,
-                        )
-                        created_beds += 1
-
-                        # Initialize occupancy as available
-                        Occupancy.objects.create(
-                            property=property_obj,
-                            floor=floor,
-                            room=room,
-                            bed=bed,
-                            is_occupied=False,
-                        )
+                return Response({'detail': 'Property already has floors. Pass reconfigure=true or reset=true to change it.'}, status=status.HTTP_400_BAD_REQUEST)
+
+            else:
+                # Create floors → rooms → beds (+ occupancy), one bulk insert per level
+                created = create_structure(property_obj, layout)
 
         # Update property numeric fields to reflect configured structure (optional)
         if floors_count:
@@ -229,9 +276,14 @@ class PropertyViewSet(viewsets.ModelViewSet):
 
         out = PropertySetupResponseSerializer({
             'property_id': property_obj.id,
-            'created_floors': created_floors,
-            'created_rooms': created_rooms,
-            'created_beds': created_beds,
+            'created_floors': created['floors'],
+            'created_rooms': created['rooms'],
+            'created_beds': created['beds'],
+            'updated_floors': created.get('updated_floors', 0),
+            'updated_rooms': created.get('updated_rooms', 0),
+            'deleted_floors': created.get('deleted_floors', 0),
+            'deleted_rooms': created.get('deleted_rooms', 0),
+            'deleted_beds': created.get('deleted_beds', 0),
         })
         return Response(out.data, status=status.HTTP_201_CREATED)
 
@@ -241,6 +293,9 @@ class PropertyViewSet(viewsets.ModelViewSet):
         parameters=[
             OpenApiParameter(name='start_date', description='Start date (YYYY-MM-DD)', required=False, type=OpenApiTypes.STR),
             OpenApiParameter(name='end_date', description='End date (YYYY-MM-DD)', required=False, type=OpenApiTypes.STR),
+            OpenApiParameter(name='expand', description='Pass resident_full to nest the full resident record instead of the summary', required=False, type=OpenApiTypes.STR),
+            OpenApiParameter(name='fields', description='Comma-separated fields to include', required=False, type=OpenApiTypes.STR),
+            OpenApiParameter(name='omit', description='Comma-separated fields to leave out', required=False, type=OpenApiTypes.STR),
         ]
     )
     @action(detail=True, methods=['get'], url_path='payments')
@@ -249,7 +304,12 @@ class PropertyViewSet(viewsets.ModelViewSet):
         from datetime import datetime
 
         property_obj = self.get_object()
-        qs = Payment.objects.filter(property=property_obj).order_by('-payment_date')
+        context = {'request': request}
+        fields = PaymentSerializer(context=context).fields
+        qs = PaymentSerializer.setup_eager_loading(
+            Payment.objects.filter(property=property_obj).order_by('-payment_date'),
+            fields,
+        )
 
         start_date = request.query_params.get('start_date')
         end_date = request.query_params.get('end_date')
@@ -266,234 +326,58 @@ class PropertyViewSet(viewsets.ModelViewSet):
             except ValueError:
                 return Response({'detail': 'Invalid end_date format. Use YYYY-MM-DD.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        serializer = PaymentSerializer(qs, many=True)
+        qs = list(qs)
+        context = add_payment_due_summaries(context, qs, fields)
+        serializer = PaymentSerializer(qs, many=True, context=context)
         return Response(serializer.data)
 
-    @extend_schema(tags=['Home'], description='Home screen summary for a property')
+    @extend_schema(
+        tags=['Home'],
+        description='Home screen summary for a property. Served from a per-property cache that writes to payments, residents, occupancies and the bed layout invalidate; the X-Home-Summary-Cache header reports hit, stale or miss.',
+        parameters=[
+            OpenApiParameter(name='refresh', type=OpenApiTypes.BOOL, location=OpenApiParameter.QUERY, required=False, description='Recompute now instead of serving a cached summary'),
+        ],
+    )
     @action(detail=True, methods=['get'])
     def home_summary(self, request, pk=None):
-        from django.utils import timezone
-        from django.db.models import Sum
-        from datetime import date, timedelta
-        from decimal import Decimal
-        from .payment_utils import calculate_due_amount, is_overdue, get_overdue_amount
-        import calendar
+        from .home_utils import get_home_summary
 
         property_obj = self.get_object()
-        today = timezone.now().date()
-
-        def days_in_month(y: int, m: int):
-            return calendar.monthrange(y, m)[1]
-
-        # Get all active residents with active occupancy (not moved out)
-        residents = Resident.objects.filter(
-            property=property_obj,
-            is_active=True,
-            move_out_date__isnull=True,
-        )
-
-        overdue_details = []  # Residents with overdue payments
-        due_details = []      # Residents with due or upcoming due payments (not yet overdue)
-        overdue_total_amount = Decimal(0)
-        due_total_amount = Decimal(0)
-
-        for resident in residents:
-            if not resident.is_active or not resident.joining_date:
-                continue
-                
-            due_amount = calculate_due_amount(resident, today)
-            
-            # Skip residents with no due amount at all
-            if due_amount <= 0:
-                continue
-            
-            resident_data = ResidentSerializer(resident).data
-            resident_data['due_amount'] = str(due_amount.quantize(Decimal('0.01')))
-            
-            # Check if overdue
-            if is_overdue(resident, today):
-                # Overdue: has due amount and payment date has passed
-                overdue_details.append(resident_data)
-                overdue_total_amount += due_amount
-            else:
-                # Not yet overdue - check if due soon or upcoming
-                # For DAILY residents: due if 0+ days have passed (same day onwards)
-                # For WEEKLY residents: due if approaching end of week
-                # For MONTHLY residents: due if payment date approaching OR has arrears
-                
-                should_add_to_due = False
-                add_due_amount = due_amount if due_amount > 0 else Decimal(0)
-                
-                if resident.rent_type == 'daily':
-                    # Daily: show as DUE if joined today or earlier (any accumulated rent)
-                    if resident.joining_date and resident.joining_date <= today:
-                        should_add_to_due = True
-                        add_due_amount = due_amount
-                
-                elif resident.rent_type == 'weekly':
-                    # Weekly: show as DUE if approaching a week (5+ days in)
-                    if resident.joining_date:
-                        days_since_joining = (today - resident.joining_date).days
-                        week_position = days_since_joining % 7
-                        # Show as due if in last 2 days of week (days 5-6 out of 0-6)
-                        if week_position >= 5:
-                            should_add_to_due = True
-                            add_due_amount = due_amount
-                
-                elif resident.rent_type == 'bi-weekly':
-                    # Bi-weekly: show as DUE if approaching payment (11+ days in)
-                    if resident.joining_date:
-                        days_since_joining = (today - resident.joining_date).days
-                        biweek_position = days_since_joining % 14
-                        # Show as due if in last 3 days of bi-weekly period
-                        if biweek_position >= 11:
-                            should_add_to_due = True
-                            add_due_amount = due_amount
-                
-                elif resident.rent_type == 'monthly':
-                    # Monthly: show as DUE if:
-                    # 1. Next billing date is approaching (within 5 days), OR
-                    # 2. Has arrears (even if no rent accrued yet)
-                    from .payment_utils import next_billing_date
-                    
-                    has_arrears = Decimal(resident.arrears or 0) > 0
-                    next_bill = next_billing_date(resident, today)
-                    
-                    if next_bill:
-                        delta_days = (next_bill - today).days
-                        # Show if next billing date is within 5 days forward or 1 day past
-                        is_billing_soon = -1 <= delta_days <= 5
-                    else:
-                        is_billing_soon = False
-                    
-                    # Show as DUE if billing is approaching OR has arrears
-                    if is_billing_soon or has_arrears:
-                        should_add_to_due = True
-                        add_due_amount = due_amount
-                
-                if should_add_to_due:
-                    due_details.append(resident_data)
-                    due_total_amount += add_due_amount
-
-        # Beds summary
-        occupied_beds = Occupancy.objects.filter(property=property_obj, is_occupied=True).count()
-        # 'available' should reflect total beds in the property
-        available_beds = Bed.objects.filter(room__floor__property=property_obj).count()
-
-        return Response({
-            'property': {
-                'id': property_obj.id,
-                'name': property_obj.name,
-            },
-            'occupied_beds': occupied_beds,
-            'available_beds': available_beds,
-            'overdue': {
-                'count': len(overdue_details),
-                'total_amount': str(overdue_total_amount.quantize(Decimal('0.01'))),
-                'details': overdue_details,
-            },
-            'due': {
-                'count': len(due_details),
-                'total_amount': str(due_total_amount.quantize(Decimal('0.01'))),
-                'details': due_details,
-            },
-        })
+        refresh = request.query_params.get('refresh', '').lower() in ('1', 'true', 'yes')
+        data, cache_status = get_home_summary(property_obj, refresh=refresh)
+        response = Response(data)
+        response['X-Home-Summary-Cache'] = cache_status
+        return response
 
 
-    @extend_schema(tags=['Finance'], description='Financial summary for the last 5 years with monthly income (payments) and expenses. Returns per-year totals and top spending categories.')
+    @extend_schema(
+        tags=['Finance'],
+        description='Financial summary for the last N years (default 5) with monthly income (payments) and expenses. Returns per-year totals and top spending categories.',
+        parameters=[
+            OpenApiParameter(name='years', type=OpenApiTypes.INT, location=OpenApiParameter.QUERY, required=False, description='Number of calendar years including the current one (1-20, default 5)'),
+        ],
+    )
     @action(detail=True, methods=['get'], url_path='financial_summary')
     def financial_summary(self, request, pk=None):
-        from django.utils import timezone
-        from django.db.models import Sum
-        from django.db.models.functions import ExtractMonth
+        from .finance_utils import build_financial_summary, DEFAULT_SUMMARY_YEARS, MAX_SUMMARY_YEARS
+        from .single_flight import single_flight, flight_key
 
         property_obj = self.get_object()
-        current_year = timezone.now().date().year
-        years = [current_year - i for i in range(0, 5)]
-
-        results = []
-        for year in years:
-            # Monthly income (payments)
-            income_rows = (
-                Payment.objects
-                .filter(property=property_obj, payment_date__year=year)
-                .annotate(month=ExtractMonth('payment_date'))
-                .values('month')
-                .annotate(total=Sum('amount'))
-            )
-            income_series = [0.0] * 12
-            for row in income_rows:
-                m = row['month']
-                if 1 <= m <= 12:
-                    income_series[m - 1] = float(row['total'] or 0)
-
-            # Monthly expenses
-            expense_rows = (
-                Expense.objects
-                .filter(property=property_obj, expense_date__year=year)
-                .annotate(month=ExtractMonth('expense_date'))
-                .values('month')
-                .annotate(total=Sum('amount'))
-            )
-            expense_series = [0.0] * 12
-            for row in expense_rows:
-                m = row['month']
-                if 1 <= m <= 12:
-                    expense_series[m - 1] = float(row['total'] or 0)
-
-            # Totals for the year
-            total_income = float(
-                Payment.objects.filter(property=property_obj, payment_date__year=year).aggregate(Sum('amount'))['amount__sum'] or 0
-            )
-            total_expenses = float(
-                Expense.objects.filter(property=property_obj, expense_date__year=year).aggregate(Sum('amount'))['amount__sum'] or 0
-            )
-
-            # Top spendings by category (top 5)
-            top_categories_qs = (
-                Expense.objects
-                .filter(property=property_obj, expense_date__year=year)
-                .values('category')
-                .annotate(total=Sum('amount'))
-                .order_by('-total')[:5]
-            )
-            top_categories = [{'category': r['category'], 'total': float(r['total'] or 0)} for r in top_categories_qs]
-
-            # Resident stats for the year
-            joined_count = Resident.objects.filter(property=property_obj, joining_date__year=year).count()
-            moved_out_count = Resident.objects.filter(property=property_obj, move_out_date__year=year).count()
-
-            results.append({
-                'year': year,
-                'monthly': {
-                    'income': income_series,
-                    'expenses': expense_series,
-                },
-                'totals': {
-                    'income': total_income,
-                    'expenses': total_expenses,
-                    'net': round(total_income - total_expenses, 2),
-                },
-                'top_spendings': {
-                    'categories': top_categories,
-                },
-                'residents': {
-                    'joined': joined_count,
-                    'moved_out': moved_out_count,
-                },
-            })
+        try:
+            years = int(request.query_params.get('years', DEFAULT_SUMMARY_YEARS))
+        except (TypeError, ValueError):
+            return Response({'detail': 'years must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        if not 1 <= years <= MAX_SUMMARY_YEARS:
+            return Response({'detail': f'years must be between 1 and {MAX_SUMMARY_YEARS}'}, status=status.HTTP_400_BAD_REQUEST)
 
-        return Response({
-            'property': {
-                'id': property_obj.id,
-                'name': property_obj.name,
-            },
-            'years': results,
-        })
+        return Response(single_flight(
+            flight_key('financial_summary', property_obj.id, years),
+            lambda: build_financial_summary(property_obj, years=years),
+        ))
 
 
 @extend_schema(tags=['Floors'])
-class FloorViewSet(viewsets.ModelViewSet):
+class FloorViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     """
     API endpoints for managing floors within properties.
     
@@ -510,9 +394,15 @@ class FloorViewSet(viewsets.ModelViewSet):
     ordering_fields = ['floor_level', 'created_at']
     ordering = ['property', 'floor_level']
 
+    def perform_destroy(self, instance):
+        from .deletion_utils import fast_delete
+        from .home_utils import invalidate_home_summary
+        fast_delete(Floor.objects.filter(pk=instance.pk))
+        invalidate_home_summary(instance.property_id)
+
 
 @extend_schema(tags=['Rooms'])
-class RoomViewSet(viewsets.ModelViewSet):
+class RoomViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     """
     API endpoints for managing rooms within floors.
     
@@ -530,9 +420,66 @@ class RoomViewSet(viewsets.ModelViewSet):
     ordering_fields = ['room_number', 'created_at']
     ordering = ['floor', 'room_number']
 
+    @extend_schema(
+        description='Change total_beds for several rooms in one request. Pass either rooms=[{id, total_beds}, ...] or floor + total_beds to resize every room on a floor. Empty beds are removed from the highest bed number; rooms cannot go below their occupied count.',
+        request=RoomBulkCapacityRequestSerializer,
+        responses=RoomBulkCapacityResponseSerializer,
+    )
+    @action(detail=False, methods=['post'], url_path='bulk-capacity')
+    def bulk_capacity(self, request):
+        """Resize many rooms with a fixed number of queries."""
+        from django.db.models import Count
+        from django.utils import timezone
+        from .structure_utils import apply_room_capacity
+        from .serializers import room_capacity_error
+
+        input_ser = RoomBulkCapacityRequestSerializer(data=request.data)
+        input_ser.is_valid(raise_exception=True)
+        data = input_ser.validated_data
+
+        with transaction.atomic():
+            rooms = Room.objects.select_for_update().order_by('floor_id', 'room_number')
+            if data.get('rooms'):
+                targets = {item['id']: item['total_beds'] for item in data['rooms']}
+                rooms = list(rooms.filter(id__in=list(targets)))
+                missing = sorted(set(targets) - {room.id for room in rooms})
+                if missing:
+                    return Response({'detail': f'Rooms not found: {missing}'}, status=status.HTTP_404_NOT_FOUND)
+            else:
+                rooms = list(rooms.filter(floor_id=data['floor']))
+                targets = {room.id: data['total_beds'] for room in rooms}
+
+            occupied = dict(
+                Occupancy.objects
+                .filter(room_id__in=list(targets), is_occupied=True)
+                .values_list('room_id')
+                .annotate(n=Count('id'))
+                .order_by()
+            )
+            errors = {
+                str(room.id): [room_capacity_error(room.room_number, occupied[room.id], targets[room.id])]
+                for room in rooms
+                if targets[room.id] < occupied.get(room.id, 0)
+            }
+            if errors:
+                raise serializers.ValidationError({'rooms': errors})
+
+            changes = []
+            now = timezone.now()
+            for room in rooms:
+                changes.append((room, room.total_beds, targets[room.id]))
+                room.total_beds = targets[room.id]
+                room.updated_at = now
+            Room.objects.bulk_update(rooms, ['total_beds', 'updated_at'])
+            counts = apply_room_capacity(changes)
+
+        rooms = list(self.eager_load(Room.objects.filter(id__in=list(targets))).order_by('floor', 'room_number'))
+        out = RoomBulkCapacityResponseSerializer({'rooms': rooms, **counts})
+        return Response(out.data)
+
 
 @extend_schema(tags=['Beds'])
-class BedViewSet(viewsets.ModelViewSet):
+class BedViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     """
     API endpoints for managing beds within rooms.
     
@@ -554,13 +501,19 @@ class BedViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def available(self, request):
         """Get all available beds"""
-        available_beds = Bed.objects.filter(is_active=True, occupancy__is_occupied=False)
+        available_beds = self.eager_load(Bed.objects.filter(is_active=True, occupancy__is_occupied=False))
         serializer = self.get_serializer(available_beds, many=True)
         return Response(serializer.data)
 
 
 @extend_schema(tags=['Residents'])
-class ResidentViewSet(viewsets.ModelViewSet):
+@extend_schema_view(
+    list=extend_schema(parameters=[
+        OpenApiParameter(name='payment_status', type=OpenApiTypes.STR, location=OpenApiParameter.QUERY, required=False, description='Comma-separated: ON_TIME, DUE_SOON, OVERDUE, SEVERELY_OVERDUE'),
+        OpenApiParameter(name='is_overdue', type=OpenApiTypes.BOOL, location=OpenApiParameter.QUERY, required=False),
+    ]),
+)
+class ResidentViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     """
     API endpoints for managing residents/tenants.
     
@@ -570,6 +523,8 @@ class ResidentViewSet(viewsets.ModelViewSet):
     - Update resident information
     - Delete resident
     - Get residents with payment due soon
+    - List filters payment_status / is_overdue and ordering by days_overdue /
+      due_amount run in SQL (see payment_utils.annotate_payment_status)
     """
     queryset = Resident.objects.all()
     serializer_class = ResidentSerializer
@@ -577,39 +532,28 @@ class ResidentViewSet(viewsets.ModelViewSet):
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['property', 'is_active', 'rent_type']
     search_fields = ['first_name', 'last_name', 'email', 'mobile']
-    ordering_fields = ['first_name', 'last_name', 'joining_date', 'preferred_billing_day', 'created_at']
+    ordering_fields = [
+        'first_name', 'last_name', 'joining_date', 'preferred_billing_day', 'created_at',
+        'days_overdue', 'due_amount',
+    ]
     ordering = ['-created_at']
+    skip_eager_load_actions = ('checkout', 'statement', 'media')
     logger = logging.getLogger(__name__)
 
-    def _upload_to_gcs(self, resident: Resident, file_obj, kind: str):
-        """Upload a file object to GCS and return the public URL."""
-        bucket_name = settings.GCS_BUCKET
-        if not bucket_name or not file_obj:
-            self.logger.warning("GCS upload skipped: bucket=%s file_present=%s kind=%s", bucket_name, bool(file_obj), kind)
-            return None
-        try:
-            from google.cloud import storage
-            client = storage.Client()
-            bucket = client.bucket(bucket_name)
-            filename = getattr(file_obj, 'name', None) or f'{kind}.bin'
-            prefix = settings.GCS_UPLOAD_PREFIX or 'properties'
-            object_name = f"{prefix}/{resident.property_id}/residents/{resident.id}/{kind}/{filename}"
-            blob = bucket.blob(object_name)
-            content_type = getattr(file_obj, 'content_type', None)
-            try:
-                # Ensure stream at beginning; google client can rewind too
-                if hasattr(file_obj, 'seek'):
-                    file_obj.seek(0)
-                blob.upload_from_file(getattr(file_obj, 'file', file_obj), content_type=content_type, rewind=True)
-            except Exception as e:
-                self.logger.exception("GCS upload error for kind=%s object=%s: %s", kind, object_name, e)
-                return None
-            url = f"https://storage.googleapis.com/{bucket_name}/{object_name}"
-            self.logger.info("GCS upload success: kind=%s url=%s", kind, url)
-            return url
-        except Exception as e:
-            self.logger.exception("GCS client/bucket error: %s", e)
-            return None
+    def get_list_serializer_context(self, residents):
+        """
+        Compute dues for the whole page in one batch.
+
+        Payment totals for all residents are loaded with a single grouped query
+        and handed to ResidentSerializer via context, so the per-resident due
+        fields no longer run their own Payment queries.
+        """
+        from .payment_utils import calculate_dues_for_residents
+        context = super().get_list_serializer_context(residents)
+        fields = self.get_requested_fields()
+        if any(name in fields for name in ResidentSerializer.due_fields):
+            context['due_summaries'] = calculate_dues_for_residents(residents)
+        return context
 
     def get_queryset(self):
         """
@@ -618,8 +562,10 @@ class ResidentViewSet(viewsets.ModelViewSet):
         To fetch only moved-out residents via this endpoint, pass `moved_out_only=true`
         (Alternatively, use `/residents/historical/`).
         """
-        qs = Resident.objects.all()
+        qs = self.eager_load(Resident.objects.all())
         params = self.request.query_params
+        if self.action == 'list':
+            qs = self._filter_payment_status(qs, params)
         moved_out_only = params.get('moved_out_only')
         include_moved_out = params.get('include_moved_out')
         if moved_out_only and moved_out_only.lower() in ('1', 'true', 'yes'):  # only moved out
@@ -629,12 +575,42 @@ class ResidentViewSet(viewsets.ModelViewSet):
         # default: active only
         return qs.filter(is_active=True, move_out_date__isnull=True)
 
+    def _filter_payment_status(self, qs, params):
+        """
+        Apply `payment_status` / `is_overdue` filters.
+
+        The payment status columns are only annotated when a filter or the
+        ordering (days_overdue / due_amount) needs them; plain lists skip the
+        per-row ledger lookup.
+        """
+        from .payment_utils import annotate_payment_status, PAYMENT_STATUSES
+        ordering = params.get(filters.OrderingFilter.ordering_param, '')
+        ordered_by_due = any(
+            field.strip().lstrip('-') in ('days_overdue', 'due_amount') for field in ordering.split(',')
+        )
+        if not (params.get('payment_status') or params.get('is_overdue') or ordered_by_due):
+            return qs
+        qs = annotate_payment_status(qs)
+        statuses = params.get('payment_status')
+        if statuses:
+            statuses = [value.strip().upper() for value in statuses.split(',') if value.strip()]
+            invalid = [value for value in statuses if value not in PAYMENT_STATUSES]
+            if invalid:
+                raise serializers.ValidationError({
+                    'payment_status': f"Invalid value(s): {', '.join(invalid)}. Use {', '.join(PAYMENT_STATUSES)}.",
+                })
+            qs = qs.filter(payment_status__in=statuses)
+        overdue = params.get('is_overdue')
+        if overdue:
+            qs = qs.filter(is_overdue=overdue.lower() in ('1', 'true', 'yes'))
+        return qs
+
     @extend_schema(
-        description='Create resident and optionally upload photo/aadhar via multipart/form-data (fields: photo, aadhar).',
+        description='Create resident and optionally upload photo/aadhar via multipart/form-data (fields: photo, aadhar). Files are uploaded in the background: photo_status/aadhar_status is "pending" in the response and becomes "uploaded" (with photo_url/aadhar_url set) or "failed".',
         responses=ResidentSerializer,
     )
     def create(self, request, *args, **kwargs):
-        """Create resident and handle optional file uploads to GCS in one step."""
+        """Create resident and queue optional photo/aadhar uploads to media storage."""
         self.logger.info("Resident create: content_type=%s", getattr(request, 'content_type', None))
         self.logger.debug("Resident create: data_keys=%s file_keys=%s", list(getattr(request, 'data', {}).keys()), list(getattr(request, 'FILES', {}).keys()))
         serializer = self.get_serializer(data=request.data)
@@ -642,84 +618,60 @@ class ResidentViewSet(viewsets.ModelViewSet):
         self.logger.info("Resident create: serializer valid for first_name=%s", serializer.validated_data.get('first_name'))
         resident = serializer.save()
         self.logger.info("Resident create: resident saved id=%s property_id=%s", resident.id, resident.property_id)
-        # Handle optional file uploads
-        photo_file = request.FILES.get('photo')
-        aadhar_file = request.FILES.get('aadhar')
-        self.logger.info("Resident create: files present photo=%s aadhar=%s", bool(photo_file), bool(aadhar_file))
-        updated_fields = []
-        if photo_file:
-            self.logger.info("Resident create: uploading photo name=%s size=%s ctype=%s", getattr(photo_file, 'name', None), getattr(photo_file, 'size', None), getattr(photo_file, 'content_type', None))
-            url = self._upload_to_gcs(resident, photo_file, 'photo')
-            if url:
-                resident.photo_url = url
-                updated_fields.append('photo_url')
-        if aadhar_file:
-            self.logger.info("Resident create: uploading aadhar name=%s size=%s ctype=%s", getattr(aadhar_file, 'name', None), getattr(aadhar_file, 'size', None), getattr(aadhar_file, 'content_type', None))
-            url = self._upload_to_gcs(resident, aadhar_file, 'aadhar')
-            if url:
-                resident.aadhar_url = url
-                updated_fields.append('aadhar_url')
-        if updated_fields:
-            resident.save(update_fields=updated_fields)
-            self.logger.info("Resident create: saved media URLs photo_url=%s aadhar_url=%s", resident.photo_url, resident.aadhar_url)
+        # Optional files are spooled and uploaded in the background (see upload_utils)
+        from .upload_utils import MEDIA_KINDS, queue_upload
+        for kind in MEDIA_KINDS:
+            file_obj = request.FILES.get(kind)
+            if file_obj:
+                self.logger.info("Resident create: queueing %s name=%s size=%s ctype=%s", kind, getattr(file_obj, 'name', None), getattr(file_obj, 'size', None), getattr(file_obj, 'content_type', None))
+                queue_upload(resident, kind, file_obj)
+        if any(kind in request.FILES for kind in MEDIA_KINDS):
+            # Inline uploads (MEDIA_UPLOAD_THREADS=0) have already finished here
+            resident.refresh_from_db(fields=['photo_url', 'photo_status', 'aadhar_url', 'aadhar_status'])
         out = self.get_serializer(resident)
         headers = self.get_success_headers(out.data)
         return Response(out.data, status=status.HTTP_201_CREATED, headers=headers)
 
     @extend_schema(
-        description='Proxy private media from GCS for a resident. Kind can be "photo" or "aadhar". Streams bytes with correct Content-Type.',
+        description='Proxy private media from GCS for a resident. Kind can be "photo" or "aadhar". Streams bytes with correct Content-Type; supports Range and If-None-Match (ETag).',
         parameters=[
             OpenApiParameter(name='kind', description='Media kind: photo or aadhar', required=True, type=OpenApiTypes.STR),
         ],
     )
     @action(detail=True, methods=['get'], url_path='media/(?P<kind>[^/.]+)')
     def media(self, request, pk=None, kind=None):
-        """Stream resident media securely from GCS without exposing public bucket access."""
+        """
+        Stream resident media securely from GCS without exposing public bucket access.
+
+        Served in chunks with ETag / Range support, from the local media cache
+        when the object was viewed recently (see media_utils).
+        """
         resident = self.get_object()
         if kind not in ('photo', 'aadhar'):
             return Response({'detail': 'Invalid kind. Use photo or aadhar.'}, status=status.HTTP_400_BAD_REQUEST)
         url = resident.photo_url if kind == 'photo' else resident.aadhar_url
         if not url:
+            if getattr(resident, f'{kind}_status') == 'pending':
+                return Response({'detail': 'Media upload pending.'}, status=status.HTTP_404_NOT_FOUND)
             return Response({'detail': 'Media not available for resident.'}, status=status.HTTP_404_NOT_FOUND)
 
-        bucket_name = settings.GCS_BUCKET
-        if not bucket_name:
-            self.logger.error('Media proxy: GCS_BUCKET not configured')
-            return Response({'detail': 'Storage not configured'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
+        from .media_utils import get_media_cache, media_response
+        from .storage import get_media_storage
         try:
-            from google.cloud import storage
-            parsed = urlparse(url)
-            parts = parsed.path.strip('/').split('/')
-            # Expect path like /<bucket>/<object_name>
-            object_name = None
-            if parts and parts[0] == bucket_name:
-                object_name = '/'.join(parts[1:])
-            else:
-                # Fallback: if a full URL is not using storage.googleapis.com format, try to use entire path
-                # e.g., if photo_url stored as just object path
-                object_name = '/'.join(parts)
+            storage = get_media_storage()
+            if storage is None:
+                self.logger.error('Media proxy: GCS_BUCKET not configured')
+                return Response({'detail': 'Storage not configured'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+            object_name = storage.object_name(url)
             if not object_name:
                 self.logger.error('Media proxy: could not parse object name from url=%s', url)
                 return Response({'detail': 'Invalid media url'}, status=status.HTTP_400_BAD_REQUEST)
 
-            client = storage.Client()
-            bucket = client.bucket(bucket_name)
-            blob = bucket.blob(object_name)
-            if not blob.exists():
-                self.logger.warning('Media proxy: blob not found bucket=%s object=%s', bucket_name, object_name)
+            resp = media_response(request, storage, object_name, get_media_cache())
+            if resp is None:
+                self.logger.warning('Media proxy: object not found bucket=%s object=%s', storage.bucket_name, object_name)
                 return Response({'detail': 'Media not found'}, status=status.HTTP_404_NOT_FOUND)
-            # Load metadata for content_type
-            blob.reload()
-            content_type = blob.content_type or mimetypes.guess_type(object_name)[0] or 'application/octet-stream'
-            data = blob.download_as_bytes()
-            from django.http import HttpResponse
-            resp = HttpResponse(data, content_type=content_type)
-            resp['Cache-Control'] = 'private, max-age=300'
-            # Inline display for common types
-            filename = object_name.rsplit('/', 1)[-1]
-            resp['Content-Disposition'] = 'inline; filename="%s"' % filename
             return resp
         except Exception as e:
             self.logger.exception('Media proxy error kind=%s resident_id=%s: %s', kind, resident.id, e)
@@ -734,13 +686,13 @@ class ResidentViewSet(viewsets.ModelViewSet):
         d0 = today.day
         d7 = (d0 + 7)
 
-        qs = Resident.objects.filter(is_active=True, preferred_billing_day__isnull=False)
+        qs = self.eager_load(Resident.objects.filter(is_active=True, preferred_billing_day__isnull=False))
         if d7 <= 31:
             qs = qs.filter(preferred_billing_day__gte=d0, preferred_billing_day__lte=d7)
         else:
             wrap = d7 - 31
             qs = qs.filter(Q(preferred_billing_day__gte=d0) | Q(preferred_billing_day__lte=wrap))
-        serializer = self.get_serializer(qs, many=True)
+        serializer = self.get_list_serializer(qs)
         return Response(serializer.data)
 
     @action(detail=False, methods=['get'])
@@ -750,11 +702,11 @@ class ResidentViewSet(viewsets.ModelViewSet):
         
         today = timezone.now().date()
         d0 = today.day
-        overdue_residents = Resident.objects.filter(
+        overdue_residents = self.eager_load(Resident.objects.filter(
             is_active=True,
             preferred_billing_day__lt=d0
-        )
-        serializer = self.get_serializer(overdue_residents, many=True)
+        ))
+        serializer = self.get_list_serializer(overdue_residents)
         return Response(serializer.data)
 
     @extend_schema(
@@ -807,6 +759,28 @@ class ResidentViewSet(viewsets.ModelViewSet):
         data = calculate_checkout_breakdown(resident, checkout_date, monthly_option=monthly_option)
         return Response(data)
 
+    @extend_schema(
+        tags=['Residents'],
+        description='Month-by-month ledger statement for a resident: opening balance, rent/arrears charges, payment credits and closing balance per month, with the entries of each month. Rent of closed months not yet posted by the billing run is included with id null.',
+        parameters=[
+            OpenApiParameter(name='months', type=OpenApiTypes.INT, location=OpenApiParameter.QUERY, required=False, description='Number of calendar months including the current one (1-60, default 12)'),
+        ],
+        responses={200: OpenApiTypes.OBJECT},
+    )
+    @action(detail=True, methods=['get'], url_path='statement')
+    def statement(self, request, pk=None):
+        from .ledger_utils import build_statement, DEFAULT_STATEMENT_MONTHS, MAX_STATEMENT_MONTHS
+
+        resident = self.get_object()
+        try:
+            months = int(request.query_params.get('months', DEFAULT_STATEMENT_MONTHS))
+        except (TypeError, ValueError):
+            return Response({'detail': 'months must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        if not 1 <= months <= MAX_STATEMENT_MONTHS:
+            return Response({'detail': f'months must be between 1 and {MAX_STATEMENT_MONTHS}'}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(build_statement(resident, months=months))
+
     @extend_schema(
         tags=['Residents'],
         description='Get historical residents (move_out_date set). Optional filters: property, start_date, end_date (YYYY-MM-DD).',
@@ -819,7 +793,7 @@ class ResidentViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'], url_path='historical')
     def historical(self, request):
         from datetime import datetime
-        qs = Resident.objects.filter(move_out_date__isnull=False)
+        qs = self.eager_load(Resident.objects.filter(move_out_date__isnull=False))
         prop_id = request.query_params.get('property')
         start_date = request.query_params.get('start_date')
         end_date = request.query_params.get('end_date')
@@ -837,7 +811,7 @@ class ResidentViewSet(viewsets.ModelViewSet):
                 qs = qs.filter(move_out_date__lte=ed)
             except ValueError:
                 return Response({'detail': 'Invalid end_date format. Use YYYY-MM-DD.'}, status=status.HTTP_400_BAD_REQUEST)
-        serializer = self.get_serializer(qs, many=True)
+        serializer = self.get_list_serializer(qs)
         return Response(serializer.data)
 
     @extend_schema(
@@ -917,13 +891,13 @@ class ResidentViewSet(viewsets.ModelViewSet):
                 notes=f'Moved from Room {old_bed.room.room_number}, Bed {old_bed.bed_number}'
             )
 
-        # Refresh resident and return
-        resident.refresh_from_db()
+        # Reload resident (and its prefetched occupancy) and return
+        resident = self.get_queryset().get(pk=resident.pk)
         return Response(self.get_serializer(resident).data)
 
 
 @extend_schema(tags=['Occupancy'])
-class OccupancyViewSet(viewsets.ModelViewSet):
+class OccupancyViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     """
     API endpoints for managing occupancy records.
     
@@ -945,20 +919,20 @@ class OccupancyViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def occupied(self, request):
         """Get all occupied beds"""
-        occupied = Occupancy.objects.filter(is_occupied=True)
+        occupied = self.eager_load(Occupancy.objects.filter(is_occupied=True))
         serializer = self.get_serializer(occupied, many=True)
         return Response(serializer.data)
 
     @action(detail=False, methods=['get'])
     def available(self, request):
         """Get all available beds"""
-        available = Occupancy.objects.filter(is_occupied=False)
+        available = self.eager_load(Occupancy.objects.filter(is_occupied=False))
         serializer = self.get_serializer(available, many=True)
         return Response(serializer.data)
 
 
 @extend_schema(tags=['Occupancy History'])
-class OccupancyHistoryViewSet(viewsets.ModelViewSet):
+class OccupancyHistoryViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     """
     API endpoints for viewing occupancy history records.
     
@@ -974,15 +948,92 @@ class OccupancyHistoryViewSet(viewsets.ModelViewSet):
     ordering = ['-action_date']
 
     def get_queryset(self):
-        queryset = OccupancyHistory.objects.all()
+        queryset = self.eager_load(OccupancyHistory.objects.all())
         resident_id = self.request.query_params.get('resident_id')
         if resident_id:
             queryset = queryset.filter(resident_id=resident_id)
         return queryset
 
 
+@extend_schema(tags=['Billing'])
+@extend_schema_view(
+    list=extend_schema(parameters=[
+        OpenApiParameter(name='overdue', type=OpenApiTypes.BOOL, location=OpenApiParameter.QUERY, required=False, description='Only unpaid charges due before as_of'),
+        OpenApiParameter(name='as_of', type=OpenApiTypes.DATE, location=OpenApiParameter.QUERY, required=False, description='Reference date for overdue=true (YYYY-MM-DD, default today)'),
+    ]),
+)
+class BillingChargeViewSet(SparseFieldsetMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    API endpoints for billing-cycle rent charges (generated by the
+    generate_billing_charges command).
+
+    - List charges by property/resident/paid status
+    - overdue=true: unpaid charges whose due date has passed
+    """
+    queryset = BillingCharge.objects.all()
+    serializer_class = BillingChargeSerializer
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_fields = ['property', 'resident', 'is_paid']
+    ordering_fields = ['due_date', 'cycle_start', 'amount']
+    ordering = ['due_date']
+
+    def get_queryset(self):
+        from datetime import datetime
+        from .billing_utils import overdue_charges
+
+        queryset = self.eager_load(BillingCharge.objects.all())
+        if self.request.query_params.get('overdue', '').lower() in ('1', 'true', 'yes'):
+            as_of = self.request.query_params.get('as_of')
+            try:
+                as_of = datetime.strptime(as_of, '%Y-%m-%d').date() if as_of else None
+            except ValueError:
+                raise serializers.ValidationError({'as_of': 'Invalid date format. Use YYYY-MM-DD.'})
+            queryset = queryset & overdue_charges(as_of)
+        return queryset
+
+
+@extend_schema(tags=['Portfolio'])
+class PortfolioViewSet(viewsets.ViewSet):
+    """Dues across all properties (see portfolio_utils)."""
+
+    @extend_schema(
+        description='Due, overdue and aging totals across properties, per property, and the residents owing the most. Computed for all active residents in one pass.',
+        parameters=[
+            OpenApiParameter(name='property', type=OpenApiTypes.INT, location=OpenApiParameter.QUERY, required=False, many=True, description='Limit to these properties (repeatable; default all)'),
+            OpenApiParameter(name='as_of', type=OpenApiTypes.DATE, location=OpenApiParameter.QUERY, required=False, description='Date to calculate as of (YYYY-MM-DD, default today)'),
+            OpenApiParameter(name='limit', type=OpenApiTypes.INT, location=OpenApiParameter.QUERY, required=False, description='Residents to list, highest due first (0-500, default 50)'),
+        ],
+        responses={200: OpenApiTypes.OBJECT},
+    )
+    @action(detail=False, methods=['get'])
+    def dues(self, request):
+        from datetime import datetime
+        from .portfolio_utils import portfolio_dues, DEFAULT_RESIDENT_LIMIT, MAX_RESIDENT_LIMIT
+
+        params = request.query_params
+        try:
+            property_ids = [int(value) for value in params.getlist('property')] or None
+        except ValueError:
+            return Response({'detail': 'Invalid property. Use property ids.'}, status=status.HTTP_400_BAD_REQUEST)
+        as_of = params.get('as_of')
+        try:
+            as_of = datetime.strptime(as_of, '%Y-%m-%d').date() if as_of else None
+        except ValueError:
+            return Response({'detail': 'Invalid as_of format. Use YYYY-MM-DD.'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = int(params.get('limit', DEFAULT_RESIDENT_LIMIT))
+        except ValueError:
+            limit = -1
+        if not 0 <= limit <= MAX_RESIDENT_LIMIT:
+            return Response(
+                {'detail': f'Invalid limit. Use a number between 0 and {MAX_RESIDENT_LIMIT}.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return Response(portfolio_dues(property_ids, as_of, limit))
+
+
 @extend_schema(tags=['Expenses'])
-class ExpenseViewSet(viewsets.ModelViewSet):
+class ExpenseViewSet(SparseFieldsetMixin, AtomicWriteMixin, viewsets.ModelViewSet):
     """
     API endpoints for managing property expenses.
     
@@ -993,48 +1044,70 @@ class ExpenseViewSet(viewsets.ModelViewSet):
     - Delete expense
     - Get expenses grouped by category
     - Get expense summary and statistics
+
+    Create/update accept an optional receipt file via multipart/form-data
+    (field: receipt); it is uploaded to media storage and stored as receipt_url.
     """
     queryset = Expense.objects.all()
     serializer_class = ExpenseSerializer
+    parser_classes = [MultiPartParser, FormParser, JSONParser]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['property', 'category', 'payment_method']
     search_fields = ['category', 'description', 'paid_by']
     ordering_fields = ['expense_date', 'amount', 'created_at']
     ordering = ['-expense_date']
 
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        self._attach_receipt(serializer.instance)
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        self._attach_receipt(serializer.instance)
+
+    def _attach_receipt(self, expense):
+        """Upload the optional `receipt` file after the write transaction and save its URL."""
+        from .storage import media_object_name, upload_media
+        receipt = self.request.FILES.get('receipt')
+        if not receipt:
+            return
+        object_name = media_object_name(expense.property_id, 'expenses', expense.id, 'receipt', receipt.name)
+        url = upload_media(receipt, object_name)
+        if url:
+            expense.receipt_url = url
+            expense.save(update_fields=['receipt_url'])
+
+    @extend_schema(parameters=[PROPERTY_ROLLUP_PARAMETER])
     @action(detail=False, methods=['get'])
     def by_category(self, request):
         """Get expenses grouped by category"""
-        from django.db.models import Sum
-        
-        expenses_by_category = Expense.objects.values('category').annotate(
-            total=Sum('amount'),
-            count=Sum('id')
-        )
-        return Response(expenses_by_category)
+        from .finance_utils import expense_totals_by_category
 
+        return Response(expense_totals_by_category(property_id=_rollup_property_param(request)))
+
+    @extend_schema(parameters=[PROPERTY_ROLLUP_PARAMETER])
     @action(detail=False, methods=['get'])
     def summary(self, request):
         """Get expense summary"""
-        from django.db.models import Sum
         from django.utils import timezone
-        
+        from .finance_utils import rollup_totals
+        from .rollup_utils import EXPENSE
+
+        property_id = _rollup_property_param(request)
         today = timezone.now().date()
         month_start = today.replace(day=1)
-        
-        total_expenses = Expense.objects.aggregate(Sum('amount'))
-        month_expenses = Expense.objects.filter(
-            expense_date__gte=month_start
-        ).aggregate(Sum('amount'))
-        
+
+        total_expenses = rollup_totals(EXPENSE, property_id=property_id)
+        month_expenses = rollup_totals(EXPENSE, since=month_start, property_id=property_id)
+
         return Response({
-            'total_expenses': total_expenses['amount__sum'] or 0,
-            'this_month_expenses': month_expenses['amount__sum'] or 0,
+            'total_expenses': total_expenses['total'] or 0,
+            'this_month_expenses': month_expenses['total'] or 0,
         })
 
 
 @extend_schema(tags=['Payments'])
-class PaymentViewSet(viewsets.ModelViewSet):
+class PaymentViewSet(SparseFieldsetMixin, AtomicWriteMixin, viewsets.ModelViewSet):
     """
     API endpoints for managing resident payments.
     
@@ -1054,23 +1127,28 @@ class PaymentViewSet(viewsets.ModelViewSet):
     ordering = ['-payment_date']
     permission_classes = []
 
+    def get_list_serializer_context(self, payments):
+        context = super().get_list_serializer_context(payments)
+        return add_payment_due_summaries(context, payments, self.get_requested_fields())
+
+    @extend_schema(parameters=[PROPERTY_ROLLUP_PARAMETER])
     @action(detail=False, methods=['get'])
     def summary(self, request):
         """Get payment summary"""
-        from django.db.models import Sum
         from django.utils import timezone
-        
+        from .finance_utils import rollup_totals
+        from .rollup_utils import PAYMENT
+
+        property_id = _rollup_property_param(request)
         today = timezone.now().date()
         month_start = today.replace(day=1)
-        
-        total_payments = Payment.objects.aggregate(Sum('amount'))
-        month_payments = Payment.objects.filter(
-            payment_date__gte=month_start
-        ).aggregate(Sum('amount'))
-        
+
+        total_payments = rollup_totals(PAYMENT, property_id=property_id)
+        month_payments = rollup_totals(PAYMENT, since=month_start, property_id=property_id)
+
         return Response({
-            'total_payments': total_payments['amount__sum'] or 0,
-            'this_month_payments': month_payments['amount__sum'] or 0,
+            'total_payments': total_payments['total'] or 0,
+            'this_month_payments': month_payments['total'] or 0,
         })
 
     @action(detail=False, methods=['get'])
@@ -1088,20 +1166,20 @@ class PaymentViewSet(viewsets.ModelViewSet):
     )
     def by_resident(self, request):
         """Get payments by resident"""
-        from django.db.models import Sum
+        from django.db.models import Sum, Count
         
         resident_id = request.query_params.get('resident_id')
         if resident_id:
             payments = Payment.objects.filter(resident_id=resident_id).aggregate(
                 total=Sum('amount'),
-                count=Sum('id')
+                count=Count('id')
             )
             return Response(payments)
         return Response({'error': 'resident_id parameter required'})
 
 
 @extend_schema(tags=['Maintenance Requests'])
-class MaintenanceRequestViewSet(viewsets.ModelViewSet):
+class MaintenanceRequestViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     """
     API endpoints for managing maintenance requests.
     
@@ -1138,7 +1216,7 @@ class MaintenanceRequestViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def open_requests(self, request):
         """Get all open maintenance requests"""
-        open_requests = MaintenanceRequest.objects.filter(status='open')
+        open_requests = self.eager_load(MaintenanceRequest.objects.filter(status='open'))
         serializer = self.get_serializer(open_requests, many=True)
         return Response(serializer.data)
 
@@ -1154,7 +1232,7 @@ class MaintenanceRequestViewSet(viewsets.ModelViewSet):
 
 
 @extend_schema(tags=['Users'])
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     """
     API endpoints for managing system users.
     
@@ -1196,7 +1274,7 @@ class AuthViewSet(viewsets.ViewSet):
             email=data.get('email'),
             role=data.get('role') or 'staff',
             property_id=data.get('property'),
-            password_hash=make_password(data['password']),
+            password_hash=hash_password(data['password']),
         )
         user.save()
         token = generate_jwt(user)
@@ -1218,7 +1296,7 @@ class AuthViewSet(viewsets.ViewSet):
             user = User.objects.get(username=username)
         except User.DoesNotExist:
             return Response({'detail': 'Invalid credentials'}, status=status.HTTP_401_UNAUTHORIZED)
-        if not check_password(password, user.password_hash):
+        if not check_user_password(user, password):
             return Response({'detail': 'Invalid credentials'}, status=status.HTTP_401_UNAUTHORIZED)
         token = generate_jwt(user)
         return Response({'token': token, 'user': AuthUserMiniSerializer(user).data})
@@ -39,3 +39,14 @@ def ready_check(request):
             'status': 'not_ready',
             'error': str(e),
         }, status=503)
+
+
+@require_http_methods(["GET"])
+def storage_metrics_check(request):
+    """Media storage latency per backend and operation (this process)"""
+    from .storage import storage_metrics
+    return JsonResponse({
+        'status': 'ok',
+        'storage': settings.MEDIA_STORAGE,
+        'operations': storage_metrics(),
+    }, status=200)
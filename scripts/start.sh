@@ -26,15 +26,19 @@ while [ $count -le $retries ]; do
   count=$((count+1))
 done
 
+# Retry spooled media uploads and fail the ones lost with a previous instance (non-fatal)
+python manage.py resume_media_uploads || true
+
 # Collect static files (non-fatal)
 python manage.py collectstatic --noinput || true
 
-# Start gunicorn
+# Start gunicorn (threaded workers, so a slow request such as a login hash does
+# not hold up the others; tune with WEB_CONCURRENCY / GUNICORN_THREADS)
 exec gunicorn pgadmin_config.wsgi:application \
   --bind 0.0.0.0:$PORT \
-  --workers 1 \
-  --threads 1 \
-  --worker-class sync \
+  --workers ${WEB_CONCURRENCY:-1} \
+  --threads ${GUNICORN_THREADS:-4} \
+  --worker-class gthread \
   --timeout 120 \
   --log-level info \
   --access-logfile - \